@@ -0,0 +1,178 @@
+"""Allocation profiling of validate calls with tracemalloc.
+
+Inside profile(), every LazyGrammar.validate() and validate_stream() (so
+do.validate_python, p.validate_file_operation, lambda.validate_lambda and
+the others) and every batch.Validator.validate() is traced on its own.
+What it allocated and still holds when it returns, mostly the AST, is
+attributed to the innermost lexer rule or grammar action of the module on
+the stack: t_NUMBER, p_expr, ... Allocations outside any rule go to the
+PLY module (ply.lex: the LexTokens, ply.yacc: the parser's symbols) or
+file (memo.py: the copy of a cached AST) they happen in. The peak of each
+call, temporaries included, is kept per grammar.
+
+    with allocs.profile() as profile:
+        do.validate_python(code)
+        list(batch.validate_many(snippets, 'p'))
+    summary = profile.report(10)    # prints the top 10, returns them as data
+
+Profiled calls run one at a time; tracemalloc traces the whole process.
+Taking a snapshot of a large parse is slow, this is not a mode to leave
+on. With no profile open, validate() only checks PROFILE, and only once
+something has imported this module.
+"""
+import collections
+import os
+import sys
+import threading
+import tracemalloc
+
+Site = collections.namedtuple('Site', 'grammar site bytes blocks')
+Site.__doc__ = """Memory still allocated after the profiled calls of a grammar, by the rule
+(or PLY module, or file) that allocated it; summed over the calls"""
+
+# The open profile, None when not profiling
+PROFILE = None
+
+# Frames kept per allocation: enough to get from a token or a node back to
+# the rule, through a layout filter and the parser
+FRAMES = 8
+
+
+def _ply_dir():
+    import ply
+    return os.path.dirname(os.path.abspath(ply.__file__))
+
+
+# Per grammar module: its file and [(first line, last line, rule name)]
+_rules = {}
+
+
+def _module_rules(name):
+    found = _rules.get(name)
+    if found is None:
+        module = sys.modules[name]
+        spans = []
+        for rule, value in vars(module).items():
+            code = getattr(value, '__code__', None)
+            if rule.startswith(('t_', 'p_')) and code is not None:
+                lines = [line for _, _, line in code.co_lines() if line is not None]
+                spans.append((min(lines), max(lines), rule))
+        found = _rules[name] = (os.path.abspath(module.__file__), sorted(spans))
+    return found
+
+
+def _site(traceback, module_file, spans, ply_dir):
+    """The rule an allocation happened in, else the PLY module or file"""
+    for frame in reversed(traceback):
+        if frame.filename == module_file:
+            for first, last, rule in spans:
+                if first <= frame.lineno <= last:
+                    return rule
+    for frame in reversed(traceback):
+        if frame.filename.startswith(ply_dir):
+            return 'ply.' + os.path.splitext(os.path.basename(frame.filename))[0]
+    return os.path.basename(traceback[-1].filename)
+
+
+class Profile:
+    """Allocations of the validate calls made while it is open"""
+
+    def __init__(self, frames=FRAMES):
+        self.frames = frames
+        self._sites = collections.Counter()
+        self._blocks = collections.Counter()
+        self._grammars = {}
+        self._lock = threading.RLock()
+        self._depth = 0
+
+    def measure(self, grammar, func, *args):
+        """func(*args), a validate call of grammar, traced"""
+        with self._lock:
+            if self._depth:
+                # Already inside a traced call
+                return func(*args)
+            self._depth += 1
+            try:
+                return self._traced(grammar, func, args)
+            finally:
+                self._depth -= 1
+
+    def _traced(self, grammar, func, args):
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            before = tracemalloc.take_snapshot()
+        else:
+            tracemalloc.start(self.frames)
+        start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        try:
+            result = func(*args)
+            snapshot = tracemalloc.take_snapshot()
+            peak = tracemalloc.get_traced_memory()[1] - start
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        if tracing:
+            stats = [s for s in snapshot.compare_to(before, 'traceback') if s.size_diff > 0]
+            sizes = [(s.traceback, s.size_diff, max(s.count_diff, 0)) for s in stats]
+        else:
+            sizes = [(s.traceback, s.size, s.count) for s in snapshot.statistics('traceback')]
+        module_file, spans = _module_rules(grammar)
+        ply_dir = _ply_dir()
+        row = self._grammars.setdefault(grammar, {'calls': 0, 'peak_bytes': 0, 'bytes': 0})
+        row['calls'] += 1
+        row['peak_bytes'] = max(row['peak_bytes'], peak)
+        for traceback, size, count in sizes:
+            site = _site(traceback, module_file, spans, ply_dir)
+            self._sites[grammar, site] += size
+            self._blocks[grammar, site] += count
+            row['bytes'] += size
+        return result
+
+    def top(self, n=None):
+        """The n sites holding the most memory, as Site records"""
+        with self._lock:
+            return [Site(grammar, site, size, self._blocks[grammar, site])
+                    for (grammar, site), size in self._sites.most_common(n)]
+
+    def summary(self, n=None):
+        """{'grammars': {grammar: {'calls': ..., 'peak_bytes': ...,
+        'bytes': ...}}, 'sites': [Site as a dict, ...]}, the top n sites"""
+        with self._lock:
+            grammars = {name: dict(row) for name, row in self._grammars.items()}
+        return {'grammars': grammars, 'sites': [site._asdict() for site in self.top(n)]}
+
+    def report(self, n=10, file=None):
+        """Print the top n sites, each with its share of its grammar's
+        bytes; returns summary(n)"""
+        file = sys.stdout if file is None else file
+        summary = self.summary(n)
+        grammars = summary['grammars']
+        print(f"{'grammar':<20}{'calls':>8}{'peak KiB':>11}{'held KiB':>11}", file=file)
+        for name, row in grammars.items():
+            print(f"{name:<20}{row['calls']:>8,}{row['peak_bytes'] / 1024:>11,.1f}{row['bytes'] / 1024:>11,.1f}",
+                  file=file)
+        print(f"\n{'grammar':<20}{'site':<32}{'KiB':>11}{'blocks':>10}{'share':>7}", file=file)
+        for site in summary['sites']:
+            total = grammars[site['grammar']]['bytes'] or 1
+            print(f"{site['grammar']:<20}{site['site'][-31:]:<32}{site['bytes'] / 1024:>11,.1f}"
+                  f"{site['blocks']:>10,}{site['bytes'] / total:>7.0%}", file=file)
+        return summary
+
+
+class profile:
+    """Context manager: a Profile of the validate calls made inside"""
+    __slots__ = ('profile', '_outer')
+
+    def __init__(self, frames=FRAMES):
+        self.profile = Profile(frames)
+
+    def __enter__(self):
+        global PROFILE
+        self._outer = PROFILE
+        PROFILE = self.profile
+        return self.profile
+
+    def __exit__(self, *exc):
+        global PROFILE
+        PROFILE = self._outer
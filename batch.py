@@ -0,0 +1,68 @@
+"""Validate many snippets with one lexer and parser.
+
+validate_many() sets up a lexer clone and a parser for the grammar once,
+then runs every snippet through them, starting each at line 1. Syntax and
+lexer errors are collected into the result as diagnostics.Diagnostic
+records, exactly as validate_* return them. A Validator is not shared
+between threads; give each thread its own.
+
+    for result in batch.validate_many(snippets, grammar='do'):
+        if not result.valid:
+            diagnostics.report(result.errors)
+"""
+import collections
+import copy
+
+import diagnostics
+import lazy
+from lazy import _Rejected
+
+Result = collections.namedtuple('Result', 'index valid value errors')
+Result.__doc__ = """One validated snippet: value is the AST (None with build_ast=False, the
+message if a grammar action raised), errors the Diagnostics of every
+lexer and syntax error, in order"""
+
+
+class Validator:
+    """A grammar's lexer and parser, set up once for many snippets"""
+
+    def __init__(self, grammar='do', build_ast=True):
+        g = lazy.grammar(grammar)
+        self.grammar = g.module_name
+        self.build_ast = build_ast
+        self.lexer = g.lexer.clone()
+        if build_ast:
+            self.parser = copy.copy(g.parser)
+        else:
+            # No actions, stop at the first error; nothing reads token
+            # values, so offset tokens are enough
+            import spanlex
+            self.parser = copy.copy(g.recognizer)
+            self.lexer = spanlex.SpanLexer(self.lexer)
+
+    def validate(self, code, index=0):
+        """Result for one snippet; traced inside allocs.profile()"""
+        profile = lazy._profile()
+        if profile is not None:
+            return profile.measure(self.grammar, self._validate, code, index)
+        return self._validate(code, index)
+
+    def _validate(self, code, index):
+        self.lexer.lineno = 1
+        with diagnostics.collect(self.parser, self.lexer) as errors:
+            try:
+                value = self.parser.parse(code, lexer=self.lexer)
+            except _Rejected as e:
+                diagnostics.syntax_error(e.token)
+                value = None
+            except Exception as e:
+                return Result(index, False, str(e), errors)
+        return Result(index, not errors, value, errors)
+
+
+def validate_many(snippets, grammar='do', build_ast=True):
+    """Yield a Result per snippet, lazily, reusing one lexer and parser"""
+    validator = Validator(grammar, build_ast)
+    validate = validator.validate
+    for index, code in enumerate(snippets):
+        yield validate(code, index)
@@ -0,0 +1,24 @@
+"""Benchmarks for the validator grammars. Run from the repository root,
+e.g. `python -m bench.lexers`."""
+import time
+import tracemalloc
+
+
+def best(func, repeat):
+    """The shortest time of `repeat` calls of func(), in seconds"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def peak(func):
+    """Peak bytes allocated by func()"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
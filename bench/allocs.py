@@ -0,0 +1,96 @@
+"""Where validate_* allocates: an allocs profile of large inputs.
+
+Per grammar, one large input (bench.scaling.CASES, or the given files)
+through validate_* and the sample lines through batch.validate_many, all
+inside allocs.profile(); then the top sites. The grammars are built first,
+so building them does not show up.
+
+    python -m bench.allocs
+    python -m bench.allocs do --file big.do --top 20 --json allocs.json
+    python -m bench.allocs --check      # same results, sites add up
+"""
+import argparse
+import importlib
+import json
+import random
+import sys
+import tracemalloc
+
+import allocs
+import batch
+import lazy
+import memo
+from bench.recognizer import VALIDATORS, snippets
+from bench.scaling import CASES
+from bench.threads import corrupt
+
+
+def check(count, seed=0):
+    """Validate inputs inside and outside a profile, also with tracemalloc
+    already tracing; returns the number of failures"""
+    rng = random.Random(seed)
+    failures = 0
+    for name in VALIDATORS:
+        validate = getattr(importlib.import_module(name), VALIDATORS[name])
+        codes = [CASES[name](rng.randint(1, 200)) for _ in range(count)]
+        codes += [corrupt(code, rng) for code in codes]
+        for tracing in (False, True):
+            if tracing:
+                tracemalloc.start(allocs.FRAMES)
+            try:
+                with allocs.profile() as profile:
+                    profiled = [validate(code) for code in codes]
+                    results = list(batch.validate_many(codes, name))
+            finally:
+                if tracing:
+                    tracemalloc.stop()
+            if profiled != [validate(code) for code in codes] or results != list(batch.validate_many(codes, name)):
+                failures += 1
+                print(f"{name}: results differ inside the profile (tracing: {tracing})")
+            summary = profile.summary()
+            row = summary['grammars'][name]
+            if row['calls'] != 2 * len(codes) or sum(site['bytes'] for site in summary['sites']) != row['bytes']:
+                failures += 1
+                print(f"{name}: inconsistent profile {row} (tracing: {tracing})")
+            if not any(site['site'].startswith('p_') for site in summary['sites']):
+                failures += 1
+                print(f"{name}: no allocations attributed to an action (tracing: {tracing})")
+    print(f"{len(VALIDATORS)} grammars, {failures} failures")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=list(VALIDATORS))
+    ap.add_argument('--file', action='append', default=[], help='input to profile instead of the generated one')
+    ap.add_argument('--size', type=int, default=20_000, help='items in the generated input')
+    ap.add_argument('--top', type=int, default=15)
+    ap.add_argument('--json', metavar='PATH', help='also write the summary as JSON')
+    ap.add_argument('--check', action='store_true', help='compare results inside and outside a profile')
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    if args.check:
+        return 1 if check(20) else 0
+
+    lazy.warm_up(*args.grammars)
+    with allocs.profile() as profile:
+        for name in args.grammars:
+            validate = getattr(importlib.import_module(name), VALIDATORS[name])
+            for path in args.file:
+                with open(path, encoding='utf-8') as f:
+                    validate(f.read())
+            if not args.file:
+                validate(CASES[name](args.size))
+            for _ in batch.validate_many(snippets(name), name):
+                pass
+    summary = profile.report(args.top)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(summary, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
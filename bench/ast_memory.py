@@ -0,0 +1,71 @@
+"""AST memory per node and build time for do.py and lambda.py"""
+import argparse
+import gc
+import time
+import tracemalloc
+
+import lazy
+from bench.corpus import repeated
+
+
+def count_nodes(value):
+    """Number of AST nodes (dicts or node objects) reachable from value"""
+    if isinstance(value, list):
+        return sum(count_nodes(v) for v in value)
+    if isinstance(value, dict):
+        return 1 + sum(count_nodes(v) for v in value.values())
+    if hasattr(value, '_fields'):
+        return 1 + sum(count_nodes(getattr(value, name)) for name in value._fields)
+    return 0
+
+
+def retained(build):
+    """Bytes still allocated after build() returns, and its result"""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, result
+
+
+def measure(name, size, repeat=3):
+    grammar = lazy.grammar(name).warm_up()
+    text = repeated(name, size, '\n')
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        grammar.parse(text)
+        best = min(best, time.perf_counter() - start)
+
+    # Tokenize first so only the AST is left over after the parse
+    grammar.lexer.input(text)
+    tokens = list(iter(grammar.lexer.token, None))
+    stream = iter(tokens)
+    size, ast = retained(lambda: grammar.parse(lexer=grammar.lexer, tokenfunc=lambda: next(stream, None)))
+    nodes = count_nodes(ast)
+    row = {'grammar': name, 'nodes': nodes, 'build_sec': best, 'bytes_per_node': size / nodes}
+    if hasattr(ast, 'to_dict') or (isinstance(ast, list) and ast and hasattr(ast[0], 'to_dict')):
+        import nodes as ast_nodes
+        dict_size, _ = retained(lambda: ast_nodes.to_dict(ast))
+        row['dict_bytes_per_node'] = dict_size / nodes
+    return row
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('grammars', nargs='*', default=['do', 'lambda'])
+    ap.add_argument('--size', type=int, default=500_000, help='input size in characters')
+    args = ap.parse_args(argv)
+
+    for name in args.grammars:
+        r = measure(name, args.size)
+        line = (f"{name:<8} {r['nodes']:>9} nodes  build {r['build_sec'] * 1000:8.1f} ms  "
+                f"{r['bytes_per_node']:6.1f} B/node")
+        if 'dict_bytes_per_node' in r:
+            line += f"  (dict form {r['dict_bytes_per_node']:.1f} B/node)"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
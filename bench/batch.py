@@ -0,0 +1,68 @@
+"""Per-item cost of validate_many() against a validate_* loop.
+
+Both are compared with a bare parser.parse() loop over the same snippets;
+the difference is each API's per-item overhead.
+
+    python -m bench.batch
+"""
+import argparse
+import importlib
+import time
+
+import batch
+import lazy
+import memo
+from bench.recognizer import VALIDATORS, snippets
+
+
+def per_item(run, items, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(items)
+        best = min(best, time.perf_counter() - start)
+    return best / len(items)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=list(VALIDATORS))
+    ap.add_argument('-n', '--count', type=int, default=20_000)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+    # Every item is parsed; duplicates would otherwise be cache hits
+    memo.configure(max_entries=0)
+
+    print(f"{'grammar':<8}{'mode':<11}{'parse us':>10}{'loop +us':>10}{'batch +us':>11}")
+    for name in args.grammars:
+        validate = getattr(importlib.import_module(name), VALIDATORS[name])
+        g = lazy.grammar(name)
+        lines = snippets(name)
+        items = (lines * (args.count // len(lines) + 1))[:args.count]
+        for mode, build_ast in (('ast', True), ('recognize', False)):
+            def loop(items):
+                for code in items:
+                    validate(code, build_ast=build_ast)
+
+            def many(items):
+                for _ in batch.validate_many(items, name, build_ast):
+                    pass
+
+            parser = g.parser if build_ast else g.recognizer
+            lexer = g.lexer.clone()
+
+            def bare(items):
+                for code in items:
+                    lexer.lineno = 1
+                    parser.parse(code, lexer=lexer)
+
+            for run in (loop, many, bare):
+                run(items[:10])
+            base = per_item(bare, items, args.repeat) * 1e6
+            a = per_item(loop, items, args.repeat) * 1e6
+            b = per_item(many, items, args.repeat) * 1e6
+            print(f"{name:<8}{mode:<11}{base:>10.1f}{a - base:>10.1f}{b - base:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""Representative inputs for every grammar module"""
+
+# One valid snippet per grammar; the benchmarks repeat them to size
+SAMPLES = {
+    'do': (
+        "def area(width, height): return width * height\n"
+        "index = format + 1\n"
+        "if index >= 10: total = total + index ** 2\n"
+        "while count: { count = count - 1 value = obj.attr }\n"
+        "for item in items: result = (item + 3.5) % 7\n"
+        "class Shape(Base): { name = 'shape' pass }\n"
+    ),
+    'p': 'f = open("data.txt", "r")\nf.read(100)\nf.write("Hello")\nf.close()\n',
+    'try': 'def greet(name) { print(name, "hi"); }\nwhile (count) { count = count - 1; }\n',
+    'try1': (
+        "def area(width, height): return width * height\n"
+        "index = format + 1\n"
+        "if index >= 10: total = total + index ** 2\n"
+        "for item in items: result = (item + 3.5) % 7\n"
+    ),
+    'tempCodeRunnerFile': (
+        "def area(width, height): return width * height\n"
+        "index = format + 1\n"
+        "if index: total = total + index ** 2\n"
+        "for item in items: result = (item + 3.5) % 7\n"
+    ),
+    'fun': 'def greet(name) { print(name) }\nwhile (count) { count = count - 1 }\ninfo = format + 2\n',
+    'lambda': 'lambda x, y: x + (y + 1);\n',
+    'arr': 'let values = [1, 2.5, "three", true, None, [4, 5]];',
+    'tuple': 'const point = (1, 2.5, "three", false, None, (4, 5));',
+    'dic': 'var values = [1, 2, [3, 4], "five"];',
+    'oo': 'var values = [1, 2, [3, 4], "five"];',
+    'file': 'f = open("data.txt", "r"); f.read(); f.write("Hello"); f.close();',
+    'for': 'for index in range(0, 10, 2):\n',
+}
+
+
+def repeated(name, size, sep=' '):
+    """The sample for `name` repeated to at least `size` characters"""
+    sample = SAMPLES[name]
+    return sep.join([sample] * max(1, size // len(sample) + 1))
@@ -0,0 +1,235 @@
+"""do.py against CPython's ast.parse: conformance and throughput.
+
+Every file of the corpus is parsed both ways: do.py in indent mode
+(indentlex) building its AST, and ast.parse. Per file it records whether
+the two agree on validity, tokens/s and statements/s for each, and peak
+memory (tracemalloc, in a separate run). Disagreements are listed with
+both first errors. Without paths the corpus is generated: programs in the
+subset both parsers share (bench.indent.program), each also with one
+character deleted, inserted or cut (bench.threads.corrupt).
+
+A second table times single constructs, each repeated to --tokens tokens,
+and ranks them by do.py's time per token, with the slowdown against
+ast.parse.
+
+    python -m bench.differential                     # generated corpus
+    python -m bench.differential src/ -v             # .py files, per-file rows
+    python -m bench.differential --json report.json
+"""
+import argparse
+import ast
+import json
+import os
+import random
+import sys
+
+import diagnostics
+import do
+import indentlex
+import memo
+from bench import best, peak
+from bench.indent import program
+from bench.threads import corrupt
+
+
+def _elifs(n):
+    lines = ['if index == 0:', '    pass']
+    for i in range(1, n):
+        lines += [f'elif index == {i}:', '    pass']
+    return lines + ['else:', '    pass']
+
+
+def _nested(n):
+    return [' ' * i + 'while count:' for i in range(n)] + [' ' * n + 'pass']
+
+
+# Construct name: source of one instance with n repetitions inside it
+CONSTRUCTS = {
+    'flat statements': lambda n: [f'x{i} = {i}' for i in range(n)],
+    'expr PLUS term chain': lambda n: ['total = ' + ' + '.join(['value'] * n)],
+    'mixed arithmetic': lambda n: ['total = ' + ' - '.join(['a * b + c / d % e'] * n)],
+    'power chain': lambda n: ['total = ' + ' ** '.join(['base'] * n)],
+    'unary chain': lambda n: ['total = ' + '-' * n + 'value'],
+    'nested parentheses': lambda n: ['total = ' + '(' * n + 'value' + ')' * n],
+    'attribute chain': lambda n: ['total = obj' + '.attr' * n],
+    'elif chain': _elifs,
+    'nested blocks': _nested,
+    'parameter list': lambda n: ['def area(' + ', '.join(f'p{i}' for i in range(n)) + '):', '    pass'],
+    'comparisons': lambda n: [f'if index >= {i}: total = total + {i}' for i in range(n)],
+    'classes': lambda n: [line for i in range(n) for line in (f'class Shape{i}(Base):', "    name = 'shape'")],
+}
+# Repetitions inside one instance; CPython stops at 100 indentation levels
+# and 200 nested parentheses
+INSTANCE_SIZE = 50
+
+
+def tokens(text):
+    """Tokens do.py's parser is handed for text in indent mode"""
+    lexer = do.grammar.lexer.clone()
+    lexer.lineno = 1
+    lexer.input(text)
+    return sum(1 for _ in indentlex.layout(iter(lexer.token, None), lexer))
+
+
+def run_do(text):
+    valid, _, errors = do.validate_python(text, indent=True)
+    return valid, None if valid else (diagnostics.message(errors[0]) if errors else 'error')
+
+
+def run_cpython(text):
+    try:
+        tree = ast.parse(text)
+    except SyntaxError as e:
+        return False, f"{e.msg}, line {e.lineno}"
+    return True, sum(isinstance(node, ast.stmt) for node in ast.walk(tree))
+
+
+def measure(name, text, repeat):
+    """The record of one file"""
+    do_valid, do_error = run_do(text)
+    cpython_valid, detail = run_cpython(text)
+    do_sec = best(lambda: run_do(text), repeat)
+    cpython_sec = best(lambda: ast.parse(text) if cpython_valid else run_cpython(text), repeat)
+    count = tokens(text)
+    statements = detail if cpython_valid else None
+    return {
+        'file': name,
+        'bytes': len(text.encode()),
+        'tokens': count,
+        'statements': statements,
+        'do_valid': do_valid,
+        'cpython_valid': cpython_valid,
+        'agree': do_valid == cpython_valid,
+        'do_error': do_error,
+        'cpython_error': None if cpython_valid else detail,
+        'do_sec': do_sec,
+        'cpython_sec': cpython_sec,
+        'do_tokens_per_sec': count / do_sec,
+        'cpython_tokens_per_sec': count / cpython_sec,
+        'do_statements_per_sec': statements / do_sec if statements else None,
+        'cpython_statements_per_sec': statements / cpython_sec if statements else None,
+        'do_peak_bytes': peak(lambda: run_do(text)),
+        'cpython_peak_bytes': peak(lambda: run_cpython(text)),
+    }
+
+
+def corpus(paths, count, seed=0):
+    """(name, text) pairs: the .py files under paths, or generated programs"""
+    if paths:
+        for path in paths:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for file in sorted(files):
+                        if file.endswith('.py'):
+                            yield os.path.join(root, file)
+            else:
+                yield path
+        return
+    rng = random.Random(seed)
+    for i in range(count):
+        text = program(rng.randint(5, 200), rng)
+        yield f'generated-{i}', text
+        yield f'generated-{i}-corrupt', corrupt(text, rng)
+
+
+def _read(item):
+    if isinstance(item, tuple):
+        return item
+    with open(item, encoding='utf-8', errors='replace') as f:
+        return item, f.read()
+
+
+def constructs(token_target, repeat):
+    """One record per construct, slowest per token for do.py first"""
+    rows = []
+    for name, make in CONSTRUCTS.items():
+        instance = make(INSTANCE_SIZE)
+        unit = tokens('\n'.join(instance) + '\n')
+        text = '\n'.join(instance * max(1, token_target // unit)) + '\n'
+        count = tokens(text)
+        assert run_do(text)[0] and run_cpython(text)[0], name
+        do_sec = best(lambda: run_do(text), repeat)
+        cpython_sec = best(lambda: ast.parse(text), repeat)
+        rows.append({
+            'construct': name,
+            'tokens': count,
+            'do_us_per_token': do_sec / count * 1e6,
+            'cpython_us_per_token': cpython_sec / count * 1e6,
+            'slowdown': do_sec / cpython_sec,
+        })
+    rows.sort(key=lambda row: row['do_us_per_token'], reverse=True)
+    return rows
+
+
+def summary(files):
+    def total(key):
+        return sum(f[key] for f in files)
+    agreed = [f for f in files if f['cpython_valid'] and f['do_valid']]
+    statements = sum(f['statements'] for f in agreed)
+    return {
+        'files': len(files),
+        'agree': sum(f['agree'] for f in files),
+        'do_tokens_per_sec': total('tokens') / total('do_sec'),
+        'cpython_tokens_per_sec': total('tokens') / total('cpython_sec'),
+        # Over the files both accept, where the statement counts are CPython's
+        'do_statements_per_sec': statements / sum(f['do_sec'] for f in agreed) if agreed else None,
+        'cpython_statements_per_sec': statements / sum(f['cpython_sec'] for f in agreed) if agreed else None,
+        'do_peak_bytes': max(f['do_peak_bytes'] for f in files),
+        'cpython_peak_bytes': max(f['cpython_peak_bytes'] for f in files),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('paths', nargs='*', help='.py files or directories (default: generated corpus)')
+    ap.add_argument('-n', '--count', type=int, default=100, help='generated programs')
+    ap.add_argument('--tokens', type=int, default=20_000, help='tokens per construct timing')
+    ap.add_argument('-r', '--repeat', type=int, default=3)
+    ap.add_argument('-v', '--verbose', action='store_true', help='one row per file')
+    ap.add_argument('--json', metavar='PATH', help='also write the records as JSON')
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+    do.grammar.warm_up()
+
+    files = [measure(*_read(item), args.repeat) for item in corpus(args.paths, args.count)]
+    if not files:
+        print("No .py files found")
+        return 1
+    if args.verbose:
+        print(f"{'file':<32}{'tokens':>8}{'do':>6}{'ast':>6}{'do tok/s':>12}{'ast tok/s':>12}{'do KiB':>9}{'ast KiB':>9}")
+        for f in files:
+            print(f"{f['file'][-32:]:<32}{f['tokens']:>8,}{'ok' if f['do_valid'] else 'bad':>6}"
+                  f"{'ok' if f['cpython_valid'] else 'bad':>6}{f['do_tokens_per_sec']:>12,.0f}"
+                  f"{f['cpython_tokens_per_sec']:>12,.0f}{f['do_peak_bytes'] / 1024:>9,.0f}"
+                  f"{f['cpython_peak_bytes'] / 1024:>9,.0f}")
+        print()
+    for f in files:
+        if not f['agree']:
+            print(f"DISAGREE {f['file']}: do.py {f['do_error'] or 'valid'} | ast.parse {f['cpython_error'] or 'valid'}")
+    s = summary(files)
+    print(f"{s['files']} files, {s['agree']} agree ({s['agree'] / s['files']:.1%})")
+    # ratio: ast.parse's figure over do.py's
+    print(f"{'':<14}{'do.py':>14}{'ast.parse':>14}{'ratio':>8}")
+    for label, key in (('tokens/s', 'tokens_per_sec'), ('statements/s', 'statements_per_sec')):
+        if s[f'do_{key}']:
+            print(f"{label:<14}{s[f'do_{key}']:>14,.0f}{s[f'cpython_{key}']:>14,.0f}"
+                  f"{s[f'cpython_{key}'] / s[f'do_{key}']:>7.1f}x")
+    print(f"{'peak KiB':<14}{s['do_peak_bytes'] / 1024:>14,.0f}{s['cpython_peak_bytes'] / 1024:>14,.0f}"
+          f"{s['cpython_peak_bytes'] / s['do_peak_bytes']:>7.1f}x")
+
+    rows = constructs(args.tokens, args.repeat)
+    print(f"\n{'construct':<24}{'tokens':>8}{'do us/tok':>11}{'ast us/tok':>12}{'slowdown':>10}")
+    for row in rows:
+        print(f"{row['construct']:<24}{row['tokens']:>8,}{row['do_us_per_token']:>11.2f}"
+              f"{row['cpython_us_per_token']:>12.3f}{row['slowdown']:>9.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'summary': s, 'files': files, 'constructs': rows}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
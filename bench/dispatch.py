@@ -0,0 +1,83 @@
+"""Prefix dispatch (dispatch.py) against trying every grammar in turn.
+
+Inputs are the sample lines of each grammar with their numbers varied,
+plus --corrupt of them with a character dropped, inserted or cut off.
+Reports attempts per input, misroutes, and `missed`: inputs the labelled
+grammar accepts but the dispatcher rejected (should be 0).
+
+    python -m bench.dispatch
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+import dispatch
+import memo
+from bench.recognizer import snippets
+from bench.threads import corrupt
+
+# Try-in-turn order: the general grammar first, as callers do today
+ORDER = ('do', 'p', 'file', 'lambda', 'arr', 'tuple', 'for')
+
+
+def labelled(count, corrupt_ratio, seed=0):
+    """(grammar, code) pairs, round-robin over ORDER"""
+    rng = random.Random(seed)
+    lines = {name: snippets(name) for name in ORDER}
+    work = []
+    for i in range(count):
+        name = ORDER[i % len(ORDER)]
+        code = re.sub(r'\d+', lambda m: str(rng.randrange(1000)), rng.choice(lines[name]))
+        if rng.random() < corrupt_ratio:
+            code = corrupt(code, rng)
+        work.append((name, code))
+    return work
+
+
+def in_turn(code):
+    """(grammar or None, attempts) trying ORDER until one accepts"""
+    for attempts, name in enumerate(ORDER, 1):
+        if dispatch.attempt(name, code)[0]:
+            return name, attempts
+    return None, len(ORDER)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('-n', '--count', type=int, default=14_000)
+    ap.add_argument('--corrupt', type=float, default=0.2, help='share of corrupted inputs')
+    args = ap.parse_args(argv)
+    # Every attempt is a parse, not a cache hit
+    memo.configure(max_entries=0)
+
+    work = labelled(args.count, args.corrupt)
+    dispatcher = dispatch.Dispatcher()
+    for _, code in work[:50]:
+        dispatcher.validate(code)
+    dispatcher.reset_stats()
+
+    start = time.perf_counter()
+    results = [dispatcher.validate(code) for _, code in work]
+    dispatched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    baseline = [in_turn(code) for _, code in work]
+    tried = time.perf_counter() - start
+
+    missed = sum(1 for (name, code), result in zip(work, results)
+                 if not result.valid and dispatch.attempt(name, code)[0])
+    stats = dispatcher.stats()
+    base_attempts = sum(attempts for _, attempts in baseline) / len(work)
+    print(f"{len(work):,} inputs, {stats['rejected']:,} rejected by every candidate")
+    print(f"{'':<10}{'inputs/s':>10}{'attempts':>10}{'misroutes':>11}{'missed':>8}")
+    print(f"{'dispatch':<10}{len(work) / dispatched:>10,.0f}{stats['attempts_per_input']:>10.2f}"
+          f"{stats['misroutes']:>11,}{missed:>8,}")
+    print(f"{'in turn':<10}{len(work) / tried:>10,.0f}{base_attempts:>10.2f}")
+    print('routed:', stats['routed'])
+    return 1 if missed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
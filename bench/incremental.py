@@ -0,0 +1,69 @@
+"""Incremental reparsing (incremental.Document): per-edit time on a large
+program, and the random programs and edits tests/test_incremental.py uses.
+
+    python -m bench.incremental                   # 5000 statements
+    python -m bench.incremental --statements 50000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from bench.corpus import SAMPLES
+from incremental import Document
+
+_FRAGMENTS = [
+    'x', 'y1', ' = ', ' + ', '-', ' * ', '**', ' == ', ' and ', '.attr', '(', ')',
+    '{', '}', ': ', ',', '1', '2.5', "'s'", '"t"', '\n', ' ', 'pass', 'return ',
+    'if ', 'elif ', 'else', 'while ', 'for ', ' in ', 'def ', 'class ', 'None', 'True', '$',
+]
+
+
+def random_program(rng, statements):
+    lines = SAMPLES['do'].splitlines()
+    return '\n'.join(rng.choice(lines) for _ in range(statements)) + '\n'
+
+
+def random_edit(rng, text):
+    """(start, end, new_text): a few fragments replacing a short span"""
+    start = rng.randint(0, len(text))
+    end = min(len(text), start + rng.choice([0, 0, 1, 2, 5, 20]))
+    new = ''.join(rng.choice(_FRAGMENTS) for _ in range(rng.choice([0, 1, 1, 2, 3])))
+    return start, end, new
+
+
+def bench(statements=5000, edits=2000, seed=0):
+    rng = random.Random(seed)
+    text = random_program(rng, statements)
+    start = time.perf_counter()
+    doc = Document(text)
+    full = time.perf_counter() - start
+    # Retype one number somewhere in the program; the offsets stay valid
+    # since each edit keeps the length
+    numbers = [m.end() - 1 for m in re.finditer(r'format \+ \d', text)]
+    times = []
+    for _ in range(edits // 2):
+        pos = rng.choice(numbers)
+        # Type a digit, then retype the number: both change the length
+        for end, digits in ((pos + 1, '12'), (pos + 2, str(rng.randint(1, 9)))):
+            start = time.perf_counter()
+            valid, _, _ = doc.edit(pos, end, digits)
+            times.append(time.perf_counter() - start)
+            assert valid
+    times.sort()
+    print(f"{statements} statements, {len(doc.text):,} chars: full parse {full * 1000:.1f} ms, "
+          f"edit p50 {times[len(times) // 2] * 1e6:.0f} us, p99 {times[len(times) * 99 // 100] * 1e6:.0f} us")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('-n', '--edits', type=int, default=2000)
+    ap.add_argument('--statements', type=int, default=5000)
+    args = ap.parse_args(argv)
+    bench(args.statements, args.edits)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+"""Indentation mode (indentlex) against rewriting the source into braces.
+
+Without indentlex an indented do.py program has to be preprocessed: its
+blocks rewritten with braces (to_braces below), then parsed. In indent mode
+the layout filter reads the indentation while the tokens go by, in the
+same pass as the parse. Both ways run over generated programs with blocks
+nested up to --depth levels.
+
+    python -m bench.indent
+    python -m bench.indent --check        # both ways give the same AST
+"""
+import argparse
+import io
+import random
+import sys
+
+import do
+import memo
+from bench import best
+from nodes import to_dict
+
+SIMPLE = (
+    'total = total + {i}', 'value = obj.attr * 2', 'pass', 'return count ** 2',
+    "name = 'shape'", 'result = (item + 3.5) % 7', 'index = -(width -\n{pad}    height) * 2',
+)
+HEADERS = (
+    'if index >= {i}:', 'while count:', 'for item in items:',
+    'def area(width, height):', 'class Shape(Base):',
+)
+
+
+def program(count, rng, depth=4):
+    """About count lines of indented do.py code, blocks nested up to depth"""
+    lines = []
+    stack = []      # keyword of every open block
+    while len(lines) < count:
+        pad = '    ' * len(stack)
+        if len(stack) < depth and rng.random() < 0.3:
+            header = rng.choice(HEADERS)
+            lines.append(pad + header.format(i=len(lines)))
+            stack.append(header.split()[0])
+            continue
+        lines.append(pad + rng.choice(SIMPLE).format(i=len(lines), pad=pad))
+        if rng.random() < 0.1:
+            lines.append('')
+        while stack and rng.random() < 0.3:
+            if stack.pop() == 'if' and rng.random() < 0.5:
+                lines.append('    ' * len(stack) + 'else:')
+                stack.append('else')
+                break
+    if stack and lines[-1].endswith(':'):
+        lines.append('    ' * len(stack) + 'pass')
+    return '\n'.join(lines) + '\n'
+
+
+def to_braces(source):
+    """The preprocessing pass: source with its indented blocks braced"""
+    out = []
+    widths = [0]
+    header = None   # index of the last line that starts a statement
+    depth = 0       # open parentheses
+    for line in source.splitlines():
+        stripped = line.lstrip()
+        if not stripped or depth:
+            out.append(line)
+            depth += line.count('(') - line.count(')')
+            continue
+        width = len(line) - len(stripped)
+        if width > widths[-1]:
+            widths.append(width)
+            out[header] += ' {'
+        while width < widths[-1]:
+            widths.pop()
+            out.append(' ' * widths[-1] + '}')
+        header = len(out)
+        out.append(line)
+        depth += line.count('(') - line.count(')')
+    out.extend('}' for _ in widths[1:])
+    return '\n'.join(out) + '\n'
+
+
+def check(count, seed=0):
+    """Parse generated programs in indent mode, whole and streamed, and
+    their braced rewrites; returns the number of disagreements"""
+    rng = random.Random(seed)
+    failures = 0
+    for i in range(count):
+        source = program(rng.randint(1, 60), rng)
+        braced = do.validate_python(to_braces(source))
+        indented = do.validate_python(source, indent=True)
+        streamed = do.validate_python_stream(io.StringIO(source), build_ast=True,
+                                             chunk_size=rng.randint(1, 64), indent=True)
+        recognized = do.validate_python(source, build_ast=False, indent=True)
+        expected = (braced[0], to_dict(braced[1]), braced[2])
+        for label, result in (('whole', indented), ('stream', streamed)):
+            if (result[0], to_dict(result[1]), result[2]) != expected:
+                failures += 1
+                print(f"program {i}: {label} indent mode differs from braces\n{source}")
+        if not braced[0] or recognized != (True, None, []):
+            failures += 1
+            print(f"program {i}: not accepted\n{source}")
+    print(f"{count} programs, {failures} failures")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--lines', type=int, nargs='*', default=[1_000, 10_000, 50_000])
+    ap.add_argument('--depth', type=int, default=4)
+    ap.add_argument('-r', '--repeat', type=int, default=3)
+    ap.add_argument('--check', action='store_true', help='compare indent mode with the braced rewrite')
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    if args.check:
+        return 1 if check(500) else 0
+
+    do.grammar.warm_up()
+    do.grammar.recognizer
+    print(f"{'lines':>8}{'mode':>11}{'rewrite ms':>12}{'+ parse ms':>12}{'indent ms':>11}{'speedup':>9}")
+    for count in args.lines:
+        source = program(count, random.Random(count), args.depth)
+        for build_ast in (True, False):
+            rewrite = best(lambda: to_braces(source), args.repeat)
+            braced = to_braces(source)
+            parse = best(lambda: do.validate_python(braced, build_ast), args.repeat)
+            indent = best(lambda: do.validate_python(source, build_ast, indent=True), args.repeat)
+            assert do.validate_python(source, build_ast, indent=True)[0]
+            print(f"{count:>8,}{'ast' if build_ast else 'recognize':>11}{rewrite * 1000:>12.1f}"
+                  f"{(rewrite + parse) * 1000:>12.1f}{indent * 1000:>11.1f}{(rewrite + parse) / indent:>8.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
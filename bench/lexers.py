@@ -0,0 +1,44 @@
+"""Lexer throughput (tokens/sec) for every grammar module"""
+import argparse
+import time
+
+import lazy
+import tablecache
+from bench.corpus import repeated
+
+
+def lex_all(lexer, text):
+    lexer.input(text)
+    token = lexer.token
+    count = 0
+    while token():
+        count += 1
+    return count
+
+
+def measure(name, size=200_000, repeat=5):
+    lexer = lazy.grammar(name).lexer
+    text = repeated(name, size)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = lex_all(lexer, text)
+        best = min(best, time.perf_counter() - start)
+    return {'grammar': name, 'chars': len(text), 'tokens': count,
+            'tokens_per_sec': count / best, 'chars_per_sec': len(text) / best}
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('grammars', nargs='*', default=tablecache.GRAMMARS)
+    ap.add_argument('--size', type=int, default=200_000)
+    args = ap.parse_args(argv)
+
+    print(f"{'grammar':<20}{'tokens':>10}{'tokens/s':>14}{'chars/s':>14}")
+    for name in args.grammars:
+        r = measure(name, args.size)
+        print(f"{name:<20}{r['tokens']:>10}{r['tokens_per_sec']:>14,.0f}{r['chars_per_sec']:>14,.0f}")
+
+
+if __name__ == '__main__':
+    main()
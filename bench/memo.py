@@ -0,0 +1,70 @@
+"""validate_* throughput with and without the result cache (memo).
+
+Traffic is drawn from a pool of distinct snippets with a Zipf-like skew, so
+a few snippets make up most of the calls. --unique 0 sends only distinct
+snippets and shows what a miss costs.
+
+    python -m bench.memo
+    python -m bench.memo --unique 0
+"""
+import argparse
+import importlib
+import random
+import re
+import time
+
+import memo
+from bench.recognizer import VALIDATORS, snippets
+
+
+def variants(name, count):
+    """`count` distinct snippets: the sample lines with their first number
+    replaced by a counter"""
+    lines = [line for line in snippets(name) if re.search(r'\d', line)]
+    return [re.sub(r'\d+', str(i), lines[i % len(lines)], count=1) for i in range(count)]
+
+
+def traffic(name, calls, distinct, seed=0):
+    pool = variants(name, max(distinct, 1) if distinct else calls)
+    if not distinct:
+        return pool
+    rng = random.Random(seed)
+    weights = [1 / (rank + 1) for rank in range(len(pool))]
+    return rng.choices(pool, weights, k=calls)
+
+
+def throughput(validate, items, **kwargs):
+    start = time.perf_counter()
+    for code in items:
+        validate(code, **kwargs)
+    return len(items) / (time.perf_counter() - start)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=list(VALIDATORS))
+    ap.add_argument('-n', '--calls', type=int, default=20_000)
+    ap.add_argument('--unique', type=int, default=500, help='distinct snippets (0: all distinct)')
+    ap.add_argument('--max-entries', type=int, default=memo.MAX_ENTRIES)
+    args = ap.parse_args(argv)
+
+    print(f"{'grammar':<8}{'mode':<10}{'uncached/s':>12}{'cached/s':>12}{'speedup':>9}{'hit rate':>10}{'evictions':>11}")
+    for name in args.grammars:
+        validate = getattr(importlib.import_module(name), VALIDATORS[name])
+        items = traffic(name, args.calls, args.unique)
+        for mode, kwargs in (('ast', {}), ('recognize', {'build_ast': False})):
+            memo.configure(max_entries=0)
+            validate(items[0], **kwargs)
+            base = throughput(validate, items, **kwargs)
+
+            memo.configure(max_entries=args.max_entries)
+            memo.clear()
+            memo.CACHE.reset_stats()
+            cached = throughput(validate, items, **kwargs)
+            stats = memo.stats()
+            print(f"{name:<8}{mode:<10}{base:>12,.0f}{cached:>12,.0f}{cached / base:>8.2f}x"
+                  f"{stats['hit_rate']:>10.1%}{stats['evictions']:>11,}")
+
+
+if __name__ == '__main__':
+    main()
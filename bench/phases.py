@@ -0,0 +1,116 @@
+"""What per-phase timing (phases) costs, and where validate_* spends its time.
+
+Per grammar, small calls (one sample line each) and one large input
+(bench.scaling.CASES) go through validate_* three ways: LazyGrammar's
+untimed _validate(), validate() with no hook configured, which is what
+every caller pays for the feature, and validate() with a phases.Totals
+hook. Then the lex / parse / actions split the hook recorded.
+
+    python -m bench.phases
+    python -m bench.phases --check      # same results with the hook on
+"""
+import argparse
+import importlib
+import random
+import sys
+
+import lazy
+import memo
+import phases
+from bench import best
+from bench.lexers import lex_all
+from bench.recognizer import VALIDATORS, snippets
+from bench.scaling import CASES
+from bench.threads import corrupt
+
+
+def inputs(name, count, size):
+    """(label, [code, ...]) of small calls and of one large input"""
+    lines = snippets(name)
+    return [('small', (lines * (count // len(lines) + 1))[:count]), ('large', [CASES[name](size)])]
+
+
+def check(count, seed=0):
+    """Validate inputs with and without the hook; returns the number of
+    differences and inconsistent Timings"""
+    rng = random.Random(seed)
+    failures = 0
+    for name in VALIDATORS:
+        validate = getattr(importlib.import_module(name), VALIDATORS[name])
+        lexer = lazy.grammar(name).lexer
+        codes = snippets(name) + [CASES[name](rng.randint(1, 200)) for _ in range(count)]
+        codes += [corrupt(code, rng) for code in codes]
+        for code in codes:
+            for build_ast in (True, False):
+                timings = []
+                phases.configure(timings.append)
+                try:
+                    timed = validate(code, build_ast=build_ast)
+                finally:
+                    phases.configure(None)
+                plain = validate(code, build_ast=build_ast)
+                if timed != plain:
+                    failures += 1
+                    print(f"{name}: result differs with the hook on: {code!r}")
+                timing, = timings
+                parts = timing.lex_sec + timing.parse_sec + timing.action_sec
+                tokens = lex_all(lexer.clone(), code)
+                if parts > timing.total_sec or (plain[0] and timing.tokens != tokens):
+                    failures += 1
+                    print(f"{name}: inconsistent {timing} ({tokens} tokens): {code!r}")
+    print(f"{len(VALIDATORS)} grammars, {failures} failures")
+    return failures
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=list(VALIDATORS))
+    ap.add_argument('-n', '--count', type=int, default=20_000, help='small calls per run')
+    ap.add_argument('--size', type=int, default=20_000, help='items in the large input')
+    ap.add_argument('-r', '--repeat', type=int, default=5)
+    ap.add_argument('--check', action='store_true', help='compare results with the hook on and off')
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    if args.check:
+        return 1 if check(50) else 0
+
+    totals = phases.Totals()
+    print(f"{'grammar':<8}{'input':<7}{'untimed us':>12}{'off us':>10}{'on us':>10}{'off':>8}{'on':>8}")
+    for name in args.grammars:
+        g = lazy.grammar(name).warm_up()
+        validate = getattr(importlib.import_module(name), VALIDATORS[name])
+        for label, codes in inputs(name, args.count, args.size):
+            def untimed():
+                for code in codes:
+                    g._validate(code, True, None)
+
+            def run():
+                for code in codes:
+                    validate(code)
+
+            def timed():
+                phases.configure(totals)
+                try:
+                    run()
+                finally:
+                    phases.configure(None)
+
+            # Interleaved, each first in turn, so drift on the machine and
+            # the garbage the one before leaves hit all three alike
+            times = {untimed: [], run: [], timed: []}
+            order = list(times)
+            for i in range(args.repeat):
+                for func in order[i % 3:] + order[:i % 3]:
+                    times[func].append(best(func, 1))
+            base, off, on = (min(t) for t in times.values())
+            print(f"{name:<8}{label:<7}{base / len(codes) * 1e6:>12.2f}{off / len(codes) * 1e6:>10.2f}"
+                  f"{on / len(codes) * 1e6:>10.2f}{off / base - 1:>+8.1%}{on / base - 1:>+8.1%}")
+    print()
+    totals.report()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,53 @@
+"""Throughput of validate_* with and without AST construction"""
+import argparse
+import importlib
+import time
+
+import memo
+from bench.corpus import SAMPLES
+
+VALIDATORS = {
+    'do': 'validate_python',
+    'p': 'validate_file_operation',
+    'lambda': 'validate_lambda',
+}
+
+
+def snippets(name):
+    """The grammar's sample split into one snippet per line"""
+    return [line for line in SAMPLES[name].splitlines() if line.strip()]
+
+
+def throughput(validate, items, repeat, **kwargs):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for code in items:
+            validate(code, **kwargs)
+        best = min(best, time.perf_counter() - start)
+    return len(items) / best
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__)
+    ap.add_argument('grammars', nargs='*', default=list(VALIDATORS))
+    ap.add_argument('-n', '--count', type=int, default=20_000, help='snippets per run')
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    print(f"{'grammar':<8}{'ast/s':>12}{'recognize/s':>14}{'speedup':>9}")
+    for name in args.grammars:
+        validate = getattr(importlib.import_module(name), VALIDATORS[name])
+        lines = snippets(name)
+        items = (lines * (args.count // len(lines) + 1))[:args.count]
+        validate(items[0])
+        validate(items[0], build_ast=False)
+        full = throughput(validate, items, args.repeat)
+        fast = throughput(validate, items, args.repeat, build_ast=False)
+        print(f"{name:<8}{full:>12,.0f}{fast:>14,.0f}{fast / full:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
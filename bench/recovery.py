@@ -0,0 +1,111 @@
+"""Error recovery (recovery.py) against fixing one error per round trip.
+
+A program of --count statements gets k errors, each on its own line (a
+stray ')' inserted). Without recovery each run reports only the first
+error, so finding all k takes k runs that stop at the error, fixing one
+line each time, and a final run over the clean file: k + 1 parses, which
+build no AST. With recovery one pass reports every error and returns the
+partial AST. Parse work is the number of tokens handed to the parser.
+
+    python -m bench.recovery
+    python -m bench.recovery -g p -k 1,10,100
+"""
+import argparse
+import random
+import re
+import sys
+
+import lazy
+import memo
+import recovery
+from bench import best
+from bench.corpus import SAMPLES
+
+_LINE = re.compile(r'line (\d+)')
+
+
+def program(name, count):
+    """count statements of the grammar's sample, one per line"""
+    lines = SAMPLES[name].splitlines()
+    return [lines[i % len(lines)] for i in range(count)]
+
+
+def inject(lines, k, rng):
+    """A copy of lines with k of them broken, and the broken line numbers"""
+    broken = list(lines)
+    numbers = sorted(rng.sample(range(len(lines)), k))
+    for i in numbers:
+        line = broken[i]
+        spaces = [m.start() for m in re.finditer(' ', line)] or [len(line)]
+        at = rng.choice(spaces)
+        broken[i] = line[:at] + ' )' + line[at:]
+    return broken, [i + 1 for i in numbers]
+
+
+def _counting(lexer, counter):
+    def next_token():
+        token = lexer.token()
+        counter[0] += token is not None
+        return token
+    return next_token
+
+
+def round_trips(name, original, broken):
+    """(parses, tokens, error lines) fixing the first error until none is left"""
+    g = lazy.grammar(name)
+    lines = list(broken)
+    counter = [0]
+    found = []
+    parses = 0
+    while True:
+        lexer = g.lexer.clone()
+        parses += 1
+        ok, message = g._recognize('\n'.join(lines) + '\n', lexer=lexer, tokenfunc=_counting(lexer, counter))
+        if ok:
+            break
+        line = int(_LINE.search(message).group(1))
+        found.append(line)
+        lines[line - 1] = original[line - 1]
+    return parses, counter[0], found
+
+
+def tokens(name, lines):
+    """Tokens in the program: what one pass hands the parser"""
+    lexer = lazy.grammar(name).lexer.clone()
+    lexer.input('\n'.join(lines) + '\n')
+    return sum(1 for _ in iter(lexer.token, None))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('-g', '--grammar', action='append', choices=('do', 'p'))
+    ap.add_argument('-n', '--count', type=int, default=2000, help='statements per program')
+    ap.add_argument('-k', '--errors', default='1,5,20,100', help='comma-separated error counts')
+    ap.add_argument('-r', '--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    failures = 0
+    for name in args.grammar or ['do', 'p']:
+        original = program(name, args.count)
+        print(f"{name}: {args.count:,} statements")
+        print(f"{'k':>5}{'parses':>8}{'tokens':>11}{'ms':>9}   {'tokens':>8}{'ms':>9}{'found':>7}{'speedup':>9}")
+        for k in map(int, args.errors.split(',')):
+            broken, injected = inject(original, k, random.Random(k))
+            parses, trip_tokens, trip_lines = round_trips(name, original, broken)
+            ast, errors = recovery.parse(name, '\n'.join(broken) + '\n')
+            trips = best(lambda: round_trips(name, original, broken), args.repeat)
+            once = best(lambda: recovery.parse(name, '\n'.join(broken) + '\n'), args.repeat)
+            lines = sorted({error.line for error in errors})
+            # Both ways must find exactly the injected lines
+            failures += lines != injected or trip_lines != injected or ast is None
+            print(f"{k:>5}{parses:>8}{trip_tokens:>11,}{trips * 1000:>9.1f}   {tokens(name, broken):>8,}{once * 1000:>9.1f}"
+                  f"{len(lines):>7}{trips / once:>8.1f}x")
+        print()
+    print("round trips: parses, tokens and time | one recovering pass: tokens, time, error lines found")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,62 @@
+"""Parse time against input size for the list-building rules.
+
+Each case grows a statement or element list; per-item time should stay flat
+as the input grows. With --check the exit status is 1 if any grammar's
+per-item time at the largest size exceeds the smallest by more than
+--tolerance.
+"""
+import argparse
+import sys
+import time
+
+import lazy
+import memo
+
+CASES = {
+    'do': lambda n: ''.join(f'x{i} = {i}\n' for i in range(n)),
+    'p': lambda n: 'f.close()\n' * n,
+    'try': lambda n: 'x = 1;\n' * n,
+    'lambda': lambda n: 'lambda x: x + 1;\n' * n,
+    'arr': lambda n: 'let a = [' + ', '.join(['1'] * n) + '];',
+    'dic': lambda n: 'let a = [' + ', '.join(['1'] * n) + '];',
+    'oo': lambda n: 'let a = [' + ', '.join(['1'] * n) + '];',
+}
+
+
+def measure(name, n):
+    grammar = lazy.grammar(name)
+    text = CASES[name](n)
+    start = time.perf_counter()
+    grammar.parse(text)
+    return time.perf_counter() - start
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=list(CASES))
+    ap.add_argument('-n', '--size', type=int, default=100_000, help='largest number of items')
+    ap.add_argument('--steps', type=int, default=4)
+    ap.add_argument('--tolerance', type=float, default=2.0)
+    ap.add_argument('--check', action='store_true')
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    sizes = [args.size >> i for i in reversed(range(args.steps))]
+    failed = []
+    print(f"{'grammar':<10}" + ''.join(f'{n:>12}' for n in sizes) + f"{'ratio':>8}")
+    for name in args.grammars:
+        lazy.grammar(name).warm_up()
+        per_item = [measure(name, n) / n * 1e6 for n in sizes]
+        ratio = per_item[-1] / per_item[0]
+        if ratio > args.tolerance:
+            failed.append(name)
+        print(f"{name:<10}" + ''.join(f'{us:>10.2f}us' for us in per_item) + f"{ratio:>8.2f}")
+
+    if failed:
+        print(f"Superlinear: {', '.join(failed)}")
+    return 1 if args.check and failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Latency of the validation server (server.py) under load.
+
+Starts a server on a temporary Unix socket (or uses --port/--unix of a
+running one), then sends -n requests over --concurrency keep-alive
+connections, cycling through the grammars' sample snippets. Reports
+throughput, p50/p99/max latency of the answered (200) requests and the
+response status counts.
+--baseline also times a fresh `python -c` per validation, for comparison.
+
+    python -m bench.server -n 5000 -c 16
+    python -m bench.server --unix /tmp/afl.sock
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import server
+from bench.recognizer import snippets
+
+
+async def _connect(args):
+    if args.unix:
+        return await asyncio.open_unix_connection(args.unix)
+    return await asyncio.open_connection(args.host, args.port)
+
+
+async def request(reader, writer, grammar, code):
+    """(status, body dict) for one POST on an open connection"""
+    body = code.encode()
+    writer.write(f'POST /validate/{grammar} HTTP/1.1\r\nHost: localhost\r\n'
+                 f'Content-Length: {len(body)}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        key, _, value = line.decode('latin-1').partition(':')
+        if key.lower() == 'content-length':
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+
+async def load(args, work):
+    latencies = []
+    statuses = collections.Counter()
+    work = iter(work)
+
+    async def client():
+        reader, writer = await _connect(args)
+        for grammar, code in work:
+            start = time.perf_counter()
+            status, _ = await request(reader, writer, grammar, code)
+            if status == 200:
+                latencies.append(time.perf_counter() - start)
+            statuses[status] += 1
+        writer.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(args.concurrency)])
+    return time.perf_counter() - start, sorted(latencies), statuses
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def baseline(work, count):
+    """Latencies of a new interpreter per validation"""
+    latencies = []
+    for grammar, code in itertools.islice(work, count):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', 'import sys, batch; '
+                        'print(batch.Validator(sys.argv[1], build_ast=False).validate(sys.argv[2]).valid)',
+                        grammar, code], check=True, capture_output=True)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def _report(label, latencies, seconds=None):
+    rate = f'{len(latencies) / seconds:>10,.0f}/s' if seconds else ' ' * 12
+    print(f'{label:<10}{len(latencies):>8}{rate}{percentile(latencies, .5) * 1e3:>10.2f}'
+          f'{percentile(latencies, .99) * 1e3:>10.2f}{latencies[-1] * 1e3:>10.2f}')
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('-n', '--requests', type=int, default=5000)
+    ap.add_argument('-c', '--concurrency', type=int, default=16)
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, help='use a running server')
+    ap.add_argument('--unix', metavar='PATH', help='use a running server')
+    ap.add_argument('-j', '--workers', type=int, help='workers of the server started here')
+    ap.add_argument('--queue-limit', type=int, help='queue limit of the server started here (default: -c)')
+    ap.add_argument('--baseline', type=int, default=0, metavar='N', help='also time N process-per-validation runs')
+    args = ap.parse_args(argv)
+
+    pairs = [(name, code) for name in server.GRAMMARS for code in snippets(name)]
+    work = list(itertools.islice(itertools.cycle(pairs), args.requests))
+
+    proc = None
+    if args.port is None and args.unix is None:
+        args.unix = os.path.join(tempfile.mkdtemp(), 'afl.sock')
+        cmd = [sys.executable, 'server.py', '--unix', args.unix,
+               '--queue-limit', str(args.queue_limit or args.concurrency)]
+        if args.workers:
+            cmd += ['-j', str(args.workers)]
+        proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, text=True)
+        print(proc.stderr.readline().strip())
+    try:
+        print(f"{'':<10}{'requests':>8}{'rate':>12}{'p50 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        seconds, latencies, statuses = asyncio.run(load(args, work))
+        _report('server', latencies, seconds)
+        if args.baseline:
+            _report('process', baseline(iter(work), args.baseline))
+        print('statuses:', dict(statuses))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
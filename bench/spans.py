@@ -0,0 +1,67 @@
+"""PLY tokens vs offset tokens (spanlex): speed and allocations.
+
+    python -m bench.spans            # tokens/s and KiB allocated per lex
+
+That span tokens equal PLY's is tests/test_spans.py.
+"""
+import argparse
+import sys
+
+import lazy
+import tablecache
+from bench import best, peak
+from bench.corpus import repeated
+from bench.lexers import lex_all
+from spanlex import SpanLexer
+
+
+def measure(name, size, repeat):
+    g = lazy.grammar(name)
+    text = repeated(name, size)
+    span = SpanLexer(g.lexer)
+    count = lex_all(g.lexer, text)
+
+    def keep(lexer):
+        # Hold on to every token, as the parser's symbol stack would
+        lexer.input(text)
+        return lambda: list(iter(lexer.token, None))
+
+    def recognize(lexer):
+        def run():
+            lexer.lineno = 1
+            try:
+                g.recognizer.parse(text, lexer=lexer)
+            except lazy._Rejected:
+                pass
+        return run
+
+    return {
+        'grammar': name,
+        'tokens': count,
+        'ply_tokens_per_sec': count / best(lambda: lex_all(g.lexer, text), repeat),
+        'span_tokens_per_sec': count / best(lambda: lex_all(span, text), repeat),
+        'ply_bytes': peak(keep(g.lexer)),
+        'span_bytes': peak(keep(span)),
+        'ply_recognize_sec': best(recognize(g.lexer), repeat),
+        'span_recognize_sec': best(recognize(span), repeat),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=tablecache.GRAMMARS)
+    ap.add_argument('--size', type=int, default=100_000)
+    ap.add_argument('--repeat', type=int, default=3)
+    args = ap.parse_args(argv)
+
+    print(f"{'grammar':<20}{'PLY tok/s':>12}{'span tok/s':>12}{'PLY KiB':>10}{'span KiB':>10}{'recognize':>11}")
+    for name in args.grammars:
+        r = measure(name, args.size, args.repeat)
+        print(f"{name:<20}{r['ply_tokens_per_sec']:>12,.0f}{r['span_tokens_per_sec']:>12,.0f}"
+              f"{r['ply_bytes'] / 1024:>10,.0f}{r['span_bytes'] / 1024:>10,.0f}"
+              f"{r['ply_recognize_sec'] / r['span_recognize_sec']:>10.2f}x")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
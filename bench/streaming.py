@@ -0,0 +1,68 @@
+"""Streaming validation (streamlex): peak memory against input size.
+
+    python -m bench.streaming                 # peak memory, streamed vs whole
+
+That chunked tokens equal whole-text tokens is tests/test_streaming.py.
+"""
+import argparse
+import mmap
+import sys
+import tempfile
+import time
+
+import do
+import memo
+import streamlex
+from bench import peak
+from bench.corpus import repeated
+
+
+def measure(size, chunk_size):
+    text = repeated('do', size, sep='\n')
+    with tempfile.TemporaryFile() as f:
+        f.write(text.encode())
+        f.flush()
+
+        def whole():
+            f.seek(0)
+            return do.validate_python(f.read().decode(), build_ast=False)
+
+        def streamed():
+            f.seek(0)
+            return do.validate_python_stream(f, chunk_size=chunk_size)
+
+        def mapped():
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                return do.validate_python_stream(m, chunk_size=chunk_size)
+
+        rows = []
+        for label, func in (('whole', whole), ('file', streamed), ('mmap', mapped)):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            assert result == (True, None, []), result
+            # Traced in a run of its own, tracemalloc would slow the timed one
+            nbytes = peak(func)
+            rows.append({'mode': label, 'bytes': len(text), 'peak': nbytes, 'seconds': elapsed})
+        return rows
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--sizes', type=int, nargs='*', default=[250_000, 1_000_000])
+    ap.add_argument('--chunk-size', type=int, default=streamlex.CHUNK_SIZE)
+    args = ap.parse_args(argv)
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+
+    do.grammar.warm_up()
+    do.grammar.recognizer
+    print(f"{'mode':<8}{'input KiB':>12}{'peak KiB':>12}{'seconds':>10}")
+    for size in args.sizes:
+        for r in measure(size, args.chunk_size):
+            print(f"{r['mode']:<8}{r['bytes'] / 1024:>12,.0f}{r['peak'] / 1024:>12,.0f}{r['seconds']:>10.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
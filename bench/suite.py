@@ -0,0 +1,286 @@
+"""The benchmark suite: every grammar module, saved as JSON and compared.
+
+`run` measures, for each grammar in tablecache.GRAMMARS:
+
+    import_sec         importing the module in a fresh interpreter
+    build_tables_sec   building its lexer and parser there, no table cache
+    cached_tables_sec  the same with the tables cached by the first build
+    tokens_per_sec     lexer throughput (bench.corpus sample, repeated)
+    small_parses_per_sec, large_parses_per_sec
+                       parse() of the sample, and of a program of --size
+                       statements (LARGE; one statement with --size
+                       elements where the grammar takes only one)
+    small_peak_bytes, large_peak_bytes
+                       tracemalloc peak during one parse, temporaries
+                       included
+    small_blocks, large_blocks
+                       allocations of one parse still held when it
+                       returns, the AST and what it refers to: the number
+                       of memory blocks (tracemalloc) per parse
+    start_rss_kib, parse_rss_kib
+                       peak RSS of an interpreter with the grammar built,
+                       and after one large parse as well (VmHWM)
+    scaling_us_per_token, scaling_ratio
+                       parse time per token at --size/8 .. --size, and the
+                       largest over the smallest
+
+file.py and for.py take a single statement of fixed shape, so they have no
+large-input metrics. Every input is checked to parse without diagnostics
+first.
+
+Everything runs locally: the inputs are generated from bench.corpus and the
+start-up runs use a temporary table cache. `compare` flags every metric
+that got worse by more than --threshold between two result files and
+exits 1 if there is any. Compare runs from the same machine; on a busy
+one the millisecond timings can move by a third between two runs of the
+same tree, so raise the threshold there.
+
+    python -m bench.suite run -o before.json
+    python -m bench.suite run -o after.json do p --quick
+    python -m bench.suite compare before.json after.json --threshold 0.5
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import diagnostics
+import lazy
+import memo
+import tablecache
+from bench import best, peak
+from bench.corpus import SAMPLES, repeated
+from bench.lexers import lex_all
+from bench.scaling import CASES
+
+
+def _samples(name):
+    return lambda n: '\n'.join([SAMPLES[name]] * n)
+
+
+# One parse each; the file.py sample is four statements, the grammar takes one
+SMALL = dict(SAMPLES, file='f = open("data.txt", "r");')
+
+# Inputs of n items per grammar
+LARGE = dict(
+    CASES,
+    tuple=lambda n: 'const point = (' + ', '.join(['1'] * n) + ');',
+    try1=_samples('try1'),
+    fun=_samples('fun'),
+    tempCodeRunnerFile=_samples('tempCodeRunnerFile'),
+)
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Start-up in a fresh interpreter, the tables cached in argv[2] only:
+# [import seconds, build seconds]
+_START = '''
+import json, sys, time
+start = time.perf_counter()
+import tablecache
+tablecache.cache_dirs = lambda module_file: [sys.argv[2]]
+module = __import__(sys.argv[1])
+imported = time.perf_counter()
+module.grammar.warm_up()
+print(json.dumps([imported - start, time.perf_counter() - imported]))
+'''
+
+# Peak RSS with the grammar built, and after one large parse: [KiB, KiB].
+# Linux carries ru_maxrss over from the parent process, VmHWM starts again
+# at exec
+_RSS = '''
+import json, resource, sys
+import lazy, memo
+from bench.suite import LARGE
+
+def rss():
+    try:
+        with open('/proc/self/status') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM:'))
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+memo.configure(max_entries=0)
+g = lazy.grammar(sys.argv[1]).warm_up()
+text = LARGE[sys.argv[1]](int(sys.argv[2]))
+start = rss()
+g.parse(text)
+print(json.dumps([start, rss()]))
+'''
+
+# Metrics where a larger number is better; for all others smaller is
+_HIGHER_IS_BETTER = ('_per_sec',)
+
+
+def _python(code, *args):
+    out = subprocess.run([sys.executable, '-c', code, *map(str, args)], cwd=_ROOT,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def blocks(func):
+    """Memory blocks allocated by func() and still allocated when it
+    returns, its result kept"""
+    tracemalloc.start()
+    try:
+        result = func()
+        held = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+    del result
+    return sum(stat.count for stat in held.statistics('filename'))
+
+
+def start_up(name, repeat):
+    """(import seconds, table build seconds without and with the cache)"""
+    imports = []
+    build = []
+    cached = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as cache:
+            build.append(_python(_START, name, cache)[1])
+            seconds, tables = _python(_START, name, cache)
+            imports.append(seconds)
+            cached.append(tables)
+    return min(imports), min(build), min(cached)
+
+
+def _check(g, text):
+    with diagnostics.collect() as errors:
+        g.parse(text)
+    if errors:
+        raise ValueError(f"{g.module_name}: benchmark input does not parse: {diagnostics.message(errors[0])}")
+
+
+def measure(name, size, repeat):
+    """All metrics of one grammar"""
+    g = lazy.grammar(name).warm_up()
+    small = SMALL[name]
+    _check(g, small)
+    import_sec, build_sec, cached_sec = start_up(name, repeat)
+    text = repeated(name, size * 10)
+    tokens = lex_all(g.lexer, text)
+    row = {
+        'import_sec': import_sec,
+        'build_tables_sec': build_sec,
+        'cached_tables_sec': cached_sec,
+        'tokens_per_sec': tokens / best(lambda: lex_all(g.lexer, text), repeat),
+        'small_parses_per_sec': 200 / best(lambda: [g.parse(small) for _ in range(200)], repeat),
+        'small_peak_bytes': peak(lambda: g.parse(small)),
+        'small_blocks': blocks(lambda: g.parse(small)),
+    }
+    if name not in LARGE:
+        return row
+
+    large = LARGE[name](size)
+    _check(g, large)
+    start_rss, parse_rss = _python(_RSS, name, size)
+    scaling = []
+    for n in [size >> i for i in (3, 2, 1, 0)]:
+        text = LARGE[name](n)
+        scaling.append(best(lambda: g.parse(text), repeat) / lex_all(g.lexer, text) * 1e6)
+    row.update({
+        'large_parses_per_sec': 1 / best(lambda: g.parse(large), repeat),
+        'large_peak_bytes': peak(lambda: g.parse(large)),
+        'large_blocks': blocks(lambda: g.parse(large)),
+        'start_rss_kib': start_rss,
+        'parse_rss_kib': parse_rss,
+        'scaling_us_per_token': scaling,
+        'scaling_ratio': scaling[-1] / scaling[0],
+    })
+    return row
+
+
+def run(args):
+    # Measure parsing, not the result cache
+    memo.configure(max_entries=0)
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'ply': tablecache.ply.__version__,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'size': args.size,
+            'repeat': args.repeat,
+        },
+        'grammars': {},
+    }
+    print(f"{'grammar':<20}{'import ms':>10}{'build ms':>9}{'cached ms':>10}{'tokens/s':>11}{'small/s':>9}"
+          f"{'large/s':>9}{'peak KiB':>10}{'blocks':>9}{'RSS KiB':>9}{'scaling':>8}")
+    for name in args.grammars:
+        r = results['grammars'][name] = measure(name, args.size, args.repeat)
+        line = (f"{name:<20}{r['import_sec'] * 1000:>10.1f}{r['build_tables_sec'] * 1000:>9.1f}"
+                f"{r['cached_tables_sec'] * 1000:>10.1f}{r['tokens_per_sec']:>11,.0f}"
+                f"{r['small_parses_per_sec']:>9,.0f}")
+        if 'large_parses_per_sec' in r:
+            line += (f"{r['large_parses_per_sec']:>9.1f}{r['large_peak_bytes'] / 1024:>10,.0f}"
+                     f"{r['large_blocks']:>9,}{r['parse_rss_kib']:>9,}{r['scaling_ratio']:>8.2f}")
+        print(line)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+def regressions(before, after, threshold):
+    """(grammar, metric, before, after, change) for every metric that got
+    worse by more than threshold, a fraction"""
+    found = []
+    for name, old in before['grammars'].items():
+        new = after['grammars'].get(name)
+        if new is None:
+            continue
+        for metric, a in old.items():
+            b = new.get(metric)
+            if not isinstance(a, (int, float)) or not isinstance(b, (int, float)) or not a:
+                continue
+            change = (b - a) / a
+            worse = -change if metric.endswith(_HIGHER_IS_BETTER) else change
+            if worse > threshold:
+                found.append((name, metric, a, b, change))
+    return found
+
+
+def compare(args):
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    found = regressions(before, after, args.threshold)
+    for name, metric, a, b, change in found:
+        print(f"REGRESSION {name:<20}{metric:<24}{a:>14,.3f} -> {b:>14,.3f}  ({change:+.0%})")
+    missing = sorted(set(before['grammars']) - set(after['grammars']))
+    if missing:
+        print(f"Not in {args.after}: {', '.join(missing)}")
+    print(f"{len(found)} regressions beyond {args.threshold:.0%}")
+    return 1 if found else 0
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = ap.add_subparsers(dest='command', required=True)
+    r = commands.add_parser('run', help='measure and optionally save as JSON')
+    r.add_argument('grammars', nargs='*', default=list(tablecache.GRAMMARS))
+    r.add_argument('-o', '--output', help='JSON file to write')
+    r.add_argument('--size', type=int, default=20_000, help='statements (or elements) in the large input')
+    r.add_argument('-r', '--repeat', type=int, default=3)
+    r.add_argument('--quick', action='store_true', help='--size 4000 --repeat 1')
+    c = commands.add_parser('compare', help='flag regressions between two runs')
+    c.add_argument('before')
+    c.add_argument('after')
+    c.add_argument('--threshold', type=float, default=0.3, help='fraction, default 0.3')
+    args = ap.parse_args(argv)
+    if args.command == 'compare':
+        return compare(args)
+    if args.quick:
+        args.size, args.repeat = 4_000, 1
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
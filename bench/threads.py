@@ -0,0 +1,126 @@
+"""Many threads validating at once must give exactly the serial results.
+
+Every item (the grammars' sample snippets, longer programs and corrupted
+copies with syntax and lexer errors) is first run serially. Then --threads
+threads each run all items in their own shuffled order, with a tiny switch
+interval so they interleave mid-parse. Each result (AST or recognize
+answer, plus the diagnostics it recorded) must equal the serial one. Runs
+with the result cache on and off, and through batch.validate_many.
+
+    python -m bench.threads
+    python -m bench.threads --threads 32 --rounds 3
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+
+import batch
+import diagnostics
+import lazy
+import memo
+from bench.recognizer import snippets
+
+GRAMMARS = ('do', 'p', 'lambda', 'arr', 'tuple', 'for')
+
+
+def corrupt(code, rng):
+    i = rng.randrange(len(code))
+    return rng.choice((code[:i] + code[i + 1:], code[:i] + '@' + code[i:], code[:i]))
+
+
+def items(seed=0):
+    rng = random.Random(seed)
+    work = []
+    for name in GRAMMARS:
+        lines = snippets(name)
+        for code in lines + ['\n'.join(lines) * 3]:
+            work.append((name, code))
+            work.extend((name, corrupt(code, rng)) for _ in range(3))
+    return work
+
+
+def run_one(name, code, mode):
+    g = lazy.grammar(name)
+    with diagnostics.collect() as errors:
+        try:
+            value = g.parse(code) if mode == 'parse' else g.recognize(code)
+        except Exception as e:
+            value = f'{type(e).__name__}: {e}'
+    return repr(value), errors
+
+
+def run_all(work, mode, order):
+    return {i: run_one(*work[i], mode) for i in order}
+
+
+def run_batches(work, order):
+    results = {}
+    for name in GRAMMARS:
+        indexes = [i for i in order if work[i][0] == name]
+        for build_ast in (True, False):
+            for i, result in zip(indexes, batch.validate_many((work[i][1] for i in indexes), name, build_ast)):
+                results[i, build_ast] = repr(result.value), result.errors
+    return results
+
+
+def stress(work, threads, run):
+    """Run run(order) in each thread; the results per thread"""
+    results = [None] * threads
+    errors = []
+
+    def target(k):
+        order = list(range(len(work)))
+        random.Random(k).shuffle(order)
+        try:
+            results[k] = run(order)
+        except BaseException as e:
+            errors.append(e)
+
+    pool = [threading.Thread(target=target, args=(k,)) for k in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    if errors:
+        raise errors[0]
+    return results
+
+
+def check(threads, rounds):
+    work = items()
+    lazy.warm_up(*GRAMMARS)
+    failed = 0
+    for cache in (True, False):
+        memo.configure(max_entries=memo.MAX_ENTRIES if cache else 0)
+        runs = {f'{mode}': (lambda order, mode=mode: run_all(work, mode, order)) for mode in ('parse', 'recognize')}
+        runs['batch'] = lambda order: run_batches(work, order)
+        for label, run in runs.items():
+            memo.clear()
+            expected = run(range(len(work)))
+            start = time.perf_counter()
+            mismatches = 0
+            for _ in range(rounds):
+                memo.clear()
+                for result in stress(work, threads, run):
+                    mismatches += sum(result[key] != value for key, value in expected.items())
+            seconds = time.perf_counter() - start
+            failed += mismatches
+            print(f"{'cache' if cache else 'no cache':<10}{label:<11}{threads:>4} threads x {len(expected)} items "
+                  f"x {rounds}: {mismatches} mismatches ({seconds:.1f}s)")
+    return failed
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--threads', type=int, default=32)
+    ap.add_argument('--rounds', type=int, default=5)
+    args = ap.parse_args(argv)
+    # Switch threads as often as possible, so parses interleave
+    sys.setswitchinterval(1e-6)
+    return 1 if check(args.threads, args.rounds) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Lexer and parser errors as records instead of printed lines.
+
+Every grammar module's t_error and p_error hand their error to lex_error()
+/ syntax_error(), which append a Diagnostic to the list of the innermost
+collect() open on this thread. LazyGrammar.parse() and recognize() open
+one around each parse, so the records also carry the tokens the parser
+would have accepted; callers open their own to get the list:
+
+    with diagnostics.collect() as errors:
+        ast = do.grammar.parse(code)
+    diagnostics.report(errors)      # optional: print them, as p_error did
+
+A collect() passes its records on to the enclosing one when it closes.
+Errors outside any collect() are not kept. Nothing here prints while the
+lexer or parser runs; report() is called on the finished list.
+"""
+import collections
+import sys
+import threading
+
+Diagnostic = collections.namedtuple('Diagnostic', 'kind token line column expected')
+Diagnostic.__doc__ = """One error: kind is 'lex', 'indent' or 'syntax', token the illegal
+character or the offending token's value (None at end of input or for an
+indent error), column 1-based (None if unknown), expected the token types
+the parser could have taken there"""
+
+_local = threading.local()
+
+
+class collect:
+    """Context manager: a list that gets the Diagnostics recorded inside.
+
+    parser and lexer are the ones about to run, for the expected tokens
+    and the position of an error at end of input.
+    """
+    __slots__ = ('errors', 'parser', 'lexer', '_outer')
+
+    def __init__(self, parser=None, lexer=None):
+        self.errors = []
+        self.parser = parser
+        self.lexer = lexer
+
+    def __enter__(self):
+        self._outer = getattr(_local, 'current', None)
+        _local.current = self
+        return self.errors
+
+    def __exit__(self, *exc):
+        _local.current = outer = self._outer
+        if outer is not None and self.errors:
+            outer.errors.extend(self.errors)
+
+
+def current():
+    """The innermost collect() open on this thread, or None"""
+    return getattr(_local, 'current', None)
+
+
+def replay(errors):
+    """Record Diagnostics kept from an earlier parse, e.g. by the cache"""
+    current = getattr(_local, 'current', None)
+    if current is not None:
+        current.errors.extend(errors)
+
+
+def shifts(parser, states, type):
+    """Whether a `type` token is shifted (after any reductions) from the
+    LR state stack `states`"""
+    action, goto, productions = parser.action, parser.goto, parser.productions
+    states = list(states)
+    while True:
+        act = action[states[-1]].get(type)
+        if act is None:
+            return False
+        if act >= 0:
+            return True
+        production = productions[-act]
+        if production.len:
+            del states[-production.len:]
+        states.append(goto[states[-1]][production.name])
+
+
+# Shift-only action rows: their expected tokens do not depend on the stack.
+# Keyed by id(row), the row kept in the value so the id stays its own
+_shift_rows = {}
+
+
+def _expected(parser):
+    """Token types the parser can take in the state of its error"""
+    row = parser.action[parser.state]
+    cached = _shift_rows.get(id(row))
+    if cached is not None:
+        return cached[1]
+    if all(act > 0 for act in row.values()):
+        expected = tuple(sorted(t for t in row if t != 'error'))
+        _shift_rows[id(row)] = (row, expected)
+        return expected
+    # A reduce state's lookaheads are merged from every context it is used
+    # in (LALR); keep the ones this stack shifts
+    states = parser.statestack
+    return tuple(sorted(t for t in row if t != 'error' and shifts(parser, states, t)))
+
+
+def _column(data, pos):
+    if data is None or pos > len(data):
+        return None
+    newline = b'\n' if isinstance(data, (bytes, bytearray)) else '\n'
+    return pos - data.rfind(newline, 0, pos)
+
+
+def lex_error(t):
+    """Record the illegal character at t, a token passed to t_error"""
+    current = getattr(_local, 'current', None)
+    if current is None:
+        return
+    data = t.lexer.lexdata
+    char = data[t.lexpos:t.lexpos + 1]
+    if not isinstance(char, str):
+        char = bytes(char).decode('utf-8', 'replace')
+    current.errors.append(Diagnostic('lex', char, t.lexer.lineno, _column(data, t.lexpos), ()))
+
+
+def indent_error(token, lexer):
+    """Record a dedent to a width no enclosing block has, at the first
+    token of the line (see indentlex)"""
+    current = getattr(_local, 'current', None)
+    if current is None:
+        return
+    column = _column(lexer.lexdata, token.lexpos - getattr(lexer, 'lexbase', 0))
+    current.errors.append(Diagnostic('indent', None, token.lineno, column, ()))
+
+
+def syntax_error(token):
+    """Record a syntax error at token (None at end of input), as passed
+    to p_error"""
+    current = getattr(_local, 'current', None)
+    if current is None:
+        return
+    if token is None and current.errors and current.errors[-1].kind == 'syntax' and current.errors[-1].token is None:
+        # Recovery can stop at the end of input more than once
+        return
+    parser = current.parser
+    expected = () if parser is None else _expected(parser)
+    if token is None:
+        lexer = current.lexer
+        data = getattr(lexer, 'lexdata', None)
+        line = getattr(lexer, 'lineno', None)
+        column = None if data is None else _column(data, len(data))
+        current.errors.append(Diagnostic('syntax', None, line, column, expected))
+        return
+    lexer = getattr(token, 'lexer', None)
+    # Streamed tokens count from the start of the stream, lexdata is the
+    # current window (see streamlex)
+    pos = token.lexpos - getattr(lexer, 'lexbase', 0)
+    column = _column(getattr(lexer, 'lexdata', None), pos)
+    current.errors.append(Diagnostic('syntax', token.value, token.lineno, column, expected))
+
+
+def message(error):
+    """The message p_error and t_error used to print for error"""
+    if error.kind == 'lex':
+        return f"Illegal character '{error.token}' at line {error.line}"
+    if error.kind == 'indent':
+        return f"Unindent does not match any outer indentation level at line {error.line}"
+    if error.token is None:
+        return "Syntax error at EOF"
+    if error.token == '\n':
+        # indentlex's NEWLINE
+        return f"Syntax error at end of line {error.line}"
+    return f"Syntax error at '{error.token}', line {error.line}"
+
+
+def report(errors, file=None):
+    """Print one line per Diagnostic"""
+    file = sys.stdout if file is None else file
+    for error in errors:
+        print(message(error), file=file)
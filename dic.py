@@ -1,6 +1,6 @@
 import re
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
 import ast  # To safely evaluate input dictionary from user
 
 # List of token names
@@ -53,10 +53,12 @@ def t_NONE(t):
 t_ignore = ' \t'
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Define precedence and associativity
 precedence = (
@@ -86,7 +88,8 @@ def p_elements(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_value(p):
     '''value : NUMBER
@@ -101,12 +104,7 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    if p:
-        print("Syntax error at token:", p.value)
-    else:
-        print("Syntax error at EOF")
-
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 # Validation function for dictionary input
 def validate_dict(data):
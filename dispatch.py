@@ -0,0 +1,127 @@
+"""Send each input to the grammar it is written in.
+
+A single regex over the first few tokens picks the candidates:
+
+    let/const/var NAME = [        arr
+    let/const/var NAME = (        tuple
+    let/const/var ...             arr, tuple
+    lambda                        lambda
+    for NAME in range             for, do
+    NAME = open                   p, file
+    NAME.read/.write/.close       p, file, do
+    anything else                 do
+
+The candidates are tried in order with the recognizer (no AST, stop at
+the first error) until one accepts the input without syntax or lexer
+errors. An input accepted by a later candidate than the first counts as a
+misroute. The default dispatcher keeps these counts:
+
+    result = dispatch.validate('let xs = [1, 2];')
+    result.grammar, result.valid    # ('arr', True)
+    dispatch.stats()                # {'inputs': 1, 'attempts': 1, ...}
+"""
+import collections
+import re
+import threading
+
+import diagnostics
+import lazy
+
+_NAME = r'[A-Za-z_][A-Za-z0-9_]*'
+_PREFIX = re.compile(rf"""\s*(?:
+      (?P<arr>(?:let|const|var)\s+{_NAME}\s*=\s*\[)
+    | (?P<tuple>(?:let|const|var)\s+{_NAME}\s*=\s*\()
+    | (?P<declaration>(?:let|const|var)\b)
+    | (?P<lambda>lambda\b)
+    | (?P<range>for\s+{_NAME}\s+in\s+range\b)
+    | (?P<open>{_NAME}\s*=\s*open\b)
+    | (?P<method>{_NAME}\s*\.\s*(?:read|write|close)\b)
+)""", re.VERBOSE)
+
+# Candidates per prefix, in the order they are tried
+ROUTES = {
+    'arr': ('arr',),
+    'tuple': ('tuple',),
+    'declaration': ('arr', 'tuple'),
+    'lambda': ('lambda',),
+    'range': ('for', 'do'),
+    'open': ('p', 'file'),
+    'method': ('p', 'file', 'do'),
+    None: ('do',),
+}
+
+Result = collections.namedtuple('Result', 'grammar valid value errors attempts')
+Result.__doc__ = """One dispatched input: grammar is the one that accepted it (the first
+candidate if none did), errors that grammar's Diagnostics, attempts the
+number of grammars tried"""
+
+
+def attempt(name, code):
+    """(accepted, errors) of one grammar's recognizer on code"""
+    with diagnostics.collect() as errors:
+        lazy.grammar(name).recognize(code)
+    return not errors, errors
+
+
+class Dispatcher:
+    """Routes inputs and counts how well the routing does"""
+
+    def __init__(self, routes=ROUTES):
+        self.routes = routes
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def route(self, code):
+        """The candidate grammars for code, most likely first"""
+        m = _PREFIX.match(code)
+        return self.routes[m.lastgroup if m else None]
+
+    def validate(self, code, build_ast=False):
+        """Result for code; with build_ast the accepting grammar's parse()
+        result is the value"""
+        candidates = self.route(code)
+        first = None
+        for attempts, name in enumerate(candidates, 1):
+            valid, errors = attempt(name, code)
+            if first is None:
+                first = name, errors
+            if valid:
+                break
+        else:
+            name, errors = first
+        value = lazy.grammar(name).parse(code) if valid and build_ast else None
+        with self._lock:
+            self.inputs += 1
+            self.attempts += attempts
+            self.routed[name] += 1
+            if not valid:
+                self.rejected += 1
+            elif attempts > 1:
+                self.misroutes += 1
+        return Result(name, valid, value, errors, attempts)
+
+    def stats(self):
+        with self._lock:
+            return {'inputs': self.inputs, 'attempts': self.attempts, 'misroutes': self.misroutes,
+                    'rejected': self.rejected, 'routed': dict(self.routed),
+                    'attempts_per_input': self.attempts / self.inputs if self.inputs else 0.0}
+
+    def reset_stats(self):
+        with self._lock:
+            self.inputs = self.attempts = self.misroutes = self.rejected = 0
+            self.routed = collections.Counter()
+
+
+DISPATCHER = Dispatcher()
+
+
+def route(code):
+    return DISPATCHER.route(code)
+
+
+def validate(code, build_ast=False):
+    return DISPATCHER.validate(code, build_ast)
+
+
+def stats():
+    return DISPATCHER.stats()
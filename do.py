@@ -1,5 +1,12 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import indentlex
+import lazy
+import recovery
+import reserved_words
+from nodes import (
+    Program, If, Elif, Else, While, For, FunctionDef, ClassDef,
+    Operation, Unary, Atom, Attribute, Assign, Return, Pass, Invalid, to_dict,
+)
 
 # Tokens
 tokens = (
@@ -8,6 +15,7 @@ tokens = (
     'LPAREN', 'RPAREN', 'LBRACE', 'RBRACE', 'COLON',
     'PLUS', 'MINUS', 'TIMES', 'DIVIDE', 'MODULO', 'POWER',
     'NONE', 'BOOLEAN', 'COMMA', 'DOT',
+    'NEWLINE', 'INDENT', 'DEDENT',  # Only from indentlex.layout
 )
 
 # Precedence rules to resolve shift/reduce conflicts
@@ -47,24 +55,7 @@ def t_newline(t):
     t.lexer.lineno += len(t.value)
 
 # Keywords
-keywords = {
-    'while': 'WHILE',
-    'def': 'DEF',
-    'class': 'CLASS',
-    'if': 'IF',
-    'elif': 'ELIF',
-    'else': 'ELSE',
-    'for': 'FOR',
-    'in': 'IN',
-    'return': 'RETURN',
-    'pass': 'PASS',
-    'True': 'BOOLEAN',
-    'False': 'BOOLEAN',
-    'None': 'NONE',
-    'and': 'LOGICAL',
-    'or': 'LOGICAL',
-    'not': 'LOGICAL'
-}
+keywords = reserved_words.PYTHON
 
 def t_NUMBER(t):
     r'\d*\.\d+|\d+'
@@ -81,16 +72,20 @@ def t_IDENTIFIER(t):
     return t
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Create lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
+
+# Error recovery skips the rest of a bad line, or up to one of these
+SYNC_TOKENS = ('RBRACE', 'COLON')
 
 # Parser rules
 def p_program(p):
     '''program : statements'''
-    p[0] = {'type': 'program', 'body': p[1]}
+    p[0] = Program(p[1])
 
 def p_statements(p):
     '''statements : statement
@@ -98,7 +93,9 @@ def p_statements(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[2]]
+        # Left recursion hands us the list built so far; extend it in place
+        p[1].append(p[2])
+        p[0] = p[1]
 
 def p_statement(p):
     '''statement : simple_stmt
@@ -132,49 +129,93 @@ def p_if_stmt(p):
     '''if_stmt : IF test COLON suite
                | IF test COLON suite else_block'''
     if len(p) == 5:
-        p[0] = {'type': 'if', 'test': p[2], 'body': p[4]}
+        p[0] = If(p[2], p[4])
     else:
-        p[0] = {'type': 'if', 'test': p[2], 'body': p[4], 'else': p[5]}
+        p[0] = If(p[2], p[4], p[5])
 
 def p_else_block(p):
     '''else_block : ELSE COLON suite
                  | ELIF test COLON suite
                  | ELIF test COLON suite else_block'''
     if len(p) == 4:
-        p[0] = {'type': 'else', 'body': p[3]}
+        p[0] = Else(p[3])
     elif len(p) == 5:
-        p[0] = {'type': 'elif', 'test': p[2], 'body': p[4]}
+        p[0] = Elif(p[2], p[4])
     else:
-        p[0] = {'type': 'elif', 'test': p[2], 'body': p[4], 'else': p[5]}
+        p[0] = Elif(p[2], p[4], p[5])
 
 def p_while_stmt(p):
     '''while_stmt : WHILE test COLON suite'''
-    p[0] = {'type': 'while', 'test': p[2], 'body': p[4]}
+    p[0] = While(p[2], p[4])
 
 def p_for_stmt(p):
     '''for_stmt : FOR IDENTIFIER IN expr COLON suite'''
-    p[0] = {'type': 'for', 'target': p[2], 'iter': p[4], 'body': p[6]}
+    p[0] = For(p[2], p[4], p[6])
 
 def p_function_def(p):
     '''function_def : DEF IDENTIFIER LPAREN parameter_list RPAREN COLON suite'''
-    p[0] = {'type': 'function', 'name': p[2], 'params': p[4], 'body': p[7]}
+    p[0] = FunctionDef(p[2], p[4], p[7])
 
 def p_class_def(p):
     '''class_def : CLASS IDENTIFIER COLON suite
                 | CLASS IDENTIFIER LPAREN parameter_list RPAREN COLON suite'''
     if len(p) == 5:
-        p[0] = {'type': 'class', 'name': p[2], 'body': p[4]}
+        p[0] = ClassDef(p[2], p[4])
     else:
-        p[0] = {'type': 'class', 'name': p[2], 'bases': p[4], 'body': p[7]}
+        p[0] = ClassDef(p[2], p[7], bases=p[4])
 
 def p_suite(p):
     '''suite : simple_stmt
-            | LBRACE statements RBRACE'''
+            | LBRACE statements RBRACE
+            | NEWLINE INDENT statements DEDENT'''
     if len(p) == 2:
         p[0] = [p[1]]
+    elif len(p) == 4:
+        p[0] = p[2]
     else:
+        p[0] = p[3]
+
+# Error recovery: a bad statement, suite or compound header is replaced by
+# an Invalid placeholder, see recovery.resume
+def p_statement_error(p):
+    '''statement : error'''
+    p[0] = Invalid(p[1].lineno)
+    recovery.resume(p)
+
+def p_suite_error(p):
+    '''suite : error'''
+    p[0] = [Invalid(p[1].lineno)]
+    recovery.resume(p)
+
+def p_header_error(p):
+    '''header_error : error COLON'''
+    p[0] = Invalid(p[1].lineno)
+    recovery.resume(p)
+
+def p_compound_error(p):
+    '''compound_stmt : IF header_error suite
+                    | IF header_error suite else_block
+                    | WHILE header_error suite
+                    | FOR header_error suite
+                    | DEF header_error suite
+                    | CLASS header_error suite'''
+    if p[1] == 'if':
+        p[0] = If(p[2], p[3], p[4] if len(p) == 5 else None)
+    elif p[1] == 'while':
+        p[0] = While(p[2], p[3])
+    else:
+        p[2].body = p[3]
         p[0] = p[2]
 
+def p_else_block_error(p):
+    '''else_block : ELSE header_error suite
+                 | ELIF header_error suite
+                 | ELIF header_error suite else_block'''
+    if p[1] == 'else':
+        p[0] = Else(p[3])
+    else:
+        p[0] = Elif(p[2], p[3], p[4] if len(p) == 5 else None)
+
 def p_parameter_list(p):
     '''parameter_list : parameters
                      | empty'''
@@ -186,7 +227,8 @@ def p_parameters(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_test(p):
     '''test : expr
@@ -195,7 +237,7 @@ def p_test(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'type': 'operation', 'op': p[2], 'left': p[1], 'right': p[3]}
+        p[0] = Operation(p[2], p[1], p[3])
 
 def p_expr(p):
     '''expr : term
@@ -204,7 +246,7 @@ def p_expr(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'type': 'operation', 'op': p[2], 'left': p[1], 'right': p[3]}
+        p[0] = Operation(p[2], p[1], p[3])
 
 def p_term(p):
     '''term : factor
@@ -214,7 +256,7 @@ def p_term(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'type': 'operation', 'op': p[2], 'left': p[1], 'right': p[3]}
+        p[0] = Operation(p[2], p[1], p[3])
 
 def p_factor(p):
     '''factor : PLUS factor
@@ -223,7 +265,7 @@ def p_factor(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'type': 'unary', 'op': p[1], 'operand': p[2]}
+        p[0] = Unary(p[1], p[2])
 
 def p_power(p):
     '''power : atom
@@ -231,7 +273,7 @@ def p_power(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {'type': 'operation', 'op': p[2], 'left': p[1], 'right': p[3]}
+        p[0] = Operation(p[2], p[1], p[3])
 
 def p_atom(p):
     '''atom : IDENTIFIER
@@ -242,48 +284,66 @@ def p_atom(p):
             | LPAREN expr RPAREN
             | atom DOT IDENTIFIER'''
     if len(p) == 2:
-        p[0] = {'type': 'atom', 'value': p[1]}
+        p[0] = Atom(p[1])
     elif len(p) == 4 and p[1] == '(':
         p[0] = p[2]
     else:
-        p[0] = {'type': 'attribute', 'object': p[1], 'attr': p[3]}
+        p[0] = Attribute(p[1], p[3])
 
 def p_assignment(p):
     '''assignment : IDENTIFIER ASSIGN expr'''
-    p[0] = {'type': 'assign', 'target': p[1], 'value': p[3]}
+    p[0] = Assign(p[1], p[3])
 
 def p_return_stmt(p):
     '''return_stmt : RETURN
                   | RETURN expr'''
     if len(p) == 2:
-        p[0] = {'type': 'return', 'value': None}
+        p[0] = Return()
     else:
-        p[0] = {'type': 'return', 'value': p[2]}
+        p[0] = Return(p[2])
 
 def p_pass_stmt(p):
     '''pass_stmt : PASS'''
-    p[0] = {'type': 'pass'}
+    p[0] = Pass()
 
 def p_empty(p):
     'empty :'
     pass
 
 def p_error(p):
-    if p:
-        print(f"Syntax error at '{p.value}', line {p.lineno}")
-    else:
-        print("Syntax error at EOF")
+    return recovery.syntax_error(p, SYNC_TOKENS)
+
+def _layout(indent):
+    return indentlex.layout if indent else None
+
+def validate_python(code, build_ast=True, indent=False):
+    """Validate Python code: (valid, AST, errors).
+
+    errors lists a diagnostics.Diagnostic per lexer and syntax error, and
+    the code is valid if there are none; statements that could not be
+    parsed are Invalid nodes in the AST. With build_ast=False the grammar
+    runs without actions and stops at the first syntax error; the AST is
+    None. Blocks are braced; with indent=True they may also be indented
+    as in Python (see indentlex).
+    """
+    return grammar.validate(code, build_ast, _layout(indent))
+
+def validate_python_stream(stream, build_ast=False, chunk_size=None, indent=False):
+    """validate_python() for a file object or mmap, read in chunks.
+
+    Defaults to build_ast=False: without an AST, memory does not grow
+    with the size of the input.
+    """
+    return grammar.validate_stream(stream, chunk_size, build_ast, _layout(indent))
 
-# Create parser
-parser = yacc.yacc()
+def recover_python(code, indent=False):
+    """Parse code past syntax errors, reporting all of them in one pass.
 
-def validate_python(code):
-    """Validate Python code and return the AST if valid"""
-    try:
-        ast = parser.parse(code)
-        return True, ast
-    except Exception as e:
-        return False, str(e)
+    Returns (partial AST, errors): errors lists a diagnostics.Diagnostic
+    for every lexer and syntax error, and statements that could not be
+    parsed are Invalid nodes in the AST.
+    """
+    return recovery.parse(__name__, code, _layout(indent))
 
 def main():
     while True:
@@ -298,13 +358,15 @@ def main():
                 if not code:
                     continue
                 
-                is_valid, result = validate_python(code)
+                is_valid, result, errors = validate_python(code)
+                diagnostics.report(errors)
                 if is_valid:
                     print("Valid Python syntax!")
-                    print("AST:", result)
+                    print("AST:", to_dict(result))
                 else:
                     print("Invalid Python syntax!")
-                    print("Error:", result)
+                    if isinstance(result, str):
+                        print("Error:", result)
             elif choice == '2':
                 break
             else:
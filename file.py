@@ -1,5 +1,6 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+import reserved_words
 
 # List of token names
 tokens = (
@@ -18,7 +19,6 @@ tokens = (
 )
 
 # Regular expression rules for simple tokens
-t_IDENTIFIER = r'[a-zA-Z_][a-zA-Z0-9_]*'
 t_ASSIGN = r'='
 t_LPAREN = r'\('
 t_RPAREN = r'\)'
@@ -27,20 +27,11 @@ t_SEMICOLON = r';'
 t_DOT = r'\.'  # Define DOT token
 
 # Keywords for file operations
-def t_OPEN(t):
-    r'open'
-    return t
-
-def t_READ(t):
-    r'read'
-    return t
+keywords = reserved_words.FILE_OPERATIONS
 
-def t_WRITE(t):
-    r'write'
-    return t
-
-def t_CLOSE(t):
-    r'close'
+def t_IDENTIFIER(t):
+    r'[a-zA-Z_][a-zA-Z0-9_]*'
+    t.type = keywords.get(t.value, 'IDENTIFIER')
     return t
 
 # Strings enclosed in double quotes
@@ -52,10 +43,12 @@ def t_STRING(t):
 t_ignore = ' \t'
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parsing rules
 def p_statement(p):
@@ -71,12 +64,7 @@ def p_file_operation(p):
     p[0] = "Valid file operation"
 
 def p_error(p):
-    if p:
-        print("Syntax error at token:", p.value)
-    else:
-        print("Syntax error at EOF")
-
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 # Main function to prompt user input and validate it
 if __name__ == '__main__':
@@ -91,7 +79,9 @@ if __name__ == '__main__':
             break
         if not s:
             continue
-        result = parser.parse(s)
+        with diagnostics.collect() as errors:
+            result = grammar.parse(s)
+        diagnostics.report(errors)
         if result == "Valid":
             print("Valid syntax\n")
         else:
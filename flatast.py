@@ -0,0 +1,457 @@
+"""Flat, array-backed AST for the do.py grammar.
+
+An alternative sink for do.py's parser: the same LALR tables drive a second
+set of reduction actions that append nodes to parallel typed arrays instead
+of creating node objects. A node is an integer id indexing
+
+    kind[id]    kind code, see KINDS
+    value[id]   index into the interned `values` table, or -1
+    first[id]   offset of the node's children in `edges`
+    count[id]   number of children
+    start[id]   source offset of the node's first character (-1 if none)
+    end[id]     source offset just past its last character
+
+Identifiers, operators and literals are interned once in `values`. The whole
+tree serialises to one bytes buffer (to_bytes/from_bytes) that another
+process can map without unpacking it.
+"""
+import argparse
+import json
+import struct
+import sys
+import threading
+from array import array
+
+import diagnostics
+import lazy
+
+KINDS = (
+    'program', 'block', 'if', 'elif', 'else', 'while', 'for', 'function',
+    'class', 'params', 'name', 'operation', 'unary', 'atom', 'attribute',
+    'assign', 'return', 'pass',
+)
+(PROGRAM, BLOCK, IF, ELIF, ELSE, WHILE, FOR, FUNCTION, CLASS, PARAMS, NAME,
+ OPERATION, UNARY, ATOM, ATTRIBUTE, ASSIGN, RETURN, PASS) = range(len(KINDS))
+
+_MAGIC = b'FAST'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIIIII')   # magic, version, nodes, edges, root, values bytes
+_COLUMNS = ('value', 'first', 'count', 'start', 'end')
+
+
+class FlatAST:
+    """Nodes stored column-wise; node ids index the columns"""
+
+    def __init__(self, kind, value, first, count, start, end, edges, values, root):
+        self.kind = kind
+        self.value = value
+        self.first = first
+        self.count = count
+        self.start = start
+        self.end = end
+        self.edges = edges
+        self.values = values
+        self.root = root
+
+    def __len__(self):
+        return len(self.kind)
+
+    def kind_name(self, node):
+        return KINDS[self.kind[node]]
+
+    def value_of(self, node):
+        index = self.value[node]
+        return None if index < 0 else self.values[index]
+
+    def child(self, node, i):
+        return self.edges[self.first[node] + i]
+
+    def children(self, node):
+        edges = self.edges
+        first = self.first[node]
+        for i in range(first, first + self.count[node]):
+            yield edges[i]
+
+    def walk(self, node=None):
+        """Node ids in preorder, iteratively"""
+        edges, first, count = self.edges, self.first, self.count
+        stack = [self.root if node is None else node]
+        while stack:
+            node = stack.pop()
+            yield node
+            f = first[node]
+            stack.extend(edges[i] for i in range(f + count[node] - 1, f - 1, -1))
+
+    def cursor(self, node=None):
+        return Cursor(self, self.root if node is None else node)
+
+    def nbytes(self):
+        """Size of the node columns and edge table in bytes"""
+        columns = [self.kind, self.edges] + [getattr(self, name) for name in _COLUMNS]
+        return sum(len(c) * c.itemsize for c in columns)
+
+    def to_bytes(self):
+        values = json.dumps(self.values).encode()
+        parts = [_HEADER.pack(_MAGIC, _VERSION, len(self.kind), len(self.edges), self.root, len(values))]
+        for name in _COLUMNS:
+            parts.append(bytes(getattr(self, name)))
+        parts.append(bytes(self.edges))
+        parts.append(bytes(self.kind))
+        parts.append(values)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, buffer):
+        """Wrap a to_bytes() buffer; the columns are views, not copies"""
+        view = memoryview(buffer)
+        magic, version, nodes, nedges, root, nvalues = _HEADER.unpack_from(view)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Not a flat AST buffer")
+        offset = _HEADER.size
+        itemsize = array('i').itemsize
+        columns = {}
+        for name in _COLUMNS:
+            columns[name] = view[offset:offset + nodes * itemsize].cast('i')
+            offset += nodes * itemsize
+        edges = view[offset:offset + nedges * itemsize].cast('i')
+        offset += nedges * itemsize
+        kind = view[offset:offset + nodes]
+        offset += nodes
+        values = json.loads(bytes(view[offset:offset + nvalues]))
+        return cls(kind, edges=edges, values=values, root=root, **columns)
+
+    def to_dict(self, node=None):
+        """The nodes.to_dict() shape do.py's own AST produces"""
+        if node is None:
+            node = self.root
+        kind = self.kind[node]
+        value = self.value_of(node)
+        kids = list(self.children(node))
+        d = self.to_dict
+
+        def block(n):
+            return [d(c) for c in self.children(n)]
+
+        def names(n):
+            return [self.value_of(c) for c in self.children(n)]
+
+        if kind == PROGRAM:
+            return {'type': 'program', 'body': [d(c) for c in kids]}
+        if kind in (IF, ELIF):
+            r = {'type': KINDS[kind], 'test': d(kids[0]), 'body': block(kids[1])}
+            if len(kids) == 3:
+                r['else'] = d(kids[2])
+            return r
+        if kind == ELSE:
+            return {'type': 'else', 'body': block(kids[0])}
+        if kind == WHILE:
+            return {'type': 'while', 'test': d(kids[0]), 'body': block(kids[1])}
+        if kind == FOR:
+            return {'type': 'for', 'target': value, 'iter': d(kids[0]), 'body': block(kids[1])}
+        if kind == FUNCTION:
+            return {'type': 'function', 'name': value, 'params': names(kids[0]), 'body': block(kids[1])}
+        if kind == CLASS:
+            r = {'type': 'class', 'name': value}
+            if len(kids) == 2:
+                r['bases'] = names(kids[0])
+            r['body'] = block(kids[-1])
+            return r
+        if kind == OPERATION:
+            return {'type': 'operation', 'op': value, 'left': d(kids[0]), 'right': d(kids[1])}
+        if kind == UNARY:
+            return {'type': 'unary', 'op': value, 'operand': d(kids[0])}
+        if kind == ATOM:
+            return {'type': 'atom', 'value': value}
+        if kind == ATTRIBUTE:
+            return {'type': 'attribute', 'object': d(kids[0]), 'attr': value}
+        if kind == ASSIGN:
+            return {'type': 'assign', 'target': value, 'value': d(kids[0])}
+        if kind == RETURN:
+            return {'type': 'return', 'value': d(kids[0]) if kids else None}
+        if kind == PASS:
+            return {'type': 'pass'}
+        raise ValueError(f"No dict form for {KINDS[kind]} node {node}")
+
+
+class Cursor:
+    """Moves over a FlatAST without creating an object per node"""
+    __slots__ = ('tree', 'node', '_parents', '_positions')
+
+    def __init__(self, tree, node):
+        self.tree = tree
+        self.node = node
+        self._parents = array('i')
+        self._positions = array('i')
+
+    @property
+    def kind(self):
+        return self.tree.kind[self.node]
+
+    @property
+    def value(self):
+        return self.tree.value_of(self.node)
+
+    @property
+    def span(self):
+        return self.tree.start[self.node], self.tree.end[self.node]
+
+    def first_child(self):
+        if not self.tree.count[self.node]:
+            return False
+        self._parents.append(self.node)
+        self._positions.append(0)
+        self.node = self.tree.child(self.node, 0)
+        return True
+
+    def next_sibling(self):
+        if not self._parents:
+            return False
+        parent = self._parents[-1]
+        position = self._positions[-1] + 1
+        if position >= self.tree.count[parent]:
+            return False
+        self._positions[-1] = position
+        self.node = self.tree.child(parent, position)
+        return True
+
+    def parent(self):
+        if not self._parents:
+            return False
+        self.node = self._parents.pop()
+        self._positions.pop()
+        return True
+
+
+class Visitor:
+    """Calls visit_<kind>(tree, node) for each node; generic_visit recurses"""
+
+    def visit(self, tree, node=None):
+        node = tree.root if node is None else node
+        method = getattr(self, 'visit_' + KINDS[tree.kind[node]], self.generic_visit)
+        return method(tree, node)
+
+    def generic_visit(self, tree, node):
+        for child in tree.children(node):
+            self.visit(tree, child)
+
+
+class _Builder:
+    """Reduction actions for do.py's grammar that append to flat columns"""
+
+    def reset(self):
+        self.kind = array('B')
+        self.value = array('i')
+        self.first = array('i')
+        self.count = array('i')
+        self.start = array('i')
+        self.end = array('i')
+        self.edges = array('i')
+        self.values = []
+        self.interned = {}
+
+    def finish(self, root):
+        return FlatAST(self.kind, self.value, self.first, self.count, self.start,
+                       self.end, self.edges, self.values, root)
+
+    def node(self, kind, start, end, value=None, children=()):
+        node = len(self.kind)
+        self.kind.append(kind)
+        if value is None:
+            self.value.append(-1)
+        else:
+            key = (type(value), value)
+            index = self.interned.get(key)
+            if index is None:
+                index = self.interned[key] = len(self.values)
+                self.values.append(value)
+            self.value.append(index)
+        self.first.append(len(self.edges))
+        self.count.append(len(children))
+        self.edges.extend(children)
+        self.start.append(start)
+        self.end.append(end)
+        return node
+
+    def _start(self, symbol):
+        if hasattr(symbol, 'end'):
+            return symbol.lexpos
+        value = symbol.value
+        if isinstance(value, list):
+            value = value[0] if value else None
+        return -1 if value is None else self.start[value]
+
+    def _end(self, symbol):
+        if hasattr(symbol, 'end'):
+            return symbol.end
+        value = symbol.value
+        if isinstance(value, list):
+            value = value[-1] if value else None
+        return -1 if value is None else self.end[value]
+
+    def make(self, kind, p, value=None, children=()):
+        return self.node(kind, self._start(p.slice[1]), self._end(p.slice[-1]), value, children)
+
+    def p_program(self, p):
+        p[0] = self.make(PROGRAM, p, children=p[1])
+
+    def p_statements(self, p):
+        if len(p) == 2:
+            p[0] = [p[1]]
+        else:
+            p[1].append(p[2])
+            p[0] = p[1]
+
+    def p_passthrough(self, p):
+        p[0] = p[1]
+
+    p_statement = p_simple_stmt = p_small_stmt = p_expr_stmt = p_compound_stmt = p_passthrough
+
+    def p_if_stmt(self, p):
+        p[0] = self.make(IF, p, children=[p[2], p[4]] if len(p) == 5 else [p[2], p[4], p[5]])
+
+    def p_else_block(self, p):
+        if len(p) == 4:
+            p[0] = self.make(ELSE, p, children=[p[3]])
+        elif len(p) == 5:
+            p[0] = self.make(ELIF, p, children=[p[2], p[4]])
+        else:
+            p[0] = self.make(ELIF, p, children=[p[2], p[4], p[5]])
+
+    def p_while_stmt(self, p):
+        p[0] = self.make(WHILE, p, children=[p[2], p[4]])
+
+    def p_for_stmt(self, p):
+        p[0] = self.make(FOR, p, p[2], [p[4], p[6]])
+
+    def p_function_def(self, p):
+        p[0] = self.make(FUNCTION, p, p[2], [p[4], p[7]])
+
+    def p_class_def(self, p):
+        if len(p) == 5:
+            p[0] = self.make(CLASS, p, p[2], [p[4]])
+        else:
+            p[0] = self.make(CLASS, p, p[2], [p[4], p[7]])
+
+    def p_suite(self, p):
+        p[0] = self.make(BLOCK, p, children=[p[1]] if len(p) == 2 else p[len(p) - 2])
+
+    def p_parameter_list(self, p):
+        p[0] = self.make(PARAMS, p, children=p[1] or ())
+
+    def p_parameters(self, p):
+        token = p.slice[-1]
+        name = self.node(NAME, token.lexpos, token.end, p[len(p) - 1])
+        if len(p) == 2:
+            p[0] = [name]
+        else:
+            p[1].append(name)
+            p[0] = p[1]
+
+    def p_binary(self, p):
+        if len(p) == 2:
+            p[0] = p[1]
+        else:
+            p[0] = self.make(OPERATION, p, p[2], [p[1], p[3]])
+
+    p_test = p_expr = p_term = p_power = p_binary
+
+    def p_factor(self, p):
+        if len(p) == 2:
+            p[0] = p[1]
+        else:
+            p[0] = self.make(UNARY, p, p[1], [p[2]])
+
+    def p_atom(self, p):
+        if len(p) == 2:
+            p[0] = self.make(ATOM, p, p[1])
+        elif p.slice[1].type == 'LPAREN':
+            p[0] = p[2]
+        else:
+            p[0] = self.make(ATTRIBUTE, p, p[3], [p[1]])
+
+    def p_assignment(self, p):
+        p[0] = self.make(ASSIGN, p, p[1], [p[3]])
+
+    def p_return_stmt(self, p):
+        p[0] = self.make(RETURN, p, children=[p[2]] if len(p) == 3 else ())
+
+    def p_pass_stmt(self, p):
+        p[0] = self.make(PASS, p)
+
+    def p_empty(self, p):
+        p[0] = None
+
+    # do.py's error productions never reduce here: p_error stops the parse
+    p_statement_error = p_suite_error = p_header_error = p_compound_error = p_else_block_error = p_passthrough
+
+    def p_error(self, p):
+        if p is None:
+            raise SyntaxError("Syntax error at EOF")
+        raise SyntaxError(f"Syntax error at '{p.value}', line {p.lineno}")
+
+
+class FlatParser:
+    """do.py's LALR tables bound to the flat-array actions.
+
+    The builder holds the tree being built, so one thread parses with one
+    FlatParser at a time; parse() keeps one per thread.
+    """
+
+    def __init__(self):
+        import tablecache
+
+        self.builder = _Builder()
+        actions = {name: getattr(self.builder, name) for name in dir(self.builder) if name.startswith('p_')}
+        self.parser = tablecache.rebind_parser(lazy.grammar('do').parser, actions, self.builder.p_error)
+
+    def parse(self, code, lexer=None):
+        lexer = lexer or lazy.grammar('do').local.lexer
+        lexer.input(code)
+        lexer.lineno = 1
+
+        def next_token():
+            token = lexer.token()
+            if token is not None:
+                token.end = lexer.lexpos
+            return token
+
+        self.builder.reset()
+        with diagnostics.collect() as errors:
+            try:
+                root = self.parser.parse(lexer=lexer, tokenfunc=next_token)
+            except SyntaxError:
+                if not errors:
+                    raise
+        if errors:
+            # do.py's t_error skips an illegal character; reject the input
+            raise SyntaxError(diagnostics.message(errors[0]))
+        return self.builder.finish(root)
+
+
+_local = threading.local()
+
+
+def parse(code):
+    """Parse do.py source into a FlatAST; raises SyntaxError on bad input"""
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = FlatParser()
+    return parser.parse(code)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('files', nargs='+')
+    args = ap.parse_args(argv)
+
+    for path in args.files:
+        with open(path) as f:
+            code = f.read()
+        tree = parse(code)
+        buffer = tree.to_bytes()
+        print(f"{path}: {len(tree)} nodes, {len(tree.values)} distinct values, {len(buffer)} bytes serialised")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,6 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+import reserved_words
 
 # Tokens
 tokens = (
@@ -14,12 +15,12 @@ t_COMMA = r','
 
 t_ignore = ' \t\n'
 
-def t_FOR(t): r'for'; return t
-def t_IN(t): r'in'; return t
-def t_RANGE(t): r'range'; return t
+# Keywords
+keywords = reserved_words.FOR_LOOP
 
 def t_IDENTIFIER(t):
     r'[a-zA-Z_][a-zA-Z0-9_]*'
+    t.type = keywords.get(t.value, 'IDENTIFIER')
     return t
 
 def t_NUMBER(t):
@@ -28,11 +29,12 @@ def t_NUMBER(t):
     return t
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Create lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parser rules
 
@@ -46,13 +48,7 @@ def p_range_expr(p):
                   | RANGE LPAREN NUMBER COMMA NUMBER COMMA NUMBER RPAREN'''
     
 def p_error(p):
-    if p:
-        print(f"Syntax error at token: {p.value}")
-    else:
-        print("Syntax error at EOF")
-
-# Create parser
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 # Main loop for user input
 def main():
@@ -64,7 +60,9 @@ def main():
             s = input('Enter for loop code: ')
             if not s:
                 continue
-            result = parser.parse(s)
+            with diagnostics.collect() as errors:
+                result = grammar.parse(s)
+            diagnostics.report(errors)
             if result == "Valid for loop":
                 print("Valid for loop syntax")
             else:
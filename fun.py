@@ -1,5 +1,6 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+import reserved_words
 
 # List of token names
 tokens = (
@@ -8,7 +9,6 @@ tokens = (
 )
 
 # Regular expressions for tokens
-t_IDENTIFIER = r'[a-zA-Z_][a-zA-Z0-9_]*'
 t_LPAREN = r'\('
 t_RPAREN = r'\)'
 t_LBRACKET = r'\{'
@@ -21,16 +21,11 @@ t_DIVIDE = r'/'
 t_COMMA = r','
 
 # Reserved words
-def t_DEF(t):
-    r'def'
-    return t
-
-def t_WHILE(t):
-    r'while'
-    return t
+keywords = reserved_words.SCRIPT
 
-def t_PRINT(t):
-    r'print'
+def t_IDENTIFIER(t):
+    r'[a-zA-Z_][a-zA-Z0-9_]*'
+    t.type = keywords.get(t.value, 'IDENTIFIER')
     return t
 
 def t_NUMBER(t):
@@ -42,24 +37,17 @@ def t_STRING(t):
     r'\"([^\\\n]|(\\.))*?\"'
     return t
 
-def t_BOOLEAN(t):
-    r'true|false'
-    return t
-
-def t_NULL(t):
-    r'null'
-    return t
-
 # Ignored characters
 t_ignore = ' \t\n'
 
 # Error handling
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Build the lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parsing rules
 def p_program(p):
@@ -123,13 +111,7 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    if p:
-        print("Syntax error at token:", p.value)
-    else:
-        print("Syntax error at EOF")
-
-# Build the parser
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 # Interactive loop for input
 if __name__ == '__main__':
@@ -142,7 +124,9 @@ if __name__ == '__main__':
                 s = input('Enter Python-like code: ')
                 if not s:
                     continue
-                result = parser.parse(s)
+                with diagnostics.collect() as errors:
+                    result = grammar.parse(s)
+                diagnostics.report(errors)
                 if result is None:
                     print("Valid syntax")
                 else:
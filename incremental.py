@@ -0,0 +1,249 @@
+"""Incremental reparsing of do.py programs.
+
+A Document keeps the source, the top-level statements of its AST and the
+offset where each of them starts. An edit relexes and reparses from one
+statement before the edit, because the edit may change where that statement
+ends (`x = a` followed by an edited `+ b`). It stops as soon as a top-level
+statement ends right before an old statement start past the edit. The
+parser is then back in its state after `statements`, with the same tokens
+ahead of it as in the old parse, so the rest of the old AST is kept.
+
+Nothing but the statement starts is kept of the old token stream: the lexer
+has a single state, so lexing from any token start gives the same tokens.
+
+Only top-level statement starts are sync points. An edit inside a braced
+suite reparses the whole top-level statement around it, so the time per
+edit grows with the largest top-level statement, not with the program:
+an edit inside `def f(a): { ... }` with thousands of statements in the
+body costs about as much as parsing that function from scratch.
+
+    doc = Document(source)
+    valid, program, errors = doc.edit(start, end, 'y = 2')   # replaces source[start:end]
+
+    python -m bench.incremental          # per-edit time on a large program
+"""
+import diagnostics
+import lazy
+from nodes import Program
+
+
+class _Synced(Exception):
+    """Raised mid-parse once the new parse lines up with the old one"""
+
+    def __init__(self, index):
+        super().__init__(index)
+        self.index = index
+
+
+class Document:
+    """A do.py program that is reparsed incrementally on edit()"""
+
+    def __init__(self, text=''):
+        self._build_parser()
+        self.reset(text)
+
+    def _build_parser(self):
+        import tablecache
+        import do
+
+        g = lazy.grammar('do')
+        self._lexer = g.lexer.clone()
+        actions = {p.func: getattr(do, p.func) for p in g.parser.productions if p.func}
+        self._p_statements = actions['p_statements']
+        actions['p_statements'] = self._statements
+        self._parser = tablecache.rebind_parser(g.parser, actions, lazy._reject)
+
+    def reset(self, text):
+        """Parse text from scratch"""
+        self.text = text
+        self.body = []
+        self.starts = []
+        self._shift_from = 0
+        self._shift = 0
+        self.error = None
+        self._syntax_error = None
+        # Offsets of the illegal characters the lexer skipped
+        self._lex_errors = []
+        self._reparse(0, len(text), 0)
+        return self.result
+
+    @property
+    def valid(self):
+        return self.error is None and not self._lex_errors
+
+    @property
+    def result(self):
+        """(valid, Program, errors) as do.validate_python returns them,
+        except that the parse stops at the first syntax error: the Program
+        is None then and error holds the message"""
+        errors = self.errors
+        if self.error is not None:
+            return False, None, errors
+        return not errors, Program(self.body), errors
+
+    @property
+    def errors(self):
+        """A diagnostics.Diagnostic per lexer error and for the syntax
+        error, in order"""
+        text = self.text
+        errors = [diagnostics.Diagnostic('lex', text[pos], text.count('\n', 0, pos) + 1,
+                                         pos - text.rfind('\n', 0, pos), ())
+                  for pos in self._lex_errors]
+        if self._syntax_error is not None:
+            errors.append(self._syntax_error)
+        return errors
+
+    # Statement starts after the last edit are stored without that edit's
+    # length change; it is added on read, so an edit does not have to
+    # rewrite every offset behind it
+
+    def start(self, i):
+        """Offset of top-level statement i"""
+        value = self.starts[i]
+        return value + self._shift if i >= self._shift_from else value
+
+    def _bisect(self, pos):
+        """Number of statements starting at or before pos"""
+        lo, hi = 0, len(self.starts)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if pos < self.start(mid):
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def edit(self, start, end, new_text):
+        """Replace text[start:end] with new_text and reparse what changed"""
+        text = self.text[:start] + new_text + self.text[end:]
+        if self.error is not None or not self.body:
+            return self.reset(text)
+
+        # The statement holding the character before the edit (a token
+        # ending right at `start` can grow), and one more for context
+        first = max(0, self._bisect(start - 1) - 2)
+        self.text = text
+        self._reparse(first, start + len(new_text), len(new_text) - (end - start))
+        return self.result
+
+    def _reparse(self, first, edit_end, delta):
+        """Reparse from statement `first` until the parse lines up with an
+        old statement start at or past edit_end (new offsets)"""
+        pos = self.start(first) if first < len(self.starts) else 0
+
+        self._depth = {}
+        self._region = []
+        self._region_starts = []
+        self._edit_end = edit_end
+        self._delta = delta
+        self._pending = False
+        self._last_pos = -1
+
+        lexer = self._lexer
+        lexer.input(self.text)
+        lexer.lexpos = pos
+        lexer.lineno = 1
+        depth = 0
+
+        def next_token():
+            nonlocal depth
+            token = lexer.token()
+            if token is None:
+                return None
+            if self._pending:
+                self._pending = False
+                self._check(token.lexpos)
+            self._depth[token.lexpos] = depth
+            if token.type == 'LBRACE':
+                depth += 1
+            elif token.type == 'RBRACE':
+                depth -= 1
+            self._last_pos = token.lexpos
+            return token
+
+        with diagnostics.collect(self._parser, lexer) as errors:
+            try:
+                self._parser.parse(lexer=lexer, tokenfunc=next_token, tracking=True)
+                stop = len(self.starts)
+            except _Synced as e:
+                stop = e.index
+            except lazy._Rejected as e:
+                stop = None
+                # Line numbers were counted from the start of the region
+                lines = self.text.count('\n', 0, pos)
+                token = e.token
+                if token is not None:
+                    token.lineno += lines
+                else:
+                    lexer.lineno += lines
+                diagnostics.syntax_error(token)
+                self.error = lazy.syntax_error_message(token)
+            # Kept here, with their lines made absolute on read, not
+            # passed on to a caller's collect()
+            region = [self._offset(pos, error) for error in errors if error.kind == 'lex']
+            syntax = [error for error in errors if error.kind == 'syntax']
+            errors.clear()
+
+        old = self._lex_errors
+        if stop is None:
+            self._lex_errors = [p for p in old if p < pos] + region
+            self._syntax_error = syntax[0]
+            self.body = []
+            self.starts = []
+            return
+        if old:
+            # Past the region the old errors are kept, moved by the edit
+            end = self.start(stop) if stop < len(self.starts) else len(self.text) - delta
+            region = [p for p in old if p < pos] + region + [p + delta for p in old if p >= end]
+        self._lex_errors = region
+        self.error = None
+        self._syntax_error = None
+        self.body[first:stop] = self._region
+        self._splice(first, stop, self._region_starts, delta)
+
+    def _offset(self, pos, error):
+        """Offset of a lex Diagnostic recorded by a parse from pos, whose
+        line numbers count from pos's line"""
+        start = self.text.rfind('\n', 0, pos) + 1
+        for _ in range(error.line - 1):
+            start = self.text.index('\n', start) + 1
+        return start + error.column - 1
+
+    def _splice(self, first, stop, region_starts, delta):
+        starts = self.starts
+        shift_from, shift = self._shift_from, self._shift
+        if shift:
+            # Make the pending shift exact before `first` and uniform from
+            # `stop` on, touching only the statements between the two edits
+            if shift_from < first:
+                starts[shift_from:first] = [s + shift for s in starts[shift_from:first]]
+            elif shift_from > stop:
+                starts[stop:shift_from] = [s - shift for s in starts[stop:shift_from]]
+        starts[first:stop] = region_starts
+        self._shift_from = first + len(region_starts)
+        self._shift = shift + delta
+
+    def _statements(self, p):
+        self._p_statements(p)
+        k = len(p) - 1
+        start = p.lexpos(k)
+        if self._depth[start]:
+            return
+        # A top-level statement just ended
+        self._region = p[0]
+        self._region_starts.append(start)
+        if self._last_pos > p.lexspan(k)[1]:
+            # The parser already read the next token to decide this
+            self._check(self._last_pos)
+        else:
+            self._pending = True
+
+    def _check(self, pos):
+        """Stop if the next statement starts where an old one did, past
+        the edit"""
+        if pos < self._edit_end:
+            return
+        old = pos - self._delta
+        index = self._bisect(old) - 1
+        if index >= 0 and self.start(index) == old:
+            raise _Synced(index)
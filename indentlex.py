@@ -0,0 +1,86 @@
+"""Indentation-based blocks for do.py: a layout filter over its tokens.
+
+do.py's lexer drops newlines and whitespace, so a block of several
+statements has to be braced. layout() sits between the lexer and the
+parser and adds the tokens that mark an indented block, in the same single
+pass over the tokens, keeping a stack of the open indentation widths (tabs
+count to the next multiple of 8):
+
+    NEWLINE   after a colon that ends its line, i.e. a block header
+    INDENT    where a line is indented deeper than the one before
+    DEDENT    once per level a line drops back to
+
+so `if x:` and an indented block give IF x COLON NEWLINE INDENT ... DEDENT
+where the braced form has IF x COLON LBRACE ... RBRACE. Unlike Python's
+tokenizer there is no NEWLINE after every statement: the grammar does not
+separate statements, braced or not, and the parser would only have more
+tokens to shift. A header without an indented block still fails at its
+NEWLINE.
+
+Blank and comment-only lines produce no tokens, so they do not matter.
+Inside parentheses or braces there is no layout: an expression may span
+lines, and a braced block still works. A dedent to a width that no
+enclosing block has is recorded as an 'indent' diagnostic.
+
+    do.validate_python(source, indent=True)
+    do.grammar.parse(source, layout=indentlex.layout)
+"""
+import diagnostics
+import lazy
+
+# Open parentheses and braces: no layout inside
+_DEPTH = {'LPAREN': 1, 'LBRACE': 1, 'RPAREN': -1, 'RBRACE': -1}
+
+
+def _token(type, value, at, lexer):
+    """A layout token at the position of token `at`"""
+    return lazy.Token(type, value, at.lineno, at.lexpos, lexer)
+
+
+def _indentation(lexer, token):
+    """The whitespace in front of token, the first on its line"""
+    data = lexer.lexdata
+    # Streamed tokens count from the start of the stream, lexdata is the
+    # current window (see streamlex)
+    pos = token.lexpos - getattr(lexer, 'lexbase', 0)
+    if isinstance(data, str):
+        return data[data.rfind('\n', 0, pos) + 1:pos]
+    return str(data[data.rfind(b'\n', 0, pos) + 1:pos], 'utf-8', 'replace')
+
+
+def layout(tokens, lexer):
+    """Yield tokens, an iterable of lexer's tokens, with NEWLINE, INDENT
+    and DEDENT tokens added"""
+    levels = [0]
+    depth = 0
+    line = None
+    last = None
+    for token in tokens:
+        if token.lineno != line:
+            # A line starting inside parentheses continues the one before
+            line = token.lineno
+            if not depth:
+                if last is not None and last.type == 'COLON':
+                    yield _token('NEWLINE', '\n', last, lexer)
+                indentation = _indentation(lexer, token)
+                width = len(indentation.expandtabs(8))
+                if width > levels[-1]:
+                    levels.append(width)
+                    yield _token('INDENT', indentation, token, lexer)
+                elif width < levels[-1]:
+                    while width < levels[-1]:
+                        levels.pop()
+                        yield _token('DEDENT', '', token, lexer)
+                    if width != levels[-1]:
+                        diagnostics.indent_error(token, lexer)
+        delta = _DEPTH.get(token.type)
+        if delta is not None:
+            depth = max(0, depth + delta)
+        yield token
+        last = token
+    if last is None:
+        return
+    if last.type == 'COLON':
+        yield _token('NEWLINE', '\n', last, lexer)
+    for _ in levels[1:]:
+        yield _token('DEDENT', '', last, lexer)
@@ -1,5 +1,6 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+from nodes import Lambda, BinaryOp, Identifier, Number, to_dict
 
 # List of token names
 tokens = (
@@ -44,11 +45,12 @@ def t_newline(t):
 t_ignore = ' \t'
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Build the lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parsing rules
 def p_program(p):
@@ -61,7 +63,8 @@ def p_statement_list(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[2]]
+        p[1].append(p[2])
+        p[0] = p[1]
 
 def p_statement(p):
     '''statement : lambda_expression SEMICOLON
@@ -70,11 +73,7 @@ def p_statement(p):
 
 def p_lambda_expression(p):
     '''lambda_expression : LAMBDA parameters COLON expression'''
-    p[0] = {
-        'type': 'lambda',
-        'parameters': p[2],
-        'body': p[4]
-    }
+    p[0] = Lambda(p[2], p[4])
 
 def p_parameters(p):
     '''parameters : IDENTIFIER
@@ -86,7 +85,8 @@ def p_parameters(p):
         else:
             p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_expression(p):
     '''expression : term
@@ -94,12 +94,7 @@ def p_expression(p):
     if len(p) == 2:
         p[0] = p[1]
     else:
-        p[0] = {
-            'type': 'binary_op',
-            'op': '+',
-            'left': p[1],
-            'right': p[3]
-        }
+        p[0] = BinaryOp('+', p[1], p[3])
 
 def p_term(p):
     '''term : factor
@@ -112,33 +107,22 @@ def p_term(p):
 def p_factor(p):
     '''factor : IDENTIFIER
               | NUMBER'''
-    p[0] = {
-        'type': 'identifier' if isinstance(p[1], str) else 'number',
-        'value': p[1]
-    }
+    p[0] = Identifier(p[1]) if isinstance(p[1], str) else Number(p[1])
 
 def p_empty(p):
     'empty :'
     p[0] = None
 
 def p_error(p):
-    if p:
-        print(f"Syntax error at '{p.value}', line {p.lineno}, position {p.lexpos}")
-    else:
-        print("Syntax error at EOF")
-
-# Build the parser
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
-def validate_lambda(code):
+def validate_lambda(code, build_ast=True):
     """
-    Validates lambda expression syntax and returns the parsed AST if valid
+    Validates lambda expression syntax: (valid, parsed AST, errors), where
+    errors lists a diagnostics.Diagnostic per error.
+    With build_ast=False the AST is None.
     """
-    try:
-        result = parser.parse(code)
-        return True, result
-    except Exception as e:
-        return False, str(e)
+    return grammar.validate(code, build_ast)
 
 if __name__ == '__main__':
     while True:
@@ -148,13 +132,15 @@ if __name__ == '__main__':
                 break
             elif check == 'Y':
                 code = input('Enter lambda expression: ')
-                is_valid, result = validate_lambda(code)
+                is_valid, result, errors = validate_lambda(code)
+                diagnostics.report(errors)
                 if is_valid:
                     print("Valid syntax!")
-                    print("Parsed structure:", result)
+                    print("Parsed structure:", to_dict(result))
                 else:
                     print("Invalid syntax!")
-                    print("Error:", result)
+                    if isinstance(result, str):
+                        print("Error:", result)
             else:
                 print("Please enter Y or N")
         except EOFError:
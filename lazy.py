@@ -0,0 +1,422 @@
+import copy
+import functools
+import importlib
+import sys
+import threading
+
+import diagnostics
+
+# Serializes first builds; threads may ask for a grammar at the same time
+_build_lock = threading.RLock()
+
+
+class Token:
+    """A token made outside the lexer (indentlex's layout tokens, the ones
+    recovery inserts), like PLY's LexToken without importing PLY: do.py and
+    p.py import the modules that make them, PLY only with their first build.
+    synthetic marks a token that stands in for a missing one."""
+
+    def __init__(self, type, value, lineno, lexpos, lexer=None, synthetic=False):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+        self.lexer = lexer
+        self.synthetic = synthetic
+
+    def __repr__(self):
+        return f'LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})'
+
+
+class _Rejected(Exception):
+    """Raised by the recognizer's error hook to stop at the first error"""
+
+    def __init__(self, token):
+        super().__init__(token)
+        self.token = token
+
+
+def _reject(token):
+    raise _Rejected(token)
+
+
+def _no_action(p):
+    pass
+
+
+def syntax_error_message(token):
+    if token is None:
+        return "Syntax error at EOF"
+    if token.type == 'NEWLINE':
+        return f"Syntax error at end of line {token.lineno}"
+    return f"Syntax error at '{token.value}', line {token.lineno}"
+
+
+def _filtered(layout, lexer, tokenfunc=None):
+    """tokenfunc for parser.parse(): lexer's tokens passed through layout,
+    a token filter such as indentlex.layout"""
+    tokens = layout(iter(tokenfunc or lexer.token, None), lexer)
+    return functools.partial(next, tokens, None)
+
+
+def _phases():
+    """The phases module if timing is on. Only a caller that configured a
+    hook has imported it."""
+    phases = sys.modules.get('phases')
+    if phases is not None and phases.HOOK is not None:
+        return phases
+    return None
+
+
+def _clock():
+    """The phases clock of the validate call timed on this thread, if any"""
+    phases = sys.modules.get('phases')
+    return None if phases is None else phases.current()
+
+
+def _profile():
+    """The open allocs profile, if any. Only a caller that opened one has
+    imported allocs."""
+    allocs = sys.modules.get('allocs')
+    return None if allocs is None else allocs.PROFILE
+
+
+def _instrumented(name, mode, chars, func, *args):
+    """func(*args), a validate call, timed (phases) and/or profiled (allocs)"""
+    phases = _phases()
+    if phases is not None:
+        func = functools.partial(phases.timed, name, mode, chars, func)
+    profile = _profile()
+    if profile is None:
+        return func(*args)
+    return profile.measure(name, func, *args)
+
+
+def _cache():
+    """memo.CACHE if it is on. Only a caller that turned it on has
+    imported memo, so the cache costs nothing otherwise."""
+    memo = sys.modules.get('memo')
+    if memo is not None and memo.CACHE.enabled:
+        return memo
+    return None
+
+
+def _mode(name, layout):
+    """The memo key part for a parse mode and token filter"""
+    return name if layout is None else f'{name}:{layout.__module__}.{layout.__qualname__}'
+
+
+class _ThreadState(threading.local):
+    """A grammar's lexer and parsers as one thread uses them.
+
+    PLY keeps per-parse state on the lexer (input, position, lineno) and
+    the parser (stacks, current token). The main thread uses the grammar's
+    own instances, i.e. the module's `lexer` and `parser`; every other
+    thread gets a lexer clone and shallow parser copies, which share the
+    tables.
+    """
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.shared = threading.current_thread() is threading.main_thread()
+        self._lexer = None
+        self._parser = None
+        self._span_lexer = None
+        self._recognizer = None
+        self._timed_parser = None
+
+    @property
+    def lexer(self):
+        if self._lexer is None:
+            lexer = self.grammar.lexer
+            self._lexer = lexer if self.shared else lexer.clone()
+        return self._lexer
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            parser = self.grammar.parser
+            self._parser = parser if self.shared else copy.copy(parser)
+        return self._parser
+
+    @property
+    def span_lexer(self):
+        if self._span_lexer is None:
+            if self.shared:
+                self._span_lexer = self.grammar.span_lexer
+            else:
+                import spanlex
+                self._span_lexer = spanlex.SpanLexer(self.lexer)
+        return self._span_lexer
+
+    @property
+    def recognizer(self):
+        if self._recognizer is None:
+            recognizer = self.grammar.recognizer
+            self._recognizer = recognizer if self.shared else copy.copy(recognizer)
+        return self._recognizer
+
+    @property
+    def timed_parser(self):
+        if self._timed_parser is None:
+            parser = self.grammar.timed_parser
+            self._timed_parser = parser if self.shared else copy.copy(parser)
+        return self._timed_parser
+
+
+class LazyGrammar:
+    """Lexer and parser of a grammar module, built on first use and reused.
+
+    PLY itself is only imported by the first build, and the result cache
+    (memo), per-phase timing (phases) and allocation profiling (allocs)
+    only by a caller turning them on, so importing a validator module
+    stays cheap. parse() and recognize() are thread-safe:
+    each thread parses with its own lexer and parser state (see `local`).
+    """
+
+    def __init__(self, module_name):
+        self.module_name = module_name
+        self._lexer = None
+        self._parser = None
+        self._recognizer = None
+        self._timed_parser = None
+        self._span_lexer = None
+        self._identity = None
+        self._local = _ThreadState(self)
+
+    @property
+    def lexer(self):
+        if self._lexer is None:
+            with _build_lock:
+                if self._lexer is None:
+                    import tablecache
+                    self._lexer = tablecache.build_lexer(self.module_name)
+        return self._lexer
+
+    @property
+    def parser(self):
+        if self._parser is None:
+            with _build_lock:
+                if self._parser is None:
+                    import tablecache
+                    self._parser = tablecache.build_parser(self.module_name)
+        return self._parser
+
+    @property
+    def span_lexer(self):
+        """Lexer over the same rules whose tokens are source offsets"""
+        if self._span_lexer is None:
+            with _build_lock:
+                if self._span_lexer is None:
+                    import spanlex
+                    self._span_lexer = spanlex.SpanLexer(self.lexer)
+        return self._span_lexer
+
+    @property
+    def recognizer(self):
+        """Parser over the same tables whose actions build nothing"""
+        if self._recognizer is None:
+            with _build_lock:
+                if self._recognizer is None:
+                    import tablecache
+                    actions = {p.func: _no_action for p in self.parser.productions if p.func}
+                    self._recognizer = tablecache.rebind_parser(self.parser, actions, _reject)
+        return self._recognizer
+
+    @property
+    def timed_parser(self):
+        """Parser over the same tables whose actions are timed (see phases)"""
+        if self._timed_parser is None:
+            with _build_lock:
+                if self._timed_parser is None:
+                    import phases
+                    import tablecache
+                    parser = self.parser
+                    actions = {p.func: phases.timed_action(p.callable) for p in parser.productions if p.func}
+                    self._timed_parser = tablecache.rebind_parser(parser, actions, parser.errorfunc)
+        return self._timed_parser
+
+    @property
+    def local(self):
+        """This thread's lexer, parser, span_lexer, recognizer and
+        timed_parser"""
+        return self._local
+
+    @property
+    def built(self):
+        return self._lexer is not None and self._parser is not None
+
+    def warm_up(self):
+        """Build the lexer and parser now instead of on the first parse"""
+        self.lexer
+        self.parser
+        return self
+
+    @property
+    def identity(self):
+        """Module name and table hash, part of every cache key"""
+        if self._identity is None:
+            import tablecache
+            module = importlib.import_module(self.module_name)
+            self._identity = f'{self.module_name}:{tablecache.grammar_hash(module)}'
+        return self._identity
+
+    def parse(self, code=None, layout=None, **kwargs):
+        """Parse code into the AST. layout is an optional token filter
+        between lexer and parser, e.g. indentlex.layout. A buffer (bytes,
+        mmap, ...) is decoded as UTF-8 first: the actions build the AST
+        from str token values."""
+        if code is not None and not isinstance(code, str):
+            code = str(code, 'utf-8')
+        memo = _cache() if code is not None and not kwargs else None
+        if memo is not None:
+            key = (self.identity, _mode('parse', layout), memo.content_hash(code))
+            return memo.CACHE.lookup(key, lambda: self._parse(code, layout))
+        return self._parse(code, layout, **kwargs)
+
+    def _parse(self, code=None, layout=None, **kwargs):
+        # Always hand the parser this grammar's own lexer; PLY otherwise
+        # falls back to whichever lexer was built last in the process
+        local = self._local
+        lexer = kwargs.setdefault('lexer', local.lexer)
+        if code is not None:
+            # PLY's input() keeps counting lines from the previous parse
+            lexer.lineno = 1
+        if layout is not None:
+            kwargs['tokenfunc'] = _filtered(layout, lexer, kwargs.get('tokenfunc'))
+        clock = _clock()
+        if clock is None:
+            with diagnostics.collect(local.parser, lexer):
+                return local.parser.parse(code, **kwargs)
+        kwargs['tokenfunc'] = clock.tokenfunc(kwargs.get('tokenfunc') or lexer.token)
+        parser = local.timed_parser
+        with diagnostics.collect(parser, lexer):
+            return clock.run(parser.parse, code, **kwargs)
+
+    def recognize(self, code, layout=None):
+        """Check code without building an AST.
+
+        Returns (True, None), or (False, message) for the first syntax error.
+        Lexer errors and the syntax error are recorded as diagnostics.
+        """
+        # Nothing reads token values here, so offset tokens never
+        # slice the source
+        memo = _cache()
+        if memo is None:
+            return self._recognize(code, layout, lexer=self._local.span_lexer)
+        key = (self.identity, _mode('recognize', layout), memo.content_hash(code))
+        return memo.CACHE.lookup(key, lambda: self._recognize(code, layout, lexer=self._local.span_lexer), copy=False)
+
+    def _recognize(self, code=None, layout=None, **kwargs):
+        lexer = kwargs['lexer']
+        if code is not None:
+            lexer.lineno = 1
+        if layout is not None:
+            kwargs['tokenfunc'] = _filtered(layout, lexer, kwargs.get('tokenfunc'))
+        recognizer = self._local.recognizer
+        clock = _clock()
+        if clock is not None:
+            kwargs['tokenfunc'] = clock.tokenfunc(kwargs.get('tokenfunc') or lexer.token)
+        with diagnostics.collect(recognizer, lexer):
+            try:
+                if clock is None:
+                    recognizer.parse(code, **kwargs)
+                else:
+                    clock.run(recognizer.parse, code, **kwargs)
+            except _Rejected as e:
+                diagnostics.syntax_error(e.token)
+                return False, syntax_error_message(e.token)
+        return True, None
+
+    def validate(self, code, build_ast=True, layout=None):
+        """(valid, result, errors) for code.
+
+        result is the AST (None with build_ast=False, which stops at the
+        first syntax error) and errors a diagnostics.Diagnostic per lexer
+        and syntax error; code is valid if there are none. An exception
+        from a grammar action gives (False, message, errors). With a
+        phases hook configured the call is timed per phase, inside
+        allocs.profile() its allocations are traced.
+        """
+        if _profile() is not None or _phases() is not None:
+            return _instrumented(self.module_name, 'parse' if build_ast else 'recognize', len(code),
+                                 self._validate, code, build_ast, layout)
+        return self._validate(code, build_ast, layout)
+
+    def _validate(self, code, build_ast, layout):
+        with diagnostics.collect() as errors:
+            try:
+                if build_ast:
+                    result = self.parse(code, layout)
+                else:
+                    self.recognize(code, layout)
+                    result = None
+            except Exception as e:
+                return False, str(e), errors
+        return not errors, result, errors
+
+    def _stream_kwargs(self, stream, chunk_size):
+        import streamlex
+        lexer = self.lexer.clone()
+        lexer.lineno = 1
+        tokenfunc = streamlex.token_function(lexer, stream, chunk_size or streamlex.CHUNK_SIZE)
+        return {'lexer': lexer, 'tokenfunc': tokenfunc}
+
+    def parse_stream(self, stream, chunk_size=None, layout=None, **kwargs):
+        """parse() reading a file object or mmap chunk by chunk"""
+        kwargs.update(self._stream_kwargs(stream, chunk_size))
+        if layout is not None:
+            kwargs['tokenfunc'] = _filtered(layout, kwargs['lexer'], kwargs['tokenfunc'])
+        clock = _clock()
+        if clock is None:
+            parser = self._local.parser
+            with diagnostics.collect(parser, kwargs['lexer']):
+                return parser.parse(**kwargs)
+        kwargs['tokenfunc'] = clock.tokenfunc(kwargs['tokenfunc'])
+        parser = self._local.timed_parser
+        with diagnostics.collect(parser, kwargs['lexer']):
+            return clock.run(parser.parse, **kwargs)
+
+    def recognize_stream(self, stream, chunk_size=None, layout=None):
+        """recognize() reading a file object or mmap chunk by chunk.
+
+        Memory stays bounded by the chunk size and the parser stack.
+        """
+        return self._recognize(layout=layout, **self._stream_kwargs(stream, chunk_size))
+
+    def validate_stream(self, stream, chunk_size=None, build_ast=False, layout=None):
+        """validate() reading a file object or mmap chunk by chunk"""
+        if _profile() is not None or _phases() is not None:
+            return _instrumented(self.module_name, 'parse' if build_ast else 'recognize', None,
+                                 self._validate_stream, stream, chunk_size, build_ast, layout)
+        return self._validate_stream(stream, chunk_size, build_ast, layout)
+
+    def _validate_stream(self, stream, chunk_size, build_ast, layout):
+        with diagnostics.collect() as errors:
+            try:
+                if build_ast:
+                    result = self.parse_stream(stream, chunk_size, layout)
+                else:
+                    self.recognize_stream(stream, chunk_size, layout)
+                    result = None
+            except Exception as e:
+                return False, str(e), errors
+        return not errors, result, errors
+
+    def module_getattr(self, name):
+        """Module-level __getattr__ keeping `module.lexer`/`module.parser`"""
+        if name in ('lexer', 'parser'):
+            return getattr(self, name)
+        raise AttributeError(f"module {self.module_name!r} has no attribute {name!r}")
+
+
+def grammar(name):
+    """The LazyGrammar of a validator module, e.g. grammar('lambda')"""
+    return importlib.import_module(name).grammar
+
+
+def warm_up(*names):
+    """Prebuild lexers and parsers for the given modules (default: all)"""
+    import tablecache
+    for name in names or tablecache.GRAMMARS:
+        grammar(name).warm_up()
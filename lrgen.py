@@ -0,0 +1,188 @@
+"""Ahead-of-time LALR driver generator.
+
+Reads the action/goto tables PLY computed for a grammar module and emits a
+standalone parser module: the tables become literals, every production gets
+its own reduce function that calls the p_* action with a plain list, and the
+driver loop does no YaccProduction/YaccSymbol bookkeeping.
+
+    python lrgen.py do -o do_lr.py     # write the driver
+
+The differential check against PLY's own driver is tests/test_lrgen.py.
+"""
+import argparse
+import importlib
+import sys
+
+import lazy
+import tablecache
+
+# Bump when the generated code changes shape, so cached drivers are rebuilt
+GENERATOR_VERSION = 2
+
+_HEADER = '''\
+# Generated by lrgen.py from the {grammar} grammar -- do not edit
+import importlib
+
+import diagnostics
+
+_grammar = importlib.import_module({grammar!r})
+
+GRAMMAR_HASH = {hash!r}
+
+'''
+
+_DRIVER = '''
+
+def _error(token):
+    if token is None:
+        raise SyntaxError("Syntax error at EOF")
+    raise SyntaxError(f"Syntax error at {token.value!r}, line {token.lineno}")
+
+
+def parse_tokens(next_token):
+    """Parse tokens from next_token() and return the value of the start rule"""
+    action = _ACTION
+    defaulted = _DEFAULTED
+    reduce = _REDUCE
+    states = [0]
+    values = [None]
+    lookahead = None
+    ltype = None
+    while True:
+        act = defaulted[states[-1]]
+        if act is None:
+            if ltype is None:
+                lookahead = next_token()
+                ltype = lookahead.type if lookahead is not None else '$end'
+            act = action[states[-1]].get(ltype)
+            if act is None:
+                _error(lookahead)
+        if act > 0:
+            states.append(act)
+            values.append(lookahead.value)
+            ltype = None
+        elif act < 0:
+            reduce[-act](states, values)
+        else:
+            return values[-1]
+
+
+def parse(code, lexer=None):
+    """Drop-in for parser.parse(code) that raises SyntaxError on bad input,
+    an illegal character included. Uses this thread's lexer by default."""
+    if lexer is None:
+        lexer = _grammar.grammar.local.lexer
+    lexer.lineno = 1
+    lexer.input(code)
+    with diagnostics.collect() as errors:
+        try:
+            result = parse_tokens(lexer.token)
+        except SyntaxError:
+            if not errors:
+                raise
+    if errors:
+        # The lexer skipped it and went on; it came before any syntax error
+        raise SyntaxError(diagnostics.message(errors[0]))
+    return result
+'''
+
+
+def _rhs(production):
+    rhs = production.str.split('->', 1)[1].split()
+    return [] if rhs == ['<empty>'] else rhs
+
+
+def generate(name):
+    """Source of a standalone driver for grammar module `name`"""
+    module = importlib.import_module(name)
+    parser = lazy.grammar(name).parser
+    nstates = len(parser.action)
+    out = [_HEADER.format(grammar=name, hash=tablecache.grammar_hash(module))]
+
+    funcs = sorted({p.func for p in parser.productions if p.func})
+    for func in funcs:
+        out.append(f'{func} = _grammar.{func}\n')
+
+    # Goto tables, one per nonterminal
+    gotos = {}
+    for state, row in parser.goto.items():
+        for nonterminal, target in row.items():
+            gotos.setdefault(nonterminal, {})[state] = target
+    out.append('\n')
+    for nonterminal in sorted(gotos):
+        out.append(f'_GOTO_{nonterminal} = {dict(sorted(gotos[nonterminal].items()))!r}\n')
+
+    out.append('\n_ACTION = [\n')
+    for state in range(nstates):
+        out.append(f'    {parser.action.get(state, {})!r},\n')
+    out.append(']\n')
+    defaulted = [parser.defaulted_states.get(state) for state in range(nstates)]
+    out.append(f'\n_DEFAULTED = {defaulted!r}\n')
+
+    # One reduce function per production: pop, call the action, goto
+    for index, production in enumerate(parser.productions):
+        if index == 0:
+            continue
+        n = production.len
+        out.append(f'\n\ndef _reduce_{index}(states, values):\n')
+        out.append(f'    # {production.str}\n')
+        if n:
+            out.append(f'    p = [None, *values[-{n}:]]\n')
+            out.append(f'    del values[-{n}:]\n')
+            out.append(f'    del states[-{n}:]\n')
+        else:
+            out.append('    p = [None]\n')
+        if production.func:
+            out.append(f'    {production.func}(p)\n')
+        out.append('    values.append(p[0])\n')
+        out.append(f'    states.append(_GOTO_{production.name}[states[-1]])\n')
+
+    out.append('\n\n_REDUCE = [None, ')
+    out.append(', '.join(f'_reduce_{i}' for i in range(1, len(parser.productions))))
+    out.append(']\n')
+    out.append(_DRIVER)
+    return ''.join(out)
+
+
+def load(name):
+    """Import the generated driver for `name`, generating it on first use"""
+    module = importlib.import_module(name)
+    dirs = tablecache.cache_dirs(module.__file__)
+    modname = f'{tablecache.grammar_name(module)}_lr{GENERATOR_VERSION}_{tablecache.grammar_hash(module)}'
+
+    driver = tablecache.load_cached(dirs, modname)
+    if driver is not None:
+        return driver
+
+    source = generate(name)
+
+    def write(outputdir):
+        with open(f'{outputdir}/{modname}.py', 'w') as f:
+            f.write(source)
+
+    tablecache.build_cached(dirs, modname, write)
+    driver = tablecache.load_cached(dirs, modname)
+    if driver is None:
+        # Read-only install: keep the driver in memory
+        driver = type(sys)(modname)
+        exec(compile(source, modname, 'exec'), driver.__dict__)
+    return driver
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammar', nargs='?', default='do')
+    ap.add_argument('-o', '--output', help='write the driver here instead of stdout')
+    args = ap.parse_args(argv)
+
+    source = generate(args.grammar)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(source)
+    else:
+        sys.stdout.write(source)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
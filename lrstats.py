@@ -0,0 +1,240 @@
+"""LALR statistics of the grammar modules: states, tables and conflicts.
+
+Builds each module's LALR tables afresh with PLY, not from the table cache
+(a cached parsetab keeps no conflicts), and reports per module:
+
+    states, action_entries, goto_entries    size of the parse tables
+    shift_reduce, reduce_reduce             conflicts PLY resolved by default
+    resolved_by_precedence                  conflicts the precedence table
+                                            settles; with it removed these
+                                            would be shift/reduce as well
+    table_bytes                             estimated memory of the action
+                                            and goto tables once loaded
+    parsetab_bytes                          the cached parsetab module, if any
+    build_sec                               generating the tables
+    unused_tokens, unused_rules
+
+Every conflict comes with the two items the parser has to choose between
+and an example: the shortest token sequence that reaches the conflict,
+with a dot where the choice is made, followed by the lookahead token.
+
+    python lrstats.py                   # every module in tablecache.GRAMMARS
+    python lrstats.py fun try1          # with their conflicts
+    python lrstats.py --json stats.json
+"""
+import argparse
+import collections
+import importlib
+import json
+import os
+import sys
+import time
+
+from ply import yacc
+
+import tablecache
+
+
+def _reflect(module):
+    """The rules of a grammar module as PLY's yacc() collects them"""
+    pdict = {name: getattr(module, name) for name in dir(module)}
+    pinfo = yacc.ParserReflect(pdict, log=yacc.NullLogger())
+    pinfo.get_all()
+    if pinfo.error or pinfo.validate_all():
+        raise yacc.YaccError(f"Unable to read the grammar of {module.__name__}")
+    return pinfo
+
+
+class _Tables(yacc.LRGeneratedTable):
+    """PLY's table generator, keeping the LR(0) item set of every state"""
+
+    def lr0_items(self):
+        self.states = super().lr0_items()
+        return self.states
+
+
+def _grammar(pinfo, precedence=True):
+    grammar = yacc.Grammar(pinfo.tokens)
+    for term, assoc, level in pinfo.preclist:
+        grammar.set_precedence(term, assoc, level)
+    for funcname, (file, line, prodname, syms) in pinfo.grammar:
+        grammar.add_production(prodname, syms, funcname, file, line)
+    grammar.set_start(pinfo.start)
+    if not precedence:
+        # After add_production, which needs the levels for %prec
+        grammar.Precedence.clear()
+        for production in grammar.Productions:
+            if production is not None:
+                production.prec = ('right', 0)
+    return grammar
+
+
+def _yields(grammar):
+    """The shortest token sequence each nonterminal derives, leaving out
+    error productions"""
+    best = {}
+    changed = True
+    while changed:
+        changed = False
+        for production in grammar.Productions[1:]:
+            if 'error' in production.prod:
+                continue
+            tokens = []
+            for symbol in production.prod:
+                if symbol in grammar.Nonterminals:
+                    if symbol not in best:
+                        break
+                    tokens.extend(best[symbol])
+                else:
+                    tokens.append(symbol)
+            else:
+                if production.name not in best or len(tokens) < len(best[production.name]):
+                    best[production.name] = tokens
+                    changed = True
+    return best
+
+
+def _prefixes(lr):
+    """The shortest symbol sequence from state 0 to each state, over shifts
+    and gotos (never the error token)"""
+    paths = {0: []}
+    queue = collections.deque([0])
+    while queue:
+        state = queue.popleft()
+        edges = [(t, act) for t, act in lr.lr_action[state].items() if act and act > 0 and t != 'error']
+        edges += lr.lr_goto.get(state, {}).items()
+        for symbol, target in edges:
+            if target not in paths:
+                paths[target] = paths[state] + [symbol]
+                queue.append(target)
+    return paths
+
+
+def _example(state, token, paths, yields):
+    if state not in paths:
+        return None
+    tokens = []
+    for symbol in paths[state]:
+        tokens.extend(yields.get(symbol, [symbol]))
+    return ' '.join(tokens + ['.', token])
+
+
+def _conflicts(lr, grammar):
+    """A record per conflict PLY resolved by default"""
+    states = lr.states
+    paths = _prefixes(lr)
+    yields = _yields(grammar)
+
+    def complete(state, token):
+        return [str(item) for item in states[state]
+                if item.len == item.lr_index + 1 and token in item.lookaheads.get(state, ())]
+
+    found = []
+    for state, token, resolution in lr.sr_conflicts:
+        shifts = [str(item) for item in states[state]
+                  if item.lr_index + 1 < len(item.prod) and item.prod[item.lr_index + 1] == token]
+        found.append({'kind': 'shift/reduce', 'state': state, 'token': token, 'resolution': resolution,
+                      'items': shifts + complete(state, token), 'example': _example(state, token, paths, yields)})
+    # PLY records a reduce/reduce conflict once per lookahead, without it
+    seen = collections.Counter()
+    for state, chosen, rejected in lr.rr_conflicts:
+        key = (state, chosen.number, rejected.number)
+        tokens = sorted(t for t in lr.lr_action[state] if lr.lr_action[state][t] == -chosen.number
+                        and t in [la for item in states[state] if item.number == rejected.number
+                                  for la in item.lookaheads.get(state, ())])
+        token = tokens[seen[key]] if seen[key] < len(tokens) else None
+        seen[key] += 1
+        found.append({'kind': 'reduce/reduce', 'state': state, 'token': token,
+                      'resolution': f'reduce using rule {chosen.number} ({chosen})',
+                      'items': [str(item) for item in states[state] if item.len == item.lr_index + 1
+                                and item.number in (chosen.number, rejected.number)],
+                      'example': _example(state, token or '?', paths, yields)})
+    return found
+
+
+def _table_bytes(lr):
+    """sys.getsizeof of the action and goto dicts and their rows, plus the
+    int objects outside the small-int cache"""
+    size = 0
+    for table in (lr.lr_action, lr.lr_goto):
+        size += sys.getsizeof(table)
+        for row in table.values():
+            size += sys.getsizeof(row)
+            size += sum(sys.getsizeof(act) for act in row.values() if act is not None and not -5 <= act <= 256)
+    return size
+
+
+def _parsetab_bytes(module):
+    name = f'{tablecache.grammar_name(module)}_parsetab_{tablecache.grammar_hash(module)}.py'
+    for directory in tablecache.cache_dirs(module.__file__):
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return os.path.getsize(path)
+    return None
+
+
+def analyze(name):
+    """The report of one grammar module, a JSON-ready dict"""
+    module = importlib.import_module(name)
+    pinfo = _reflect(module)
+    start = time.perf_counter()
+    grammar = _grammar(pinfo)
+    lr = _Tables(grammar, 'LALR')
+    build_sec = time.perf_counter() - start
+    plain = _Tables(_grammar(pinfo, precedence=False), 'LALR')
+    by_precedence = {(s, t) for s, t, _ in plain.sr_conflicts} - {(s, t) for s, t, _ in lr.sr_conflicts}
+    return {
+        'grammar': name,
+        'terminals': len(grammar.Terminals) - 1,
+        'nonterminals': len(grammar.Nonterminals),
+        'productions': len(grammar.Productions) - 1,
+        'states': len(lr.lr_action),
+        'action_entries': sum(len(row) for row in lr.lr_action.values()),
+        'goto_entries': sum(len(row) for row in lr.lr_goto.values()),
+        'shift_reduce': len(lr.sr_conflicts),
+        'reduce_reduce': len(lr.rr_conflicts),
+        'resolved_by_precedence': len(by_precedence),
+        'table_bytes': _table_bytes(lr),
+        'parsetab_bytes': _parsetab_bytes(module),
+        'build_sec': build_sec,
+        'unused_tokens': sorted(grammar.unused_terminals()),
+        'unused_rules': sorted(str(production) for production in grammar.unused_rules()),
+        'conflicts': _conflicts(lr, grammar),
+    }
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('grammars', nargs='*', default=list(tablecache.GRAMMARS))
+    ap.add_argument('--json', metavar='PATH', help='also write the reports as JSON')
+    ap.add_argument('--brief', action='store_true', help='the table only, no conflicts')
+    args = ap.parse_args(argv)
+
+    reports = [analyze(name) for name in args.grammars]
+    print(f"{'grammar':<20}{'states':>7}{'actions':>9}{'gotos':>7}{'S/R':>5}{'R/R':>5}{'prec':>6}"
+          f"{'table KiB':>11}{'parsetab KiB':>14}{'build ms':>10}")
+    for r in reports:
+        parsetab = '-' if r['parsetab_bytes'] is None else f"{r['parsetab_bytes'] / 1024:,.1f}"
+        print(f"{r['grammar']:<20}{r['states']:>7,}{r['action_entries']:>9,}{r['goto_entries']:>7,}"
+              f"{r['shift_reduce']:>5}{r['reduce_reduce']:>5}{r['resolved_by_precedence']:>6}"
+              f"{r['table_bytes'] / 1024:>11,.1f}{parsetab:>14}{r['build_sec'] * 1000:>10.1f}")
+    for r in reports:
+        if r['unused_tokens'] or r['unused_rules']:
+            print(f"{r['grammar']}: unused {', '.join(r['unused_tokens'] + r['unused_rules'])}")
+    if not args.brief:
+        for r in reports:
+            for c in r['conflicts']:
+                print(f"\n{r['grammar']}: {c['kind']} conflict on {c['token']} in state {c['state']}, "
+                      f"resolved as {c['resolution']}")
+                for item in c['items']:
+                    print(f"    {item}")
+                if c['example']:
+                    print(f"    example: {c['example']}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(reports, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
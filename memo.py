@@ -0,0 +1,244 @@
+"""Shared LRU cache of parse results for all grammar modules.
+
+Off by default: on unique inputs hashing, sizing and copying the results
+costs more than the cache saves. Once configured with room, and imported,
+LazyGrammar.parse(code) and recognize(code) look the snippet up here first,
+keyed by the grammar's table hash and a hash of the code, so the same
+`f = open("x", "r")` is only parsed once per process. That covers every
+validate_* function and the grammar.parse(s) calls in the interactive
+loops. Calls that pass their own lexer or other parse() options bypass
+the cache.
+
+Results are copied on the way out, so a caller mutating its AST cannot
+change what the next caller gets. The diagnostics a parse recorded are
+stored with the result and recorded again on a hit. The cache may be
+shared by threads; parses run outside its lock.
+
+    memo.configure(max_entries=memo.MAX_ENTRIES)        # on
+    memo.configure(max_entries=10_000, max_bytes=64 << 20)
+    memo.stats()    # {'hits': ..., 'misses': ..., 'evictions': ..., ...}
+    memo.configure(max_entries=0)                       # off again
+"""
+import collections
+import hashlib
+import sys
+import threading
+
+import diagnostics
+from nodes import Node
+
+MAX_ENTRIES = 4096
+MAX_BYTES = 32 << 20
+# Key, entry and OrderedDict bookkeeping per cached result
+_OVERHEAD = 200
+# A short str or small number inside a result
+_ATOM_BYTES = 56
+
+
+def content_hash(code):
+    """Digest of a str, or of the bytes of a buffer (bytes, memoryview,
+    mmap); the two never share a digest"""
+    if isinstance(code, str):
+        return hashlib.blake2b(code.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+    return hashlib.blake2b(code, digest_size=16, person=b'buffer').digest()
+
+
+# Shared, never copied
+_ATOMS = frozenset({str, int, float, bool, bytes, type(None)})
+
+
+def _put(into, key, value):
+    if isinstance(into, Node):
+        setattr(into, key, value)
+    else:
+        into[key] = value
+
+
+def _copy(value):
+    """Copy an AST: nodes, dicts, lists, tuples and sets are rebuilt,
+    anything else (str, numbers, None) is shared.
+
+    Iterative, with an explicit stack: a left-leaning expression of a few
+    thousand operands nests deeper than the recursion limit.
+    """
+    if type(value) in _ATOMS:
+        return value
+    root = [None]
+    # (original, the container its copy goes into, the index, key or field there)
+    stack = [(value, root, 0)]
+    # Tuples are filled as lists, then frozen innermost first
+    tuples = []
+    while stack:
+        value, into, key = stack.pop()
+        cls = type(value)
+        if cls is list or cls is tuple:
+            new = list(value)
+            stack.extend((item, new, i) for i, item in enumerate(value) if type(item) not in _ATOMS)
+            if cls is tuple:
+                tuples.append((new, into, key))
+        elif cls is dict:
+            new = dict(value)
+            stack.extend((item, new, k) for k, item in value.items() if type(item) not in _ATOMS)
+        elif isinstance(value, Node):
+            new = cls.__new__(cls)
+            for name in cls._fields:
+                item = getattr(value, name)
+                setattr(new, name, item)
+                if type(item) not in _ATOMS:
+                    stack.append((item, new, name))
+        elif cls is set:
+            new = {_copy(item) for item in value}
+        else:
+            new = value
+        _put(into, key, new)
+    for new, into, key in reversed(tuples):
+        _put(into, key, tuple(new))
+    return root[0]
+
+
+def _sizeof(value):
+    """Approximate memory held by a cached result. Containers are measured;
+    strings and numbers inside them count as _ATOM_BYTES each."""
+    if type(value) in _ATOMS:
+        return sys.getsizeof(value)
+    size = 0
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        cls = type(value)
+        size += sys.getsizeof(value)
+        if cls is dict:
+            items = value.values()
+            size += len(value) * _ATOM_BYTES
+        elif isinstance(value, Node):
+            items = [getattr(value, name) for name in cls._fields]
+        elif cls in (list, tuple, set):
+            items = value
+        else:
+            continue
+        for item in items:
+            if type(item) in _ATOMS:
+                size += _ATOM_BYTES
+            else:
+                stack.append(item)
+    return size
+
+
+class _Entry:
+    __slots__ = ('value', 'errors', 'size')
+
+    def __init__(self, value, errors, size):
+        self.value = value
+        self.errors = errors
+        self.size = size
+
+
+class LRUCache:
+    """Least-recently-used cache bounded by entry count and total bytes"""
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = collections.OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def lookup(self, key, compute, copy=True):
+        """The cached result for key, or compute() stored under key.
+
+        The diagnostics compute() records are replayed on later hits.
+        Exceptions are not cached.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            else:
+                self.misses += 1
+        if entry is not None:
+            if entry.errors:
+                diagnostics.replay(entry.errors)
+            return _copy(entry.value) if copy else entry.value
+
+        if not self.enabled:
+            return compute()
+        with diagnostics.collect() as errors:
+            value = compute()
+        # Diagnostics are immutable: stored and replayed as they are
+        errors = tuple(errors)
+        self._store(key, _Entry(value, errors, _sizeof(value) + _sizeof(errors) + _OVERHEAD))
+        # The caller gets a copy; the original stays in the cache
+        return _copy(value) if copy else value
+
+    def _store(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        with self._lock:
+            # Another thread may have parsed the same code meanwhile
+            old = self._entries.get(key)
+            if old is not None:
+                self.bytes -= old.size
+            self._entries[key] = entry
+            self.bytes += entry.size
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.bytes -= old.size
+            self.evictions += 1
+
+    def resize(self, max_entries=None, max_bytes=None):
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        if self.enabled:
+            with self._lock:
+                self._evict()
+        else:
+            self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._entries), 'bytes': self.bytes,
+                    'hit_rate': self.hits / lookups if lookups else 0.0}
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = self.misses = self.evictions = 0
+
+
+# Off until configure() gives it room
+CACHE = LRUCache(max_entries=0)
+
+
+def configure(max_entries=None, max_bytes=None):
+    """Change the shared cache's limits; 0 disables caching"""
+    CACHE.resize(max_entries, max_bytes)
+
+
+def stats():
+    return CACHE.stats()
+
+
+def clear():
+    CACHE.clear()
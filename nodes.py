@@ -0,0 +1,222 @@
+# AST node classes built by the do.py and lambda.py grammar actions.
+#
+# Nodes use __slots__ instead of a per-node dict. to_dict() gives back the
+# dict shape these grammars used to produce, e.g.
+#     Operation('+', a, b).to_dict() == {'type': 'operation', 'op': '+', ...}
+
+
+def to_dict(value):
+    """Convert nodes (and lists of nodes) to their dict form"""
+    if isinstance(value, Node):
+        return value.to_dict()
+    if isinstance(value, list):
+        return [to_dict(item) for item in value]
+    return value
+
+
+class Node:
+    __slots__ = ()
+    type = None        # value of the 'type' key in the dict form
+    _keys = {}         # slot name -> dict key, where they differ
+    _optional = ()     # slots left out of the dict form when None
+    _fields = ()       # all slots, including inherited ones
+
+    def __init_subclass__(cls):
+        super().__init_subclass__()
+        cls._fields = cls._fields + cls.__dict__.get('__slots__', ())
+
+    def to_dict(self):
+        d = {'type': self.type}
+        for name in self._fields:
+            value = getattr(self, name)
+            if value is None and name in self._optional:
+                continue
+            d[self._keys.get(name, name)] = to_dict(value)
+        return d
+
+    def __eq__(self, other):
+        if type(self) is not type(other):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(repr(getattr(self, name)) for name in self._fields)
+        return f'{type(self).__name__}({fields})'
+
+
+# do.py
+
+class Program(Node):
+    __slots__ = ('body',)
+    type = 'program'
+
+    def __init__(self, body):
+        self.body = body
+
+
+class If(Node):
+    __slots__ = ('test', 'body', 'orelse')
+    type = 'if'
+    _keys = {'orelse': 'else'}
+    _optional = ('orelse',)
+
+    def __init__(self, test, body, orelse=None):
+        self.test = test
+        self.body = body
+        self.orelse = orelse
+
+
+class Elif(If):
+    __slots__ = ()
+    type = 'elif'
+
+
+class Else(Node):
+    __slots__ = ('body',)
+    type = 'else'
+
+    def __init__(self, body):
+        self.body = body
+
+
+class While(Node):
+    __slots__ = ('test', 'body')
+    type = 'while'
+
+    def __init__(self, test, body):
+        self.test = test
+        self.body = body
+
+
+class For(Node):
+    __slots__ = ('target', 'iter', 'body')
+    type = 'for'
+
+    def __init__(self, target, iter, body):
+        self.target = target
+        self.iter = iter
+        self.body = body
+
+
+class FunctionDef(Node):
+    __slots__ = ('name', 'params', 'body')
+    type = 'function'
+
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = params
+        self.body = body
+
+
+class ClassDef(Node):
+    __slots__ = ('name', 'bases', 'body')
+    type = 'class'
+    _optional = ('bases',)
+
+    def __init__(self, name, body, bases=None):
+        self.name = name
+        self.bases = bases
+        self.body = body
+
+
+class Operation(Node):
+    __slots__ = ('op', 'left', 'right')
+    type = 'operation'
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Unary(Node):
+    __slots__ = ('op', 'operand')
+    type = 'unary'
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+
+class Atom(Node):
+    __slots__ = ('value',)
+    type = 'atom'
+
+    def __init__(self, value):
+        self.value = value
+
+
+class Attribute(Node):
+    __slots__ = ('object', 'attr')
+    type = 'attribute'
+
+    def __init__(self, object, attr):
+        self.object = object
+        self.attr = attr
+
+
+class Assign(Node):
+    __slots__ = ('target', 'value')
+    type = 'assign'
+
+    def __init__(self, target, value):
+        self.target = target
+        self.value = value
+
+
+class Return(Node):
+    __slots__ = ('value',)
+    type = 'return'
+
+    def __init__(self, value=None):
+        self.value = value
+
+
+class Pass(Node):
+    __slots__ = ()
+    type = 'pass'
+
+
+class Invalid(Node):
+    """Placeholder for code skipped by error recovery; body holds what was
+    still parsed, e.g. the suite of a compound statement with a bad header"""
+    __slots__ = ('line', 'body')
+    type = 'invalid'
+    _optional = ('body',)
+
+    def __init__(self, line, body=None):
+        self.line = line
+        self.body = body
+
+
+# lambda.py
+
+class Lambda(Node):
+    __slots__ = ('parameters', 'body')
+    type = 'lambda'
+
+    def __init__(self, parameters, body):
+        self.parameters = parameters
+        self.body = body
+
+
+class BinaryOp(Node):
+    __slots__ = ('op', 'left', 'right')
+    type = 'binary_op'
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+
+class Identifier(Atom):
+    __slots__ = ()
+    type = 'identifier'
+
+
+class Number(Atom):
+    __slots__ = ()
+    type = 'number'
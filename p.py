@@ -1,5 +1,7 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+import recovery
+import reserved_words
 
 # List of token names
 tokens = (
@@ -34,12 +36,7 @@ def t_newline(t):
     t.lexer.lineno += len(t.value)
 
 # Keywords
-reserved = {
-    'open': 'OPEN',
-    'read': 'READ',
-    'write': 'WRITE',
-    'close': 'CLOSE',
-}
+reserved = reserved_words.FILE_OPERATIONS
 
 # Mode specifications
 modes = {
@@ -71,11 +68,12 @@ def t_STRING(t):
     return t
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}' at line {t.lexer.lineno}")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Build lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parsing rules
 def p_program(p):
@@ -88,12 +86,19 @@ def p_statements(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[2]]
+        p[1].append(p[2])
+        p[0] = p[1]
 
 def p_statement(p):
     '''statement : file_operation'''
     p[0] = p[1]
 
+def p_statement_error(p):
+    '''statement : error'''
+    # Error recovery: keep a placeholder, see recovery.resume
+    p[0] = {'type': 'invalid', 'line': p[1].lineno}
+    recovery.resume(p)
+
 def p_file_operation(p):
     '''file_operation : open_operation
                      | read_operation
@@ -152,21 +157,20 @@ def p_close_operation(p):
     }
 
 def p_error(p):
-    if p:
-        print(f"Syntax error at '{p.value}', line {p.lexer.lineno}")
-    else:
-        print("Syntax error at EOF")
+    return recovery.syntax_error(p)
+
+def validate_file_operation(code, build_ast=True):
+    """Validate file operation syntax: (valid, AST, errors).
 
-# Build parser
-parser = yacc.yacc()
+    errors lists a diagnostics.Diagnostic per error; with build_ast=False
+    only the answer is computed, see validate_python.
+    """
+    return grammar.validate(code, build_ast)
 
-def validate_file_operation(code):
-    """Validate file operation syntax and return AST if valid"""
-    try:
-        ast = parser.parse(code)
-        return True, ast
-    except Exception as e:
-        return False, str(e)
+def recover_file_operation(code):
+    """Parse past syntax errors: (partial AST, errors), where errors lists
+    every error as a diagnostics.Diagnostic"""
+    return recovery.parse(__name__, code)
 
 def main():
     print("File Operations Syntax Validator")
@@ -190,13 +194,15 @@ def main():
                 if not code:
                     continue
                 
-                is_valid, result = validate_file_operation(code)
+                is_valid, result, errors = validate_file_operation(code)
+                diagnostics.report(errors)
                 if is_valid:
                     print("Valid file operation!")
                     print("AST:", result)
                 else:
                     print("Invalid file operation!")
-                    print("Error:", result)
+                    if isinstance(result, str):
+                        print("Error:", result)
             elif choice == '2':
                 break
             else:
@@ -0,0 +1,161 @@
+"""Per-phase timing of validate calls: lexing, the LALR driver, actions.
+
+Off by default. With a hook configured, every LazyGrammar.validate() and
+validate_stream() (so do.validate_python, p.validate_file_operation,
+lambda.validate_lambda and the others) hands it one Timing when it
+returns. The hook is any callable, e.g. a Totals, which adds them up per
+grammar; it runs on the validating thread.
+
+    phases.configure(print)             # each Timing as it comes
+    totals = phases.Totals()
+    phases.configure(totals)
+    do.validate_python(code)
+    totals.report()                     # or totals.summary(), a dict
+    phases.configure(None)              # off again
+
+lex_sec is the time in the token function the parser calls, so it includes
+a layout filter (indentlex) and, for streams, reading the chunks.
+action_sec is the time in the p_* functions (none when recognizing) and
+parse_sec the rest of parser.parse(), the LALR driver itself. total_sec is
+the whole call: also the result cache, copying the AST and collecting the
+diagnostics. A result from the cache (memo) has cached=True and no parse
+phases. With the hook set every token and action is timed, which costs
+about a perf_counter() pair each. Without it validate() only checks HOOK,
+and only once something has imported this module.
+"""
+import collections
+import sys
+import threading
+from time import perf_counter
+
+Timing = collections.namedtuple('Timing', 'grammar mode chars tokens lex_sec parse_sec action_sec total_sec cached')
+Timing.__doc__ = """One validate call: mode is 'parse' or 'recognize', chars the length of
+the input (None for a stream)"""
+
+# The hook, None when timing is off
+HOOK = None
+
+_local = threading.local()
+
+
+def configure(hook):
+    """Hand every validate call's Timing to hook; None turns timing off"""
+    global HOOK
+    HOOK = hook
+
+
+def current():
+    """The clock of the validate call running on this thread, if timed"""
+    return getattr(_local, 'clock', None)
+
+
+class _Clock:
+    """Phase times of one validate call as its parse runs"""
+    __slots__ = ('tokens', 'lex_sec', 'run_sec', 'action_sec', 'parsed')
+
+    def __init__(self):
+        self.tokens = 0
+        self.lex_sec = 0.0
+        self.run_sec = 0.0
+        self.action_sec = 0.0
+        self.parsed = False
+
+    def tokenfunc(self, token):
+        """token, the parser's token function, timed"""
+        def timed():
+            start = perf_counter()
+            t = token()
+            self.lex_sec += perf_counter() - start
+            if t is not None:
+                self.tokens += 1
+            return t
+        return timed
+
+    def run(self, parse, *args, **kwargs):
+        """parse(*args, **kwargs), timed as a whole"""
+        self.parsed = True
+        start = perf_counter()
+        try:
+            return parse(*args, **kwargs)
+        finally:
+            self.run_sec += perf_counter() - start
+
+
+def timed_action(func):
+    """A p_* function that adds its time to the current clock"""
+    def action(p):
+        start = perf_counter()
+        func(p)
+        _local.clock.action_sec += perf_counter() - start
+    return action
+
+
+def timed(grammar, mode, chars, func, *args):
+    """func(*args), a validate call, with its Timing handed to HOOK"""
+    hook = HOOK
+    clock = _Clock()
+    outer = current()
+    _local.clock = clock
+    start = perf_counter()
+    try:
+        return func(*args)
+    finally:
+        total = perf_counter() - start
+        _local.clock = outer
+        if hook is not None:
+            parse = clock.run_sec - clock.lex_sec - clock.action_sec
+            hook(Timing(grammar, mode, chars, clock.tokens, clock.lex_sec, max(parse, 0.0),
+                        clock.action_sec, total, not clock.parsed))
+
+
+# Summed per grammar and mode by Totals
+_FIELDS = ('calls', 'cached', 'chars', 'tokens', 'lex_sec', 'parse_sec', 'action_sec', 'total_sec')
+
+
+class Totals:
+    """A hook that adds up the Timings per grammar and mode"""
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, timing):
+        with self._lock:
+            row = self._rows.get((timing.grammar, timing.mode))
+            if row is None:
+                row = self._rows[timing.grammar, timing.mode] = dict.fromkeys(_FIELDS, 0)
+            row['calls'] += 1
+            row['cached'] += timing.cached
+            row['chars'] += timing.chars or 0
+            row['tokens'] += timing.tokens
+            row['lex_sec'] += timing.lex_sec
+            row['parse_sec'] += timing.parse_sec
+            row['action_sec'] += timing.action_sec
+            row['total_sec'] += timing.total_sec
+
+    def summary(self):
+        """{grammar: {mode: {'calls': ..., 'lex_sec': ..., ...}}}"""
+        with self._lock:
+            result = {}
+            for (grammar, mode), row in sorted(self._rows.items()):
+                result.setdefault(grammar, {})[mode] = dict(row)
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._rows.clear()
+
+    def report(self, file=None):
+        """Print one line per grammar and mode, each phase as a share of
+        the total"""
+        file = sys.stdout if file is None else file
+        print(f"{'grammar':<20}{'mode':<11}{'calls':>7}{'cached':>7}{'tokens':>10}{'total ms':>10}"
+              f"{'lex':>6}{'parse':>7}{'actions':>9}{'other':>7}", file=file)
+        for grammar, modes in self.summary().items():
+            for mode, row in modes.items():
+                total = row['total_sec'] or 1.0
+                other = total - row['lex_sec'] - row['parse_sec'] - row['action_sec']
+                print(f"{grammar:<20}{mode:<11}{row['calls']:>7,}{row['cached']:>7,}{row['tokens']:>10,}"
+                      f"{row['total_sec'] * 1000:>10.1f}{row['lex_sec'] / total:>6.0%}"
+                      f"{row['parse_sec'] / total:>7.0%}{row['action_sec'] / total:>9.0%}{other / total:>7.0%}",
+                      file=file)
@@ -0,0 +1,227 @@
+"""Panic-mode error recovery: every error of an input in one pass.
+
+do.py and p.py have PLY `error` productions for statements (and, in do.py,
+for suites and compound statement headers). On a syntax error the error is
+recorded with its line and column, and the rest of the line is skipped,
+stopping early at one of the grammar's SYNC_TOKENS (do.py: RBRACE, COLON).
+The parser then replaces what it was building with an Invalid node and
+carries on; the error productions' actions end with resume(). A compound
+header missing only its colon (`while x {`) gets one inserted, and braces
+still open at the end of the input are closed, so an unterminated block
+still gives an AST; a statement left unfinished at the end of the input
+becomes an Invalid node (see finish). With a layout filter (indentlex) the
+same applies to indented blocks. Lexer errors are recorded too; all of
+them are diagnostics.Diagnostic records.
+
+    ast, errors = recovery.parse('do', code)
+    diagnostics.report(errors)
+"""
+import copy
+import sys
+
+import diagnostics
+import lazy
+
+
+def _synthetic(type, value, lineno, lexpos):
+    """A token recovery inserts"""
+    return lazy.Token(type, value, lineno, lexpos, synthetic=True)
+
+
+class Recovery:
+    """Token source and error hook of one recovering parse"""
+
+    def __init__(self, lexer, parser, sync=(), layout=None):
+        self.lexer = lexer
+        self.parser = parser
+        # The token source: the lexer, or its tokens through a layout filter
+        self._next = lexer.token if layout is None else lazy._filtered(layout, lexer)
+        self.sync = frozenset(sync)
+        self.depth = 0
+        self._braces = {'LBRACE': 1, 'RBRACE': -1} if 'RBRACE' in self.sync else {}
+        self._pending = []
+
+    def token(self):
+        if self._pending:
+            return self._pending.pop()
+        token = self._next()
+        if token is not None and token.type in self._braces:
+            # A stray '}' is dropped by the parser, it closes nothing
+            self.depth = max(0, self.depth + self._braces[token.type])
+        return token
+
+    def syntax_error(self, token):
+        if token is None:
+            diagnostics.syntax_error(None)
+            end = len(self.lexer.lexdata)
+            line = self.lexer.lineno
+            if self.depth > 0:
+                # Close the open blocks and let the parse finish
+                self._pending.extend(_synthetic('RBRACE', '}', line, end) for _ in range(self.depth - 1))
+                self.depth = 0
+                self.parser.errok()
+                return _synthetic('RBRACE', '}', line, end)
+            return finish(self.parser, self.lexer, sync=self.sync)
+        if getattr(token, 'synthetic', False):
+            # Already reported: the error that made us insert it
+            return finish(self.parser, self.lexer, token, self.sync) if token.type == 'error' else None
+        diagnostics.syntax_error(token)
+        if token.type in ('LBRACE', 'INDENT') and 'COLON' in self.sync and diagnostics.shifts(self.parser, self.parser.statestack, 'COLON'):
+            # `while x {`, or `while x` before an indented block (see
+            # indentlex): only the colon is missing, keep the block
+            self._pending.append(token)
+            if token.type == 'INDENT':
+                self._pending.append(_synthetic('NEWLINE', '\n', token.lineno, token.lexpos))
+            self.parser.errok()
+            return _synthetic('COLON', ':', token.lineno, token.lexpos)
+        expects_colon = 'COLON' in self.sync and self._expects_colon()
+        if token.type not in self.sync:
+            # PLY retries this token after the error; make sure it is
+            # dropped with the rest of the line
+            token.type = '$skipped'
+        line = token.lineno
+        while True:
+            next_token = self.token()
+            if next_token is None or next_token.lineno != line or next_token.type in self.sync:
+                break
+        self._pending.append(next_token)
+        if expects_colon and (next_token is None or next_token.type != 'COLON'):
+            # A compound header without its colon: supply one, so the
+            # header_error rule ends here instead of at the next colon
+            self._pending.append(_synthetic('COLON', ':', line, token.lexpos))
+
+    def _expects_colon(self):
+        """Whether the state PLY will recover in waits for a COLON, i.e.
+        the error is in a compound statement's header"""
+        parser = self.parser
+        action, goto, productions = parser.action, parser.goto, parser.productions
+        # PLY reduces on the error symbol where it can, else pops states
+        states = list(parser.statestack)
+        while states:
+            act = action[states[-1]].get('error')
+            if act is None:
+                states.pop()
+            elif act > 0:
+                return action[act].keys() == {'COLON'}
+            else:
+                production = productions[-act]
+                if production.len:
+                    del states[-production.len:]
+                states.append(goto[states[-1]][production.name])
+        return False
+
+
+def _shift(parser, states, type):
+    """The LR state stack after a `type` token is shifted on states, after
+    any reductions; states itself if the input is accepted there, None if
+    the token is an error"""
+    action, goto, productions = parser.action, parser.goto, parser.productions
+    states = list(states)
+    while True:
+        act = action[states[-1]].get(type)
+        if act is None:
+            return None
+        if act > 0:
+            states.append(act)
+            return states
+        if act == 0:
+            return states
+        production = productions[-act]
+        if production.len:
+            del states[-production.len:]
+        states.append(goto[states[-1]][production.name])
+
+
+def finish(parser, lexer, token=None, sync=()):
+    """Error hook at the end of input: the token the parse goes on with,
+    so that the statements before the error are kept and the unfinished
+    one becomes an Invalid node. PLY would give up and return None.
+
+    At the end of input (token None) that is an `error` token, or what an
+    error production still needs to end: the colon of a compound header
+    whose condition `error` stands for, or the '}' of an open block. PLY
+    calls the hook again each time it is back at the end of input. If no
+    rule takes the `error` token on the current stack, PLY passes it back
+    here: the stack is cut back to the innermost state where an error
+    production can end the input, and PLY pops the state left above it.
+    """
+    states = parser.statestack
+    action = parser.action
+    if token is None:
+        line, end = lexer.lineno, len(lexer.lexdata)
+        parser.errok()
+        after = _shift(parser, states, 'error')
+        if after is not None and (_shift(parser, after, '$end') is not None or action[after[-1]].keys() == {'COLON'}):
+            return _synthetic('error', _synthetic('$end', None, line, end), line, end)
+        if 'COLON' in sync and action[states[-1]].keys() == {'COLON'}:
+            return _synthetic('COLON', ':', line, end)
+        if 'RBRACE' in sync and _shift(parser, states, 'RBRACE') is not None:
+            return _synthetic('RBRACE', '}', line, end)
+        return _synthetic('error', _synthetic('$end', None, line, end), line, end)
+    for i in range(len(states) - 2, -1, -1):
+        shift = action[states[i]].get('error')
+        if shift is not None and shift > 0 and _shift(parser, states[:i + 1] + [shift], '$end') is not None:
+            del states[i + 1:-1]
+            del parser.symstack[i + 1:-1]
+            break
+    return None
+
+
+def syntax_error(token, sync=()):
+    """p_error of a grammar with error productions, for a parse inside a
+    diagnostics.collect() that knows its parser and lexer (as
+    LazyGrammar.parse opens): records the error, and at the end of input
+    lets the parse finish (see finish). sync is the grammar's SYNC_TOKENS."""
+    if getattr(token, 'synthetic', False):
+        if token.type != 'error':
+            return None
+    else:
+        diagnostics.syntax_error(token)
+        if token is not None:
+            return None
+    current = diagnostics.current()
+    if current is None or current.parser is None or current.lexer is None:
+        return None
+    return finish(current.parser, current.lexer, token, sync)
+
+
+def resume(p):
+    """Finish an error production: call from its action.
+
+    A bare `error` rule reduces on any token that may follow it somewhere
+    in the grammar, e.g. a stray '}' or 'else' at top level; if nothing can
+    shift the token here it is dropped, as PLY would otherwise report it,
+    recover at it and loop forever. In a recovering parse, which has
+    skipped the rest of the bad line, the next error is reported at once
+    (errok); elsewhere PLY waits for three good tokens as usual, so the
+    rest of the line does not cascade into more errors.
+    """
+    token = p[1]
+    parser = p.parser
+    if len(p) == 2 and token.type != '$skipped':
+        # PLY keeps the rule's states on the stack during the action
+        states = parser.statestack[:-1]
+        states.append(parser.goto[states[-1]][p.slice[0].type])
+        if not diagnostics.shifts(parser, states, token.type):
+            token.type = '$skipped'
+            return
+    if isinstance(getattr(parser.errorfunc, '__self__', None), Recovery):
+        parser.errok()
+
+
+def parse(name, code, layout=None):
+    """(partial AST, [Diagnostic, ...]) for code in grammar `name`, its
+    tokens passed through layout if given (see indentlex)"""
+    g = lazy.grammar(name)
+    module = sys.modules[g.module_name]
+    lexer = g.local.lexer.clone()
+    lexer.lineno = 1
+    lexer.input(code)
+    parser = copy.copy(g.local.parser)
+    recovery = Recovery(lexer, parser, getattr(module, 'SYNC_TOKENS', ()), layout)
+    parser.errorfunc = recovery.syntax_error
+    with diagnostics.collect(parser, lexer) as errors:
+        value = parser.parse(lexer=lexer, tokenfunc=recovery.token)
+    # Lexer errors are found ahead of the parser
+    errors.sort(key=lambda error: (error.line, error.column))
+    return value, errors
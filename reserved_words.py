@@ -0,0 +1,49 @@
+# Keyword tables shared by the lexers. Each lexer matches a whole identifier
+# with one rule and looks it up here, e.g.
+#     t.type = keywords.get(t.value, 'IDENTIFIER')
+# instead of adding one regex alternative per keyword.
+
+# Python subset: do.py, try1.py, tempCodeRunnerFile.py
+PYTHON = {
+    'while': 'WHILE',
+    'def': 'DEF',
+    'class': 'CLASS',
+    'if': 'IF',
+    'elif': 'ELIF',
+    'else': 'ELSE',
+    'for': 'FOR',
+    'in': 'IN',
+    'return': 'RETURN',
+    'pass': 'PASS',
+    'True': 'BOOLEAN',
+    'False': 'BOOLEAN',
+    'None': 'NONE',
+    'and': 'LOGICAL',
+    'or': 'LOGICAL',
+    'not': 'LOGICAL'
+}
+
+# File operations: p.py, file.py
+FILE_OPERATIONS = {
+    'open': 'OPEN',
+    'read': 'READ',
+    'write': 'WRITE',
+    'close': 'CLOSE',
+}
+
+# C-like scripts: try.py, fun.py
+SCRIPT = {
+    'def': 'DEF',
+    'while': 'WHILE',
+    'print': 'PRINT',
+    'true': 'BOOLEAN',
+    'false': 'BOOLEAN',
+    'null': 'NULL',
+}
+
+# For-loop headers: for.py
+FOR_LOOP = {
+    'for': 'FOR',
+    'in': 'IN',
+    'range': 'RANGE',
+}
@@ -0,0 +1,236 @@
+"""Long-running validation service over localhost HTTP or a Unix socket.
+
+One process accepts connections with asyncio and hands each snippet to a
+pool of worker processes forked with every grammar already built (see
+validate_files.pool), so a request costs a parse, not an interpreter
+start-up and table load.
+
+    python server.py --port 8750
+    python server.py --unix /tmp/afl.sock -j 4 --queue-limit 64 --timeout 2
+
+    curl -s --data-binary 'f = open("x", "r")' localhost:8750/validate/p
+    {"valid": true, "errors": []}
+
+POST /validate/<grammar> with the code as the body; the grammar is a module
+name (do, p, lambda, arr, tuple, for, ...) or a validator name
+(validate_python, validate_file_operation, validate_lambda). GET /stats
+returns the request counters. Connections are kept alive.
+
+Backpressure: at most --queue-limit snippets are queued or running at once;
+beyond that requests get 503 straight away, as do all requests once a
+worker has died and taken the pool down. A request not finished within
+--timeout gets 504. Its worker still finishes the parse and keeps counting
+against the queue limit until it does, so slow inputs cannot pile up
+unbounded work.
+"""
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import json
+import os
+import signal
+import sys
+import time
+
+import batch
+import validate_files
+
+GRAMMARS = ('do', 'p', 'lambda', 'arr', 'tuple', 'for')
+ALIASES = {
+    'validate_python': 'do',
+    'validate_file_operation': 'p',
+    'validate_lambda': 'lambda',
+}
+MAX_BODY = 1 << 20
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            413: 'Payload Too Large', 503: 'Service Unavailable', 504: 'Gateway Timeout'}
+
+# Per worker process; filled in before the pool forks, else (no fork) by
+# each worker on first use
+_validators = {}
+
+
+def _validator(grammar):
+    validator = _validators.get(grammar)
+    if validator is None:
+        validator = _validators[grammar] = batch.Validator(grammar, build_ast=False)
+    return validator
+
+
+def _validate(grammar, code):
+    """Runs in the workers"""
+    result = _validator(grammar).validate(code)
+    return {'valid': result.valid, 'errors': [error._asdict() for error in result.errors]}
+
+
+class Server:
+    """The HTTP front end and its worker pool"""
+
+    def __init__(self, grammars=GRAMMARS, workers=None, queue_limit=None, timeout=5.0, max_body=MAX_BODY):
+        self.grammars = tuple(grammars)
+        self.workers = workers or os.cpu_count()
+        self.queue_limit = queue_limit or self.workers * 8
+        self.timeout = timeout
+        self.max_body = max_body
+        self.pending = 0
+        self.counts = collections.Counter()
+        self.executor = None
+
+    def start_pool(self):
+        for name in self.grammars:
+            _validator(name)
+        self.executor = validate_files.pool(self.workers, self.grammars)
+        # Start every worker now, not on the first requests
+        for future in [self.executor.submit(_validate, name, '') for name in self.grammars * self.workers]:
+            future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+
+    def _done(self, future):
+        self.pending -= 1
+
+    async def validate(self, grammar, code):
+        """(status, body dict) for one snippet"""
+        if self.pending >= self.queue_limit:
+            self.counts['rejected'] += 1
+            return 503, {'error': 'queue full'}
+        try:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, _validate, grammar, code)
+        except concurrent.futures.process.BrokenProcessPool:
+            return self._broken()
+        self.pending += 1
+        # Released when the worker is done, not when we stop waiting
+        future.add_done_callback(self._done)
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.counts['timeouts'] += 1
+            return 504, {'error': f'timed out after {self.timeout}s'}
+        except concurrent.futures.process.BrokenProcessPool:
+            return self._broken()
+        self.counts['valid' if result['valid'] else 'invalid'] += 1
+        return 200, result
+
+    def _broken(self):
+        self.counts['broken'] += 1
+        return 503, {'error': 'worker pool is down'}
+
+    async def route(self, method, path, body):
+        if path == '/stats':
+            return 200, dict(self.counts, pending=self.pending, queue_limit=self.queue_limit, workers=self.workers)
+        prefix, _, name = path.rpartition('/')
+        name = ALIASES.get(name, name)
+        if prefix != '/validate' or name not in self.grammars:
+            return 404, {'error': f'unknown path {path}', 'grammars': list(self.grammars)}
+        if method != 'POST':
+            return 405, {'error': 'use POST'}
+        try:
+            code = body.decode('utf-8')
+        except UnicodeDecodeError as e:
+            return 400, {'error': str(e)}
+        return await self.validate(name, code)
+
+    async def handle(self, reader, writer):
+        """Serve one connection until the client closes it"""
+        self.counts['connections'] += 1
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self.respond(writer, 400, {'error': 'bad request'}, close=True)
+                    break
+                if length > self.max_body:
+                    await self.respond(writer, 413, {'error': f'body over {self.max_body} bytes'}, close=True)
+                    break
+                body = await reader.readexactly(length)
+                self.counts['requests'] += 1
+                status, result = await self.route(method, path, body)
+                close = headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0'
+                await self.respond(writer, status, result, close)
+                if close:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, result, close=False):
+        body = json.dumps(result).encode()
+        head = (f'HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: {"close" if close else "keep-alive"}\r\n\r\n')
+        writer.write(head.encode('latin-1') + body)
+        await writer.drain()
+
+    async def serve(self, host='127.0.0.1', port=8750, unix=None, ready=None):
+        """Serve until cancelled"""
+        if self.executor is None:
+            self.start_pool()
+        if unix:
+            server = await asyncio.start_unix_server(self.handle, unix)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        if ready is not None:
+            ready()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('--host', default='127.0.0.1')
+    ap.add_argument('--port', type=int, default=8750)
+    ap.add_argument('--unix', metavar='PATH', help='listen on a Unix socket instead')
+    ap.add_argument('-j', '--workers', type=int, default=os.cpu_count())
+    ap.add_argument('--queue-limit', type=int, help='queued or running snippets (default: 8 per worker)')
+    ap.add_argument('--timeout', type=float, default=5.0, help='seconds per request')
+    ap.add_argument('--grammars', nargs='+', default=GRAMMARS)
+    args = ap.parse_args(argv)
+
+    server = Server(args.grammars, args.workers, args.queue_limit, args.timeout)
+    start = time.perf_counter()
+    server.start_pool()
+    where = args.unix or f'http://{args.host}:{args.port}'
+
+    def ready():
+        print(f'serving {", ".join(server.grammars)} on {where} with {server.workers} workers '
+              f'(ready in {time.perf_counter() - start:.2f}s)', file=sys.stderr, flush=True)
+
+    async def serve():
+        # Shut the workers down on SIGTERM too, or they outlive the server
+        loop = asyncio.get_running_loop()
+        task = asyncio.current_task()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, task.cancel)
+        try:
+            await server.serve(args.host, args.port, args.unix, ready)
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(serve())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
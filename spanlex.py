@@ -0,0 +1,259 @@
+"""Offset-based tokens: a lexer mode that does not slice the source.
+
+SpanLexer runs a PLY lexer's own master regexes over the input, but the
+tokens it hands out only record (type, start, end). The text is cut out of
+the buffer the first time something reads token.value -- in practice a
+grammar action -- so the recognizer and tokens like LPAREN or COMMA never
+allocate a substring.
+
+Token rules that only rewrite t.value and return t (t_NUMBER's int/float
+conversion, t_STRING) are deferred as well: they run on the first .value
+access. Rules that change the type or touch the lexer (the keyword lookup
+in t_IDENTIFIER, t_newline) still run while scanning.
+
+The input may be a str or any bytes-like buffer (bytes, memoryview, mmap).
+Offsets into a buffer are byte offsets, and values are decoded as UTF-8
+when they are materialized.
+
+    lexer = SpanLexer(do.grammar.lexer)
+    do.grammar.parse(code, lexer=lexer)
+"""
+import dis
+import re
+
+from ply.lex import LexError
+
+
+def _deferrable(func):
+    """True if a token rule only reads/writes t.value and returns t"""
+    code = func.__code__
+    if code.co_argcount != 1 or code.co_cellvars:
+        return False
+    arg = code.co_varnames[0]
+    instructions = list(dis.get_instructions(func))
+    for i, ins in enumerate(instructions):
+        if ins.opname.startswith('RETURN'):
+            prev = instructions[i - 1] if i else None
+            if ins.opname != 'RETURN_VALUE' or prev is None or prev.opname != 'LOAD_FAST' or prev.argval != arg:
+                return False
+        elif ins.argval == arg or (isinstance(ins.argval, tuple) and arg in ins.argval):
+            if ins.opname != 'LOAD_FAST':
+                return False
+            nxt = instructions[i + 1]
+            if nxt.opname not in ('LOAD_ATTR', 'STORE_ATTR', 'RETURN_VALUE'):
+                return False
+            if nxt.opname != 'RETURN_VALUE' and nxt.argval != 'value':
+                return False
+    return True
+
+
+class SpanToken:
+    """A token that knows where it is in the source, not what it says"""
+    __slots__ = ('type', 'lexpos', 'end', 'lineno', 'lexer', '_value')
+
+    def __init__(self, type, lexpos, end, lineno, lexer):
+        self.type = type
+        self.lexpos = lexpos
+        self.end = end
+        self.lineno = lineno
+        self.lexer = lexer
+
+    # _value stays unset until the first read
+    def _get_value(self):
+        try:
+            return self._value
+        except AttributeError:
+            value = self._value = self.lexer.text(self.lexpos, self.end)
+            return value
+
+    def _set_value(self, value):
+        self._value = value
+
+    value = property(_get_value, _set_value)
+
+    @property
+    def materialized(self):
+        return hasattr(self, '_value')
+
+    @property
+    def span(self):
+        return (self.type, self.lexpos, self.end)
+
+    def __str__(self):
+        return f'LexToken({self.type},{self.value!r},{self.lineno},{self.lexpos})'
+
+    __repr__ = __str__
+
+
+class DeferredToken(SpanToken):
+    """SpanToken whose token rule (e.g. t_NUMBER) runs on the first read"""
+    __slots__ = ('rule',)
+
+    def __init__(self, type, lexpos, end, lineno, lexer, rule):
+        SpanToken.__init__(self, type, lexpos, end, lineno, lexer)
+        self.rule = rule
+
+    def _get_value(self):
+        try:
+            return self._value
+        except AttributeError:
+            self._value = self.lexer.text(self.lexpos, self.end)
+            self.rule(self)
+            return self._value
+
+    value = property(_get_value, SpanToken._set_value)
+
+
+_new = object.__new__
+
+
+def _utf8(data):
+    return str(data, 'utf-8')
+
+
+def _rule_table(lexindexfunc):
+    """Per group index: (rule function, token type, deferred?)"""
+    table = []
+    for entry in lexindexfunc:
+        if entry is None:
+            table.append(None)
+        else:
+            func, type = entry
+            table.append((func, type, func is not None and _deferrable(func)))
+    return table
+
+
+class SpanLexer:
+    """Drop-in for a built PLY lexer that produces SpanTokens"""
+
+    def __init__(self, lexer):
+        self.lineno = 1
+        self.lexpos = 0
+        self.lexlen = 0
+        self.lexdata = None
+        self.lexmatch = None
+        self.lexerrorf = lexer.lexerrorf
+        self._str = (
+            [(regex, _rule_table(index)) for regex, index in lexer.lexre],
+            frozenset(lexer.lexignore),
+            {c: c for c in lexer.lexliterals},
+        )
+        self._bytes = None
+        self._source = lexer
+        self._rules, self._ignore, self._literals = self._str
+
+    def _bytes_mode(self):
+        if self._bytes is None:
+            lexer = self._source
+            self._bytes = (
+                [(re.compile(regex.pattern.encode(), regex.flags & ~re.UNICODE), _rule_table(index))
+                 for regex, index in lexer.lexre],
+                frozenset(lexer.lexignore.encode()),
+                {ord(c): c for c in lexer.lexliterals},
+            )
+        return self._bytes
+
+    def input(self, data):
+        self.lexdata = data
+        self.lexpos = 0
+        self.lexlen = len(data)
+        if isinstance(data, str):
+            self._rules, self._ignore, self._literals = self._str
+            self.text = self._str_text
+            self._decode = None
+        else:
+            self._rules, self._ignore, self._literals = self._bytes_mode()
+            self.text = self._bytes_text
+            self._decode = _utf8
+
+    def _str_text(self, start, end):
+        return self.lexdata[start:end]
+
+    def _bytes_text(self, start, end):
+        return str(self.lexdata[start:end], 'utf-8')
+
+    text = _str_text
+    _decode = None
+
+    def skip(self, n):
+        self.lexpos += n
+
+    def token(self):
+        data = self.lexdata
+        pos = self.lexpos
+        length = self.lexlen
+        ignore = self._ignore
+
+        while pos < length:
+            if data[pos] in ignore:
+                pos += 1
+                continue
+
+            for regex, table in self._rules:
+                m = regex.match(data, pos)
+                if not m:
+                    continue
+                end = m.end()
+                func, type, deferred = table[m.lastindex]
+                if func is None:
+                    if type is None:
+                        # Ignored token, e.g. t_ignore_COMMENT
+                        pos = end
+                        break
+                    # Built field by field: cheaper than an __init__ call
+                    # on the hot path
+                    tok = _new(SpanToken)
+                    tok.type = type
+                    tok.lexpos = pos
+                    tok.end = self.lexpos = end
+                    tok.lineno = self.lineno
+                    tok.lexer = self
+                    return tok
+                self.lexpos = end
+                if deferred:
+                    tok = _new(DeferredToken)
+                    tok.type = type
+                    tok.lexpos = pos
+                    tok.end = end
+                    tok.lineno = self.lineno
+                    tok.lexer = self
+                    tok.rule = func
+                    return tok
+                self.lexmatch = m
+                tok = SpanToken(type, pos, end, self.lineno, self)
+                # Eager rules read the text straight away (keyword lookup)
+                tok._value = m.group() if self._decode is None else self._decode(m.group())
+                tok = func(tok)
+                if tok:
+                    return tok
+                pos = self.lexpos
+                ignore = self._ignore
+                break
+            else:
+                literal = self._literals.get(data[pos])
+                if literal is not None:
+                    self.lexpos = pos + 1
+                    return SpanToken(literal, pos, pos + 1, self.lineno, self)
+
+                if self.lexerrorf is None:
+                    self.lexpos = pos
+                    raise LexError(f"Illegal character at index {pos}", data[pos:])
+                self.lexpos = pos
+                tok = self.lexerrorf(SpanToken('error', pos, length, self.lineno, self))
+                if self.lexpos == pos:
+                    raise LexError(f"Scanning error at index {pos}", data[pos:])
+                if tok:
+                    return tok
+                pos = self.lexpos
+
+        self.lexpos = pos
+        return None
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        tok = self.token()
+        if tok is None:
+            raise StopIteration
+        return tok
@@ -0,0 +1,67 @@
+"""Lex a file object or mmap chunk by chunk instead of as one string.
+
+PLY's lexer.input() wants the whole text in memory. stream_tokens() reads
+the source chunk_size at a time, cuts it after the last complete line and
+lexes one window at a time. None of the grammars has a token that crosses
+a newline (strings are single-line, comments stop at one), so no token can
+straddle two windows -- other than a run of newlines, which t_newline only
+counts, so splitting it is harmless. A token cut by the chunk boundary,
+say `**` or a half-read string, just waits in the window for its line to
+finish.
+
+Memory is bounded by the chunk size plus the longest line, not by the size
+of the input. Binary streams (open(path, 'rb'), mmap) are decoded
+incrementally as UTF-8; token lexpos is a character offset into the whole
+stream.
+
+    with open(path) as f:
+        ok, _, errors = do.validate_python_stream(f)
+"""
+import codecs
+
+CHUNK_SIZE = 1 << 16
+
+
+def windows(stream, chunk_size=CHUNK_SIZE):
+    """Yield the text of stream in pieces that end on a line boundary"""
+    decoder = None
+    pending = []    # text read since the last newline
+    while True:
+        chunk = stream.read(chunk_size)
+        eof = not chunk
+        if not isinstance(chunk, str):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder('utf-8')()
+            chunk = decoder.decode(chunk, final=eof)
+        if eof:
+            pending.append(chunk)
+            text = ''.join(pending)
+            if text:
+                yield text
+            return
+        cut = chunk.rfind('\n') + 1
+        if not cut:
+            pending.append(chunk)
+            continue
+        pending.append(chunk[:cut])
+        yield ''.join(pending)
+        pending = [chunk[cut:]]
+
+
+def stream_tokens(lexer, stream, chunk_size=CHUNK_SIZE):
+    """Yield the tokens of stream, lexing one window at a time"""
+    base = 0
+    for text in windows(stream, chunk_size):
+        lexer.input(text)
+        # Where lexdata starts in the stream, for error columns
+        lexer.lexbase = base
+        for tok in iter(lexer.token, None):
+            tok.lexpos += base
+            yield tok
+        base += len(text)
+
+
+def token_function(lexer, stream, chunk_size=CHUNK_SIZE):
+    """stream_tokens() as a tokenfunc for parser.parse()"""
+    tokens = stream_tokens(lexer, stream, chunk_size)
+    return lambda: next(tokens, None)
@@ -0,0 +1,172 @@
+import copy
+import hashlib
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+import ply
+from ply import lex
+from ply import yacc
+
+# Every validator module in this directory that builds a PLY grammar
+GRAMMARS = (
+    'do', 'p', 'try', 'try1', 'fun', 'lambda', 'arr', 'tuple',
+    'dic', 'oo', 'file', 'for', 'tempCodeRunnerFile',
+)
+
+# Module-level names that feed into the generated tables
+_TABLE_NAMES = ('tokens', 'literals', 'precedence', 'start', 'states')
+
+
+def cache_dirs(module_file):
+    """Candidate cache directories, in lookup order"""
+    dirs = []
+    if os.environ.get('PLY_CACHE_DIR'):
+        dirs.append(os.environ['PLY_CACHE_DIR'])
+    dirs.append(os.path.join(os.path.dirname(os.path.abspath(module_file)), '.plycache'))
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    dirs.append(os.path.join(base, 'afl-plycache'))
+    return dirs
+
+
+def grammar_name(module):
+    """Name of a grammar module, also when it runs as __main__"""
+    return os.path.splitext(os.path.basename(module.__file__))[0]
+
+
+def grammar_hash(module):
+    """Hash of the token rules and grammar rules defined by a module"""
+    h = hashlib.sha256()
+    h.update(f'{ply.__version__}:{yacc.__tabversion__}:{lex.__tabversion__}\n'.encode())
+    for name in _TABLE_NAMES:
+        h.update(f'{name}={getattr(module, name, None)!r}\n'.encode())
+
+    strings = []
+    functions = []
+    for name, value in vars(module).items():
+        if not name.startswith(('t_', 'p_')):
+            continue
+        if isinstance(value, str):
+            strings.append((name, value))
+        elif isinstance(value, types.FunctionType):
+            functions.append((value.__code__.co_firstlineno, name, value.__doc__))
+
+    # Function rules are matched in definition order, so keep that order
+    # but not the absolute line numbers
+    for name, value in sorted(strings):
+        h.update(f'{name}={value!r}\n'.encode())
+    for _, name, doc in sorted(functions):
+        h.update(f'{name}={doc!r}\n'.encode())
+    return h.hexdigest()[:16]
+
+
+def _load(path, name):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def load_cached(dirs, name):
+    """Import module `name` from the first cache directory that has it"""
+    for directory in dirs:
+        path = os.path.join(directory, name + '.py')
+        if os.path.exists(path):
+            try:
+                return _load(path, name)
+            except Exception:
+                continue
+    return None
+
+
+def build_cached(dirs, name, build):
+    """Run build(outputdir) in a private directory and move the result into
+    the first writable cache directory. Returns whatever build returned."""
+    for directory in dirs:
+        try:
+            os.makedirs(directory, exist_ok=True)
+            workdir = tempfile.mkdtemp(prefix='.build-', dir=directory)
+        except OSError:
+            continue
+        try:
+            result = build(workdir)
+            built = os.path.join(workdir, name + '.py')
+            if os.path.exists(built):
+                os.replace(built, os.path.join(directory, name + '.py'))
+            return result
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return None
+
+
+def build_lexer(module_name, **kwargs):
+    """Build the lexer for a grammar module, reusing a cached lextab"""
+    module = sys.modules[module_name]
+    dirs = cache_dirs(module.__file__)
+    name = f'{grammar_name(module)}_lextab_{grammar_hash(module)}'
+
+    lextab = load_cached(dirs, name)
+    if lextab is not None:
+        try:
+            return lex.lex(module=module, optimize=True, lextab=lextab, **kwargs)
+        except ImportError:
+            pass
+
+    lexer = build_cached(dirs, name, lambda outputdir: lex.lex(
+        module=module, optimize=True, lextab=name, outputdir=outputdir, **kwargs))
+    if lexer is None:
+        # Nowhere to write: build in memory only
+        lexer = lex.lex(module=module, **kwargs)
+    return lexer
+
+
+def build_parser(module_name, **kwargs):
+    """Build the parser for a grammar module, reusing a cached parsetab"""
+    module = sys.modules[module_name]
+    dirs = cache_dirs(module.__file__)
+    name = f'{grammar_name(module)}_parsetab_{grammar_hash(module)}'
+    kwargs.setdefault('debug', False)
+
+    # yacc() checks the table signature itself and rebuilds if it is stale
+    parsetab = load_cached(dirs, name)
+    if parsetab is not None:
+        return yacc.yacc(module=module, tabmodule=parsetab, write_tables=False, **kwargs)
+
+    parser = build_cached(dirs, name, lambda outputdir: yacc.yacc(
+        module=module, tabmodule=name, outputdir=outputdir, **kwargs))
+    if parser is None:
+        parser = yacc.yacc(module=module, tabmodule=name, write_tables=False, **kwargs)
+    return parser
+
+
+def rebind_parser(parser, actions, errorfunc):
+    """A new parser over the same LALR tables with different actions.
+
+    `actions` maps p_* function names to callables; the tables are shared,
+    only the productions are copied.
+    """
+    table = yacc.LRTable()
+    table.lr_action = parser.action
+    table.lr_goto = parser.goto
+    table.lr_method = 'LALR'
+    table.lr_productions = [copy.copy(production) for production in parser.productions]
+    table.bind_callables(actions)
+    return yacc.LRParser(table, errorfunc)
+
+
+def prebuild(names=GRAMMARS):
+    """Build every grammar so its tables land in the cache"""
+    import lazy
+    lazy.warm_up(*names)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    prebuild(sys.argv[1:] or GRAMMARS)
+    for directory in cache_dirs(__file__):
+        if os.path.isdir(directory):
+            print(f"Tables cached in {directory}")
+            break
@@ -1,5 +1,6 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+import reserved_words
 
 # Define tokens for Python syntax
 tokens = (
@@ -54,47 +55,10 @@ t_COLON = r':'
 
 t_ignore = ' \t\n'
 
-# More complex tokens defined as functions
-def t_WHILE(t):
-    r'while'
-    return t
-
-def t_DEF(t):
-    r'def'
-    return t
-
-def t_CLASS(t):
-    r'class'
-    return t
-
-def t_IF(t):
-    r'if'
-    return t
-
-def t_ELIF(t):
-    r'elif'
-    return t
-
-def t_ELSE(t):
-    r'else'
-    return t
-
-def t_FOR(t):
-    r'for'
-    return t
-
-def t_IN(t):
-    r'in'
-    return t
-
-def t_RETURN(t):
-    r'return'
-    return t
-
-def t_PASS(t):
-    r'pass'
-    return t
+# Keywords
+keywords = reserved_words.PYTHON
 
+# More complex tokens defined as functions
 def t_NUMBER(t):
     r'\d*\.\d+|\d+'
     t.value = float(t.value) if '.' in t.value else int(t.value)
@@ -104,32 +68,22 @@ def t_STRING(t):
     r'\"([^\\\n]|(\\.))*?\"|\'([^\\\n]|(\\.))*?\''
     return t
 
-def t_BOOLEAN(t):
-    r'True|False'
-    return t
-
-def t_NONE(t):
-    r'None'
-    return t
-
-def t_LOGICAL(t):
-    r'and|or|not'
-    return t
-
 def t_IDENTIFIER(t):
     r'[a-zA-Z_][a-zA-Z0-9_]*'
+    t.type = keywords.get(t.value, 'IDENTIFIER')
     return t
 
 def t_COMPARISON(t):
-    r'==|!=|<=|>=|<|>|is|is not|in|not in'
+    r'==|!=|<=|>=|<|>'
     return t
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Create lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parser rules
 def p_program(p):
@@ -231,13 +185,7 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    if p:
-        print(f"Syntax error at token: {p.value}")
-    else:
-        print("Syntax error at EOF")
-
-# Create parser
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 # Main loop
 def main():
@@ -249,7 +197,9 @@ def main():
             s = input('Enter Python code: ')
             if not s:
                 continue
-            result = parser.parse(s)
+            with diagnostics.collect() as errors:
+                result = grammar.parse(s)
+            diagnostics.report(errors)
             if result == "Valid":
                 print("Valid Python syntax")
             else:
@@ -0,0 +1,16 @@
+import allocs
+import batch
+import do
+
+
+def test_profile_leaves_results_alone():
+    codes = ['x = 1\n', 'def area(w, h): return w * h\n', 'x = = 1\n']
+    with allocs.profile() as profile:
+        profiled = [do.validate_python(code) for code in codes]
+        results = list(batch.validate_many(codes, 'do'))
+    assert profiled == [do.validate_python(code) for code in codes]
+    assert results == list(batch.validate_many(codes, 'do'))
+    summary = profile.summary()
+    row = summary['grammars']['do']
+    assert row['calls'] == 2 * len(codes)
+    assert sum(site['bytes'] for site in summary['sites']) == row['bytes']
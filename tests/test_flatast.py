@@ -0,0 +1,45 @@
+"""flatast against do.py's own AST, also through a to_bytes/from_bytes
+round trip"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import flatast
+import lazy
+import nodes
+from bench.corpus import SAMPLES
+from bench.scaling import CASES
+
+PROGRAMS = SAMPLES['do'].splitlines(keepends=True) + [
+    SAMPLES['do'],
+    CASES['do'](200),
+    'if a: x = 1\nelif b: x = 2\nelse: x = -3\n',
+    'def f(a): { if a: return a pass }\n',
+    'x = "s" + None\ny = a.b.c\n',
+]
+
+
+@pytest.mark.parametrize('code', PROGRAMS)
+def test_matches_do_ast(code):
+    tree = flatast.parse(code)
+    expected = nodes.to_dict(lazy.grammar('do').parse(code))
+    assert tree.to_dict() == expected
+    assert flatast.FlatAST.from_bytes(tree.to_bytes()).to_dict() == expected
+
+
+@pytest.mark.parametrize('code, message', [
+    ('x = = 1\n', "Syntax error at '=', line 1"),
+    ('x = 1 $ 2\n', "Illegal character '$' at line 1"),
+])
+def test_rejects_invalid_input(code, message):
+    with pytest.raises(SyntaxError) as info:
+        flatast.parse(code)
+    assert str(info.value) == message
+
+
+def test_threads():
+    programs = PROGRAMS * 20
+    expected = [flatast.parse(code).to_dict() for code in programs]
+    with ThreadPoolExecutor(8) as pool:
+        trees = list(pool.map(flatast.parse, programs))
+    assert [tree.to_dict() for tree in trees] == expected
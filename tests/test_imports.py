@@ -0,0 +1,23 @@
+"""Modules that must stay out of sys.modules until something needs them:
+PLY until a grammar is first built, the result cache, phase timing and
+allocation profiling until a caller switches them on"""
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+IMPORT = 'import batch, do, indentlex, p, recovery'
+USE = IMPORT + "; do.validate_python('x = 1'); list(batch.validate_many(['x = 1']))"
+
+
+@pytest.mark.parametrize('module, code', [
+    ('ply', IMPORT),
+    ('memo', USE),
+    ('phases', USE),
+    ('allocs', USE),
+])
+def test_not_imported(module, code):
+    code = f"import sys; {code}; sys.exit({module!r} in sys.modules)"
+    assert subprocess.run([sys.executable, '-c', code], cwd=ROOT).returncode == 0
@@ -0,0 +1,81 @@
+"""incremental.Document against a full reparse, after random edits"""
+import random
+
+import diagnostics
+import lazy
+from bench.incremental import random_edit, random_program
+from incremental import Document
+from nodes import to_dict
+
+
+def full_parse(text):
+    """Reference result: a from-scratch parse with do's own parser,
+    stopping at the first syntax error"""
+    g = lazy.grammar('do')
+    lexer = g.lexer.clone()
+    lexer.lineno = 1
+    with diagnostics.collect() as errors:
+        ok, _ = g._recognize(text, lexer=lexer)
+    if not ok:
+        return False, None, errors
+    lexer.lineno = 1
+    return not errors, g.parse(text, lexer=lexer), errors
+
+
+def _comparable(result):
+    valid, program, errors = result
+    return valid, None if program is None else to_dict(program), errors
+
+
+def test_random_edits_match_full_parse(count=2000, statements=30, seed=0):
+    rng = random.Random(seed)
+    doc = Document(random_program(rng, statements))
+    mismatches = []
+    valid = 0
+    for i in range(count):
+        if i % 200 == 0 or not doc.text:
+            doc.reset(random_program(rng, statements))
+        start, end, new = random_edit(rng, doc.text)
+        result = doc.edit(start, end, new)
+        valid += result[0]
+        if _comparable(result) != _comparable(full_parse(doc.text)):
+            mismatches.append((start, end, new))
+            doc.reset(doc.text)
+        elif not result[0] and rng.random() < 0.7:
+            # Keep going from valid programs most of the time
+            doc.reset(random_program(rng, statements))
+    assert not mismatches
+    assert 0 < valid < count
+
+
+def test_edit_keeps_statements_after_it():
+    doc = Document('x = 1\ny = 2\nz = 3\n')
+    valid, program, errors = doc.edit(4, 5, '42')
+    assert valid and not errors
+    assert doc.text == 'x = 42\ny = 2\nz = 3\n'
+    assert [doc.start(i) for i in range(3)] == [0, 7, 13]
+    assert to_dict(program) == to_dict(full_parse(doc.text)[1])
+
+
+def test_lex_errors_are_kept_and_moved():
+    doc = Document('x = 1\ny = 2\nz = 3\n')
+    valid, program, errors = doc.edit(6, 6, '$')
+    assert not valid and len(program.body) == 3
+    assert errors == [diagnostics.Diagnostic('lex', '$', 2, 1, ())]
+    assert _comparable(doc.result) == _comparable(full_parse(doc.text))
+    # An edit before it moves it; one after it keeps it
+    assert doc.edit(0, 0, 'w = 0\n')[2] == [diagnostics.Diagnostic('lex', '$', 3, 1, ())]
+    assert doc.edit(len(doc.text), len(doc.text), 'v = 4\n')[2] == [diagnostics.Diagnostic('lex', '$', 3, 1, ())]
+    valid, program, errors = doc.edit(doc.text.index('$'), doc.text.index('$') + 1, '')
+    assert valid and len(program.body) == 5 and errors == []
+
+
+def test_edit_inside_suite():
+    # Not a sync point: the enclosing top-level statement is reparsed whole
+    body = ' '.join(f'x{i} = {i}' for i in range(50))
+    doc = Document(f'a = 1\ndef f(a): {{ {body} }}\nb = 2\n')
+    pos = doc.text.index('x25 = 25') + len('x25 = ')
+    valid, program, errors = doc.edit(pos, pos + 2, 'a + 1')
+    assert valid and len(program.body) == 3
+    assert [doc.start(i) for i in range(3)] == [0, 6, doc.text.index('b = 2')]
+    assert to_dict(program) == to_dict(full_parse(doc.text)[1])
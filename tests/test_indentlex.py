@@ -0,0 +1,59 @@
+import io
+
+import diagnostics
+import do
+import nodes
+
+
+def test_indented_block_matches_braced():
+    indented = do.validate_python('while x:\n    y = 1\n    z = 2\n', indent=True)
+    braced = do.validate_python('while x: { y = 1 z = 2 }\n')
+    assert indented[0] and braced[0]
+    assert nodes.to_dict(indented[1]) == nodes.to_dict(braced[1])
+
+
+def test_dedent_to_unknown_width():
+    valid, program, errors = do.validate_python('if a:\n    x = 1\n  y = 2\n', indent=True)
+    assert not valid and len(program.body) == 2
+    assert errors == [diagnostics.Diagnostic('indent', None, 3, 3, ())]
+
+
+NESTED = (
+    'if a:\n'
+    '    if b:\n'
+    '        x = 1\n'
+    '    elif c:\n'
+    '        x = 2\n'
+    '    else:\n'
+    '        if d:\n'
+    '            x = 3\n'
+    'else:\n'
+    '    x = 4\n'
+)
+NESTED_BRACED = 'if a: { if b: { x = 1 } elif c: { x = 2 } else: { if d: { x = 3 } } } else: { x = 4 }\n'
+
+
+def test_nested_dedents_before_elif_and_else():
+    indented = do.validate_python(NESTED, indent=True)
+    braced = do.validate_python(NESTED_BRACED)
+    assert indented[0] and braced[0]
+    assert nodes.to_dict(indented[1]) == nodes.to_dict(braced[1])
+
+
+def test_continuation_inside_parentheses():
+    code = 'if a:\n    x = (1 +\n2)\n    y = (a\n        * b)\nz = 3\n'
+    indented = do.validate_python(code, indent=True)
+    braced = do.validate_python('if a: { x = (1 + 2) y = (a * b) } z = 3\n')
+    assert indented[0] and braced[0]
+    assert nodes.to_dict(indented[1]) == nodes.to_dict(braced[1])
+
+
+def test_stream():
+    expected = nodes.to_dict(do.validate_python(NESTED, indent=True)[1])
+    for chunk_size in (1, 7, 4096):
+        assert do.validate_python_stream(io.StringIO(NESTED), chunk_size=chunk_size, indent=True) == (True, None, [])
+        valid, program, errors = do.validate_python_stream(io.BytesIO(NESTED.encode()), build_ast=True,
+                                                           chunk_size=chunk_size, indent=True)
+        assert valid and nodes.to_dict(program) == expected
+    valid, _, errors = do.validate_python_stream(io.StringIO('if a:\n    x = 1\n  y = 2\n'), indent=True)
+    assert not valid and [e.kind for e in errors] == ['indent']
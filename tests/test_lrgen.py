@@ -0,0 +1,140 @@
+"""Differential check of lrgen's generated drivers against PLY's own
+parser.parse, on random sentences of the grammar and mutations of them"""
+import random
+import sys
+
+import pytest
+
+import lazy
+import lrgen
+
+
+class _Token:
+    def __init__(self, type, value, lineno=1):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = 0
+
+    def __repr__(self):
+        return self.type
+
+
+def _heights(nonterminals):
+    """Height of the shallowest derivation tree for each nonterminal"""
+    heights = dict.fromkeys(nonterminals, float('inf'))
+    changed = True
+    while changed:
+        changed = False
+        for symbol, options in nonterminals.items():
+            for rhs in options:
+                h = 1 + max((heights[s] for s in rhs if s in heights), default=0)
+                if h < heights[symbol]:
+                    heights[symbol] = h
+                    changed = True
+    return heights
+
+
+def _sentence(nonterminals, heights, rng, symbol, depth, out):
+    if symbol not in nonterminals:
+        out.append(symbol)
+        return
+    options = nonterminals[symbol]
+    if depth <= 0:
+        # Past the depth budget, take the shallowest rule so we terminate
+        options = [min(options, key=lambda rhs: max((heights[s] for s in rhs if s in heights), default=0))]
+    for child in rng.choice(options):
+        _sentence(nonterminals, heights, rng, child, depth - 1, out)
+
+
+def _mutate(types, terminals, rng):
+    types = list(types)
+    for _ in range(rng.randint(1, 3)):
+        op = rng.randrange(3)
+        pos = rng.randrange(len(types) + 1)
+        if op == 0 and types:
+            del types[min(pos, len(types) - 1)]
+        elif op == 1:
+            types.insert(pos, rng.choice(terminals))
+        elif types:
+            types[min(pos, len(types) - 1)] = rng.choice(terminals)
+    return types
+
+
+def _tokens(types, values):
+    return [_Token(t, values.get(t, t.lower())) for t in types]
+
+
+# Values that the actions inspect, e.g. p_atom tests p[1] == '('
+VALUES = {'LPAREN': '(', 'RPAREN': ')', 'LBRACE': '{', 'RBRACE': '}', 'NUMBER': 1, 'STRING': '"s"'}
+
+
+@pytest.mark.parametrize('name', ['do', 'p'])
+def test_generated_driver_matches_ply(name, count=1000, seed=0, depth=8):
+    parser = lazy.grammar(name).parser
+    lexer = lazy.grammar(name).lexer
+    driver = lrgen.load(name)
+    rng = random.Random(seed)
+
+    nonterminals = {}
+    for production in parser.productions[1:]:
+        rhs = lrgen._rhs(production)
+        if 'error' not in rhs:
+            # Error productions only match through recovery, not as input
+            nonterminals.setdefault(production.name, []).append(rhs)
+    heights = _heights(nonterminals)
+    start = parser.productions[0].str.split('->', 1)[1].split()[0]
+    terminals = list(sys.modules[name].tokens)
+
+    def run_ply(tokens):
+        errors = []
+        errorfunc = parser.errorfunc
+        parser.errorfunc = errors.append
+        try:
+            stream = iter(tokens)
+            result = parser.parse(lexer=lexer, tokenfunc=lambda: next(stream, None))
+        finally:
+            parser.errorfunc = errorfunc
+        return (False, None) if errors else (True, result)
+
+    def run_driver(tokens):
+        stream = iter(tokens)
+        try:
+            return True, driver.parse_tokens(lambda: next(stream, None))
+        except SyntaxError:
+            return False, None
+
+    mismatches = []
+    accepted = 0
+    for i in range(count):
+        types = []
+        _sentence(nonterminals, heights, rng, start, depth, types)
+        if i % 2:
+            types = _mutate(types, terminals, rng)
+        expected = run_ply(_tokens(types, VALUES))
+        accepted += expected[0]
+        if expected != run_driver(_tokens(types, VALUES)):
+            mismatches.append(' '.join(types))
+    assert not mismatches
+    # Both halves exercised: valid sentences and rejected mutations
+    assert 0 < accepted < count
+
+
+def test_parse_source():
+    driver = lrgen.load('do')
+    code = 'x = 1\nwhile x: { x = x - 1 }\n'
+    assert repr(driver.parse(code)) == repr(lazy.grammar('do').parse(code))
+
+
+@pytest.mark.parametrize('code, message', [
+    ('x = = 1', "Syntax error at '=', line 1"),
+    ('x = 1\ny = = 1', "Syntax error at '=', line 2"),
+    ('x = 1 $ 2', "Illegal character '$' at line 1"),
+])
+def test_parse_rejects(code, message):
+    driver = lrgen.load('do')
+    for _ in range(2):
+        # Twice: line numbers restart on every call
+        with pytest.raises(SyntaxError) as info:
+            driver.parse(code)
+        assert str(info.value) == message
@@ -0,0 +1,53 @@
+"""The result cache must never change what validate returns"""
+import pytest
+
+import do
+import lazy
+import memo
+
+
+@pytest.fixture
+def cache():
+    memo.configure(max_entries=memo.MAX_ENTRIES)
+    memo.clear()
+    memo.CACHE.reset_stats()
+    yield memo.CACHE
+    memo.configure(max_entries=0)
+
+
+def test_off_by_default():
+    assert not memo.CACHE.enabled
+
+
+def test_deep_ast(cache):
+    code = 'x = ' + ' + '.join(['1'] * 3000)
+    for _ in range(2):
+        valid, result, errors = do.validate_python(code)
+        assert valid and not errors
+    assert cache.stats()['hits'] == 1
+
+
+@pytest.mark.parametrize('code', [b'x = 1\n', memoryview(b'x = 1\n')])
+def test_buffer_input(cache, code):
+    g = lazy.grammar('do')
+    assert g.validate(code, build_ast=False) == (True, None, [])
+    assert memo.content_hash(code) != memo.content_hash('x = 1\n')
+
+
+@pytest.mark.parametrize('cached', [False, True])
+def test_buffer_parse(request, cached):
+    if cached:
+        request.getfixturevalue('cache')
+    for code in (b'x = 1\n', bytearray(b'x = 1\n'), memoryview(b'x = 1\n')):
+        valid, program, errors = do.validate_python(code)
+        assert valid and not errors
+        assert repr(program) == "Program([Assign('x', Atom(1))])"
+
+
+def test_hits_are_copies(cache):
+    code = "def area(w, h): return w * h\nclass Shape(Base): { name = 'shape' pass }\n"
+    first = do.validate_python(code)[1]
+    first.body.clear()
+    second = do.validate_python(code)[1]
+    assert len(second.body) == 2
+    assert cache.stats()['hits'] == 1
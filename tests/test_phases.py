@@ -0,0 +1,17 @@
+import do
+import phases
+
+
+def test_timing_leaves_results_alone():
+    code = "def area(w, h): return w * h\nx = $ 1\n"
+    timings = []
+    phases.configure(timings.append)
+    try:
+        timed = [do.validate_python(code), do.validate_python(code, build_ast=False)]
+    finally:
+        phases.configure(None)
+    assert timed == [do.validate_python(code), do.validate_python(code, build_ast=False)]
+    assert [t.mode for t in timings] == ['parse', 'recognize']
+    for t in timings:
+        assert t.grammar == 'do' and t.chars == len(code) and t.tokens > 0
+        assert t.lex_sec + t.parse_sec + t.action_sec <= t.total_sec
@@ -0,0 +1,33 @@
+import pytest
+
+import do
+
+
+def test_inserted_tokens():
+    # The missing colon is inserted and the open brace closed at the end
+    program, errors = do.recover_python('while x {\n y = 1\n')
+    assert [(e.kind, e.token, e.line) for e in errors] == [('syntax', '{', 1), ('syntax', None, 3)]
+    assert program.body[0].type == 'while'
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('x = 1\ny = (2', "Program([Assign('x', Atom(1)), Invalid(2, None)])"),
+    ('x = 1\nwhile y\n', "Program([Assign('x', Atom(1)), Invalid(3, None)])"),
+    ('x = 1\ny = 2\nz = ', "Program([Assign('x', Atom(1)), Assign('y', Atom(2)), Invalid(3, None)])"),
+    ('x = 1\nwhile', "Program([Assign('x', Atom(1)), While(Invalid(2, None), [Invalid(2, None)])])"),
+    ('while x: { y = 1', "Program([While(Atom('x'), [Assign('y', Atom(1))])])"),
+])
+def test_unfinished_at_end(code, expected):
+    # The statements before it are kept, with one error at the end
+    program, errors = do.recover_python(code)
+    assert repr(program) == expected
+    assert [(e.kind, e.token) for e in errors] == [('syntax', None)]
+    valid, program, errors = do.validate_python(code)
+    assert not valid and repr(program) == expected
+    assert [(e.kind, e.token) for e in errors] == [('syntax', None)]
+
+
+def test_unfinished_at_end_indented():
+    program, errors = do.recover_python('x = 1\ny = 2\nz = ', indent=True)
+    assert repr(program) == "Program([Assign('x', Atom(1)), Assign('y', Atom(2)), Invalid(3, None)])"
+    assert len(errors) == 1
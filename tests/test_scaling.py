@@ -0,0 +1,19 @@
+"""Smoke test for the list-building rules at bench/scaling.py's largest size;
+the timing itself stays in the benchmark"""
+import pytest
+
+import lazy
+from bench.scaling import CASES
+
+SIZE = 100_000
+
+
+@pytest.mark.parametrize('name', list(CASES))
+def test_parses_large_list(name):
+    result = lazy.grammar(name).parse(CASES[name](SIZE))
+    if isinstance(result, str):
+        # The array grammars only recognise their input
+        assert result == 'Valid'
+    else:
+        items = getattr(result, 'body', result)
+        assert len(items) == SIZE
@@ -0,0 +1,47 @@
+import asyncio
+import concurrent.futures
+import multiprocessing
+import os
+
+import server
+
+
+def test_worker_without_fork_builds_its_validators():
+    context = multiprocessing.get_context('spawn')
+    with concurrent.futures.ProcessPoolExecutor(1, mp_context=context) as executor:
+        assert executor.submit(server._validate, 'p', 'f.close()\n').result() == {'valid': True, 'errors': []}
+
+
+async def _post(port, length, body=b''):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(f'POST /validate/p HTTP/1.1\r\nContent-Length: {length}\r\n\r\n'.encode() + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    writer.close()
+    return status
+
+
+def test_negative_content_length():
+    async def run():
+        srv = server.Server(workers=1)
+        listener = await asyncio.start_server(srv.handle, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        async with listener:
+            return [await _post(port, -5), await _post(port, 'x')]
+
+    assert asyncio.run(run()) == [400, 400]
+
+
+def test_broken_pool():
+    srv = server.Server(workers=1)
+    srv.executor = concurrent.futures.ProcessPoolExecutor(1)
+    try:
+        future = srv.executor.submit(os._exit, 1)
+        try:
+            future.result()
+        except concurrent.futures.process.BrokenProcessPool:
+            pass
+        assert asyncio.run(srv.validate('p', 'f.close()\n'))[0] == 503
+        assert srv.pending == 0
+    finally:
+        srv.close()
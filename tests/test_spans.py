@@ -0,0 +1,22 @@
+"""spanlex's offset tokens against PLY's, over str and bytes input"""
+import pytest
+
+import lazy
+import tablecache
+from bench.corpus import repeated
+from spanlex import SpanLexer
+
+
+def tokens(lexer, data):
+    lexer.input(data)
+    lexer.lineno = 1
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in iter(lexer.token, None)]
+
+
+@pytest.mark.parametrize('name', tablecache.GRAMMARS)
+@pytest.mark.parametrize('encode', [False, True], ids=['str', 'bytes'])
+def test_span_tokens_match_ply(name, encode, size=20_000):
+    lexer = lazy.grammar(name).lexer
+    text = repeated(name, size)
+    expected = tokens(lexer, text)
+    assert tokens(SpanLexer(lexer), text.encode() if encode else text) == expected
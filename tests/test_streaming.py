@@ -0,0 +1,31 @@
+"""streamlex's chunked tokens against lexing the whole text at once"""
+import io
+
+import pytest
+
+import lazy
+import streamlex
+import tablecache
+from bench.corpus import repeated
+
+
+def tokens(token_iter):
+    return [(t.type, t.value, t.lineno, t.lexpos) for t in token_iter]
+
+
+@pytest.mark.parametrize('name', tablecache.GRAMMARS)
+def test_chunked_tokens_match_whole(name, size=5_000):
+    g = lazy.grammar(name)
+    # Non-ASCII inside strings makes the byte chunks split characters; the
+    # grammars without string literals report it as illegal on both sides
+    text = repeated(name, size, sep='\n').replace('"', '"é€', 2)
+    lexer = g.lexer.clone()
+    lexer.lineno = 1
+    lexer.input(text)
+    expected = tokens(iter(lexer.token, None))
+    for chunk_size in (1, 2, 3, 17, 64, 199):
+        for stream in (io.StringIO(text), io.BytesIO(text.encode())):
+            lexer = g.lexer.clone()
+            lexer.lineno = 1
+            actual = tokens(streamlex.stream_tokens(lexer, stream, chunk_size))
+            assert actual == expected, (chunk_size, type(stream).__name__)
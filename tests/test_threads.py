@@ -0,0 +1,45 @@
+"""bench/threads.py's stress run, smaller: threads validating at once must
+give exactly the serial results"""
+import sys
+
+import pytest
+
+import lazy
+import memo
+from bench.threads import GRAMMARS, items, run_all, run_batches, stress
+
+THREADS = 8
+ROUNDS = 2
+
+
+@pytest.fixture
+def interleave():
+    # Switch threads as often as possible, so parses interleave
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    yield
+    sys.setswitchinterval(interval)
+
+
+@pytest.mark.parametrize('cache', [False, True], ids=['no cache', 'cache'])
+@pytest.mark.parametrize('mode', ['parse', 'recognize', 'batch'])
+def test_threads_match_serial(interleave, cache, mode):
+    work = items()
+    lazy.warm_up(*GRAMMARS)
+    if mode == 'batch':
+        def run(order):
+            return run_batches(work, order)
+    else:
+        def run(order):
+            return run_all(work, mode, order)
+    memo.configure(max_entries=memo.MAX_ENTRIES if cache else 0)
+    try:
+        memo.clear()
+        expected = run(range(len(work)))
+        for _ in range(ROUNDS):
+            memo.clear()
+            for result in stress(work, THREADS, run):
+                assert result == expected
+    finally:
+        memo.configure(max_entries=0)
+        memo.clear()
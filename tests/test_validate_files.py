@@ -0,0 +1,26 @@
+import validate_files
+
+
+def test_assign_order():
+    mapping = [('*.src', 'lambda')]
+    assert validate_files.assign('corpus/p/x.src', mapping, top='corpus') == 'lambda'
+    assert validate_files.assign('corpus/p/x.arr', top='corpus') == 'arr'
+    assert validate_files.assign('corpus/p/x.txt', top='corpus') == 'p'
+    assert validate_files.assign('corpus/x.txt', top='corpus', default='try') == 'try'
+
+
+def test_assign_stops_at_top():
+    # An ancestor of the validated directory named after a grammar
+    assert validate_files.assign('/home/p/project/x.txt', top='/home/p/project') == 'do'
+    assert validate_files.assign('/home/p/project/x.txt') == 'do'
+    assert validate_files.assign('/home/project/p/x.txt') == 'p'
+
+
+def test_walk_gives_top(tmp_path):
+    (tmp_path / 'p').mkdir()
+    (tmp_path / 'p' / 'x.txt').write_text('f.close()\n')
+    (tmp_path / 'y.txt').write_text('x = 1\n')
+    top = str(tmp_path)
+    files = list(validate_files.walk([top, str(tmp_path / 'y.txt')]))
+    assert files == [(str(tmp_path / 'y.txt'), top), (str(tmp_path / 'p' / 'x.txt'), top),
+                     (str(tmp_path / 'y.txt'), None)]
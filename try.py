@@ -1,5 +1,6 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
+import reserved_words
 
 # List of token names
 tokens = (
@@ -21,20 +22,13 @@ t_DIVIDE = r'/'
 t_COMMA = r','
 t_SEMICOLON = r';'
 
+# Reserved words
+keywords = reserved_words.SCRIPT
+
 # More complex tokens
 def t_IDENTIFIER(t):
     r'[a-zA-Z_][a-zA-Z0-9_]*'
-    # Check for reserved words
-    if t.value == 'def':
-        t.type = 'DEF'
-    elif t.value == 'while':
-        t.type = 'WHILE'
-    elif t.value == 'print':
-        t.type = 'PRINT'
-    elif t.value in ('true', 'false'):
-        t.type = 'BOOLEAN'
-    elif t.value == 'null':
-        t.type = 'NULL'
+    t.type = keywords.get(t.value, 'IDENTIFIER')
     return t
 
 def t_NUMBER(t):
@@ -51,11 +45,12 @@ t_ignore = ' \t\n'
 
 # Error handling
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-# Build the lexer
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Parsing rules
 def p_program(p):
@@ -68,7 +63,9 @@ def p_statements(p):
     if len(p) == 2:
         p[0] = [p[1]] if p[1] is not None else []
     else:
-        p[0] = p[1] + [p[2]] if p[2] is not None else p[1]
+        if p[2] is not None:
+            p[1].append(p[2])
+        p[0] = p[1]
 
 def p_statement(p):
     '''statement : function_decl
@@ -88,7 +85,8 @@ def p_param_list(p):
     if len(p) == 2:
         p[0] = [p[1]] if p[1] is not None else []
     elif len(p) == 4:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_while_stmt(p):
     '''while_stmt : WHILE LPAREN expression RPAREN LBRACE statements RBRACE'''
@@ -108,7 +106,8 @@ def p_expression_list(p):
     if len(p) == 2:
         p[0] = [p[1]]
     else:
-        p[0] = p[1] + [p[3]]
+        p[1].append(p[3])
+        p[0] = p[1]
 
 def p_expression(p):
     '''expression : term
@@ -138,13 +137,7 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    if p:
-        print(f"Syntax error at token: {p.value}")
-    else:
-        print("Syntax error at EOF")
-
-# Build the parser with error recovery
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 # Interactive loop for input
 if __name__ == '__main__':
@@ -158,7 +151,9 @@ if __name__ == '__main__':
                 if not s:
                     continue
                 try:
-                    result = parser.parse(s)
+                    with diagnostics.collect() as errors:
+                        result = grammar.parse(s)
+                    diagnostics.report(errors)
                     if result is not None:
                         print("Valid syntax")
                 except:
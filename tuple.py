@@ -1,5 +1,5 @@
-from ply import lex
-from ply import yacc
+import diagnostics
+import lazy
 
 # List of token names
 tokens = (
@@ -51,10 +51,12 @@ def t_NONE(t):
 t_ignore = ' \t\n'  # Added newline to ignore
 
 def t_error(t):
-    print(f"Illegal character '{t.value[0]}'")
+    diagnostics.lex_error(t)
     t.lexer.skip(1)
 
-lexer = lex.lex()
+# Lexer and parser are built on first use
+grammar = lazy.LazyGrammar(__name__)
+__getattr__ = grammar.module_getattr
 
 # Define precedence and associativity
 precedence = (
@@ -94,12 +96,7 @@ def p_empty(p):
     pass
 
 def p_error(p):
-    if p:
-        print(f"Syntax error at token: {p.type}, value: {p.value}")
-    else:
-        print("Syntax error at EOF")
-
-parser = yacc.yacc()
+    diagnostics.syntax_error(p)
 
 if __name__ == '__main__':
     while True:
@@ -110,7 +107,9 @@ if __name__ == '__main__':
             s = input('Enter Python code: ')
             if not s:
                 continue
-            result = parser.parse(s)
+            with diagnostics.collect() as errors:
+                result = grammar.parse(s)
+            diagnostics.report(errors)
             print("Valid syntax\n" if result == "Valid" else "Invalid syntax\n")
         except EOFError:
             break
@@ -0,0 +1,201 @@
+"""Validate a corpus of files across all cores.
+
+Each file is assigned a grammar, in order, by:
+  1. the first --map GLOB=GRAMMAR whose glob matches its path,
+  2. its extension, if that names a grammar (x.arr, x.lambda, x.do),
+  3. the nearest parent directory named after a grammar (corpus/p/x.txt),
+     up to the directory given on the command line,
+  4. --grammar (default: do).
+
+The lexers and parsers are built in the parent before the worker pool is
+forked, so the workers share the tables copy-on-write instead of each
+building or loading its own. Files are read in chunks (streamlex), so
+large inputs don't need to fit in memory. One JSON line is written per
+file as results come in; a throughput summary goes to stderr.
+
+    python validate_files.py corpus/ -j 8 > results.jsonl
+    find . -name '*.src' | python validate_files.py --files-from - -g '*.src=do'
+"""
+import argparse
+import concurrent.futures
+import fnmatch
+import gc
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import diagnostics
+import lazy
+import tablecache
+
+
+def assign(path, mapping=(), default='do', top=None):
+    """Grammar name for path, see the module docstring. Parent directories
+    are looked at up to top, the directory being validated (by default
+    path's own directory), never above it."""
+    for pattern, name in mapping:
+        if fnmatch.fnmatch(path, pattern):
+            return name
+    ext = os.path.splitext(path)[1][1:]
+    if ext in tablecache.GRAMMARS:
+        return ext
+    parent = os.path.normpath(os.path.dirname(path))
+    top = parent if top is None else os.path.normpath(top)
+    while True:
+        base = os.path.basename(parent)
+        if base in tablecache.GRAMMARS:
+            return base
+        up = os.path.dirname(parent)
+        if parent == top or not up or up == parent:
+            return default
+        parent = up
+
+
+def walk(paths):
+    """(file, top) for the files under each path. Directories are walked,
+    sorted, and are the top of the files in them; a file given by itself
+    has top None."""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+                for name in sorted(files):
+                    yield os.path.join(root, name), path
+        else:
+            yield path, None
+
+
+def validate_file(path, grammar):
+    """Result dict for one file; runs in the workers"""
+    start = time.perf_counter()
+    result = {'path': path, 'grammar': grammar}
+    with diagnostics.collect() as errors:
+        try:
+            with open(path, 'rb') as f:
+                valid, error = lazy.grammar(grammar).recognize_stream(f)
+            result['valid'] = valid
+            result['error'] = error
+            result['bytes'] = os.path.getsize(path)
+        except (OSError, UnicodeDecodeError) as e:
+            result['valid'] = False
+            result['error'] = f'{type(e).__name__}: {e}'
+            result['bytes'] = 0
+        except Exception as e:
+            # e.g. PLY's LexError from a t_error that does not skip
+            result['valid'] = False
+            result['error'] = str(e)
+            result['bytes'] = os.path.getsize(path)
+    if errors:
+        result['valid'] = False
+        result['errors'] = [error._asdict() for error in errors]
+    result['seconds'] = round(time.perf_counter() - start, 6)
+    return result
+
+
+def _validate_chunk(jobs):
+    return [validate_file(path, grammar) for path, grammar in jobs]
+
+
+def _chunks(jobs, size):
+    chunk = []
+    for job in jobs:
+        chunk.append(job)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def pool(workers, grammars):
+    """A process pool whose workers start with `grammars` already built"""
+    # Build everything the workers need, then keep the collector from
+    # touching (and so copying) those objects in the children
+    for name in grammars:
+        g = lazy.grammar(name).warm_up()
+        g.recognizer
+    gc.freeze()
+    if 'fork' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('fork')
+        return concurrent.futures.ProcessPoolExecutor(workers, mp_context=context)
+    # No fork (Windows, macOS defaults): each worker builds, from the cache
+    return concurrent.futures.ProcessPoolExecutor(workers, initializer=lazy.warm_up, initargs=tuple(grammars))
+
+
+def run(jobs, workers, chunk_size=16, out=sys.stdout):
+    """Validate (path, grammar) jobs, writing JSON lines; returns totals"""
+    totals = {'files': 0, 'invalid': 0, 'bytes': 0}
+    start = time.perf_counter()
+
+    def emit(result):
+        totals['files'] += 1
+        totals['invalid'] += not result['valid']
+        totals['bytes'] += result['bytes']
+        out.write(json.dumps(result) + '\n')
+
+    if workers <= 1:
+        for path, grammar in jobs:
+            emit(validate_file(path, grammar))
+    else:
+        grammars = sorted({grammar for _, grammar in jobs})
+        try:
+            with pool(workers, grammars) as executor:
+                # Keep a bounded number of chunks in flight
+                pending = set()
+                for chunk in _chunks(jobs, chunk_size):
+                    pending.add(executor.submit(_validate_chunk, chunk))
+                    if len(pending) >= workers * 4:
+                        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                        for future in done:
+                            for result in future.result():
+                                emit(result)
+                for future in concurrent.futures.as_completed(pending):
+                    for result in future.result():
+                        emit(result)
+        finally:
+            # Frozen by pool()
+            gc.unfreeze()
+
+    totals['seconds'] = time.perf_counter() - start
+    return totals
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument('paths', nargs='*', help='files or directories')
+    ap.add_argument('--files-from', metavar='FILE', help="read paths from FILE ('-' for stdin)")
+    ap.add_argument('-g', '--map', action='append', default=[], metavar='GLOB=GRAMMAR',
+                    help='assign files matching GLOB to GRAMMAR (repeatable)')
+    ap.add_argument('--grammar', default='do', choices=tablecache.GRAMMARS, help='fallback grammar')
+    ap.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help='worker processes')
+    ap.add_argument('--chunk-size', type=int, default=16, help='files per task')
+    args = ap.parse_args(argv)
+
+    mapping = []
+    for item in args.map:
+        pattern, _, name = item.rpartition('=')
+        if not pattern or name not in tablecache.GRAMMARS:
+            ap.error(f'bad --map {item!r}: expected GLOB=GRAMMAR with one of {", ".join(tablecache.GRAMMARS)}')
+        mapping.append((pattern, name))
+
+    paths = list(args.paths)
+    if args.files_from:
+        f = sys.stdin if args.files_from == '-' else open(args.files_from)
+        with f:
+            paths.extend(line.strip() for line in f if line.strip())
+    if not paths:
+        ap.error('no files given')
+
+    jobs = [(path, assign(path, mapping, args.grammar, top)) for path, top in walk(paths)]
+    totals = run(jobs, args.jobs, args.chunk_size)
+    seconds = totals['seconds']
+    print(f"{totals['files']} files ({totals['invalid']} invalid), {totals['bytes'] / 1e6:.1f} MB "
+          f"in {seconds:.2f}s with {args.jobs} workers: {totals['files'] / seconds:,.0f} files/s, "
+          f"{totals['bytes'] / 1e6 / seconds:.2f} MB/s", file=sys.stderr)
+    return 1 if totals['invalid'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())